@@ -17,11 +17,20 @@
 # ##### END GPL LICENSE BLOCK #####
 
 import bpy
-import numpy
 import time
 from mathutils import Vector # Import Vector
 from bpy.types import Operator
 from . import preferences
+from . import cache
+from . import scheduler
+from . import profiling
+from . import pipeline
+from . import operators
+from bpy.app.handlers import persistent
+
+# NumPy and the modules built on it (bounds, bounds_store, spatial, instances,
+# bake, render, surface, workers, blend_cache, components, hierarchy, trace)
+# only become module globals once load_engine() imported them
 
 
 bl_info = {
@@ -38,6 +47,9 @@ bl_info = {
 
 clipping_active = False
 start_time = None
+
+# Text datablock blend_cache keeps the saved bounds in, known here so saving does not load the engine
+SAVED_BOUNDS_TEXT = ".clipping_assistant_bounds"
 _cached_prefs = None # Cache for addon preferences
 
 def prefs():
@@ -51,14 +63,89 @@ def prefs():
              return None # Or raise an error, or return a default object
     return _cached_prefs
 
-def max_list_value(input_list):
-    ''' Find the maximum value in a list and return the index and the value '''
-    input_array = numpy.array(input_list)
-    max_index = input_array.argmax()
-    max_value = input_array[max_index]
-    return max_index, max_value
+
+_pipeline = None # Pipeline composed from the current settings snapshot
+
+def active_pipeline():
+    ''' Composed pipeline, built from the preferences on first use. '''
+    if _pipeline is None:
+        preferences_ = prefs()
+        if preferences_ is None:
+            return None
+        rebuild_pipeline(preferences_)
+    return _pipeline
+
+
+def current_settings():
+    ''' Read-only settings snapshot, None while the preferences are not available. '''
+    pipeline_ = active_pipeline()
+    return pipeline_.settings if pipeline_ is not None else None
 
 
+def rebuild_pipeline(preferences_):
+    ''' Snapshot the preferences and recompose the stages, called by every preference update. '''
+    global _pipeline, readout
+    settings_ = pipeline.Settings(preferences_)
+    _pipeline = compose_pipeline(settings_)
+    profiling.enabled = settings_.debug_profiling
+    if not settings_.show_clipping_distance:
+        readout = ""
+    if settings_.render_clipping:
+        # Frame changes in background renders are handled without the operator ever running
+        load_engine()
+    if engine_loaded:
+        blend_cache.enabled = settings_.persistent_bounds
+
+
+engine_loaded = False
+
+def load_engine():
+    '''
+    Import NumPy and the computational modules and install the handlers
+    that keep their caches valid. Registering the add-on does neither, the
+    first toggle, bake or enabled render clipping does it once.
+    '''
+    global engine_loaded, numpy, bounds, bounds_store, spatial, instances, bake, render
+    global surface, workers, blend_cache, components, hierarchy, trace
+    if engine_loaded:
+        return
+    start = time.perf_counter()
+    import numpy
+    from . import bounds, bounds_store, spatial, instances, bake, render
+    from . import surface, workers, blend_cache, components, hierarchy, trace
+    engine_loaded = True
+    clear_caches()
+    settings_ = current_settings()
+    blend_cache.enabled = settings_ is not None and settings_.persistent_bounds
+    bpy.app.handlers.depsgraph_update_post.append(depsgraph_update_handler)
+    bpy.app.handlers.frame_change_post.append(frame_change_handler)
+    bpy.app.handlers.load_post.append(load_post_handler)
+    bpy.app.handlers.undo_post.append(undo_post_handler)
+    bpy.app.handlers.redo_post.append(undo_post_handler)
+    profiling.record('load engine', time.perf_counter() - start)
+
+
+def warmup():
+    '''
+    Timer callback after the assistant is enabled. Builds the bounds and
+    indexes of the current targets, which the first navigation event
+    would otherwise pay for.
+    '''
+    settings_ = current_settings()
+    if not clipping_active or settings_ is None:
+        return None
+    context = bpy.context
+    with profiling.span('warmup'):
+        target_objects = resolve_targets(context)
+        if settings_.include_children:
+            hierarchy.hierarchy.ensure(context.scene)
+            hierarchy.hierarchy.aggregate(target_objects, ClippingAssistant.ob_type)
+        elif target_objects:
+            bounds_store.store.aggregate(target_objects)
+        if settings_.visible_scene_clipping:
+            ensure_scene_index(context.scene)
+    return None
+
 def get_min_dimension(dimension_list):
     '''
     Find the minimum non-zero dimension value across all dimension vectors in the list.
@@ -102,102 +189,358 @@ def get_max_dimension(dimension_list):
         return 10.0
     
 
-def apply_clipping(context):
-    prefs_ = prefs() # Get prefs once for this function execution
-    if prefs_ is None: 
+def resolve_targets(context):
+    ''' Selected objects, or the active object if nothing is selected, filtered by supported type. '''
+    target_objects_raw = context.selected_objects
+    active_object = context.active_object
+    if not target_objects_raw and active_object:
+        target_objects_raw = [active_object]
+    return [obj for obj in target_objects_raw if obj.type in ClippingAssistant.ob_type]
+
+
+def view_spaces(context):
+    '''
+    Every VIEW_3D space in every window. The primary view comes first: the
+    area the event happened in, otherwise the first 3D view of the current screen.
+    '''
+    primary = context.area if context.area and context.area.type == 'VIEW_3D' else None
+    if primary is None and context.screen:
+        primary = next((area for area in context.screen.areas if area.type == 'VIEW_3D'), None)
+
+    spaces = []
+    for window in context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type != 'VIEW_3D':
+                continue
+            if area == primary:
+                spaces.insert(0, area.spaces.active)
+            else:
+                spaces.append(area.spaces.active)
+    return spaces
+
+
+def apply_clipping(context, target_objects=None):
+    ''' Run the composed clipping stages for all 3D views. '''
+    pipeline_ = active_pipeline()
+    if pipeline_ is None:
         return # Exit if prefs aren't available
-    if prefs_.debug_profiling:
-        total_time = profiler(time.perf_counter(), "Start Total Profiling")
-        calc_time = profiler(time.perf_counter(), "Start Profiling")
-        print('-' * 40)
+    pipeline_.run(context, target_objects)
 
-    minClipping, maxClipping = None, None
 
-    # Access the active 3D view directly
-    #context = bpy.context
-    area = next((area for area in context.screen.areas if area.type == 'VIEW_3D'), None)
-    if area is None:
-        return
+def stage_spaces(settings_, clipping_pass):
+    clipping_pass.spaces = view_spaces(clipping_pass.context)
+    return bool(clipping_pass.spaces)
 
-    if prefs_.debug_profiling:
-        calc_time = profiler(calc_time, "Start Clipping Calculation")
-        
-    space = area.spaces.active
-
-    if prefs_.auto_clipping:
-        # Determine target objects here
-        selected_objects = context.selected_objects
-        active_object = context.active_object
-        target_objects_raw = selected_objects
-        if not target_objects_raw and active_object:
-            target_objects_raw = [active_object]
-        
-        # Filter target objects by type (using the list from the Operator class)
-        target_objects = [obj for obj in target_objects_raw if obj.type in ClippingAssistant.ob_type]
 
-        # Get dimensions and locations (using the original function, which implicitly uses context)
-        obj_dimensions, obj_locations = get_object_dimensions_and_locations(context, target_objects)
-        
-        if prefs_.debug_output:
-            print('\nObject location: ', obj_locations)
-            print('Object dimensions: ', obj_dimensions)
-
-        view_3d = space.region_3d
-        view_distance = view_3d.view_distance
-        if prefs_.debug_profiling:
-            calc_time = profiler(calc_time, "view_distance")
-
-        # Pass target_objects, obj_dimensions, obj_locations to calculate_clipping
-        minClipping, maxClipping = calculate_clipping(context, view_distance, obj_dimensions, obj_locations)
-        if prefs_.debug_profiling:
-            calc_time = profiler(calc_time, "auto_clipping")
-    else:
-        minClipping, maxClipping = prefs_.clip_start_distance, prefs_.clip_end_distance
-        if prefs_.debug_profiling:
-            calc_time = profiler(calc_time, "no auto_clipping")
+def stage_targets(settings_, clipping_pass):
+    if clipping_pass.target_objects is None:
+        clipping_pass.target_objects = resolve_targets(clipping_pass.context)
+    return True
 
-    if prefs_.debug_profiling:
-        calc_time = profiler(calc_time, "End Clipping Calculation")
 
+def bounds_key(settings_, clipping_pass):
+    return cache.fingerprint(clipping_pass.target_objects, clipping_pass.context.active_object,
+                             settings_.bounds_mode, settings_.clipping_mode, settings_.instance_bounds,
+                             settings_.vectorized_bounds, settings_.incremental_bounds)
 
-    # Apply viewport clipping
-    space.clip_start = minClipping
-    space.clip_end = maxClipping
-    
-    if prefs_.debug_output:
-       print('-' * 40)
-       print(f"Set Viewport Clipping: {minClipping:.4f} <-> {maxClipping:.4f}")
-       print('=' * 40)
 
-    if prefs_.debug_profiling:
-        calc_time = profiler(calc_time, "Viewport Clipping Applied")
+def stage_bounds(settings_, clipping_pass):
+    ''' The target measurement is shared by all views, reuse it while only the view is orbited. '''
+    target_objects = clipping_pass.target_objects
+    key = bounds_key(settings_, clipping_pass)
+    measured = cache.clipping_cache.lookup(key)
+    if measured is cache.MISS:
+        measured = measure_targets(settings_, clipping_pass.context, target_objects)
+        cache.clipping_cache.store(key, measured)
+    clipping_pass.key = key
+    clipping_pass.measurement, clipping_pass.aggregate = measured
+    profiling.count('objects', len(target_objects))
+    return True
 
-    # Apply volumetric clipping
-    if prefs_.volume_clipping:
-        scene = context.scene
-        scene.eevee.volumetric_start = minClipping
-        scene.eevee.volumetric_end = maxClipping
 
-    if prefs_.debug_profiling:
-        calc_time = profiler(calc_time, "Volumetric Clipping Applied")
+def stage_threaded_bounds(settings_, clipping_pass):
+    '''
+    World bounds of large selections reduced on the worker thread. On a cache
+    miss only the snapshot is taken here and the pass ends, the views keep
+    their clipping until finish_threaded_bounds re-runs the update.
+    '''
+    target_objects = clipping_pass.target_objects
+    if len(target_objects) < workers.MIN_OBJECTS:
+        return stage_bounds(settings_, clipping_pass)
+
+    key = bounds_key(settings_, clipping_pass)
+    measured = cache.clipping_cache.lookup(key)
+    if measured is cache.MISS:
+        if workers.bounds_worker.pending_key() != key:
+            context = clipping_pass.context
+            with profiling.span('snapshot'):
+                instance_boxes = None
+                if settings_.instance_bounds:
+                    instance_boxes = instances.instance_bounds.instance_boxes(
+                        context.evaluated_depsgraph_get(), target_objects)
+                data = workers.snapshot(target_objects, instance_boxes)
+            workers.bounds_worker.submit(key, data, finish_threaded_bounds, context.window, context.area)
+        return False
+
+    clipping_pass.key = key
+    clipping_pass.measurement, clipping_pass.aggregate = measured
+    profiling.count('objects', len(target_objects))
+    return True
+
+
+def finish_threaded_bounds(key, aggregate, window, area):
+    ''' Worker result callback, cache the measurement and run the update again on top of it. '''
+    cache.clipping_cache.store(key, (measure_aabb(aggregate), aggregate))
+    profiling.record('worker', workers.bounds_worker.last_worker_time)
+    scheduled_update(window, area)
+
+
+def stage_hierarchy_bounds(settings_, clipping_pass):
+    ''' World bounds of the targets and all their descendants, from the cached subtree bounds. '''
+    context = clipping_pass.context
+    roots = clipping_pass.target_objects
+    key = cache.fingerprint(roots, context.active_object, settings_.bounds_mode, settings_.clipping_mode,
+                            settings_.instance_bounds, 'HIERARCHY')
+    index = hierarchy.hierarchy
+    index.ensure(context.scene)
+    target_objects = clipping_pass.target_objects = index.expand(roots, ClippingAssistant.ob_type)
+    measured = cache.clipping_cache.lookup(key)
+    if measured is cache.MISS:
+        aggregate = index.aggregate(roots, ClippingAssistant.ob_type)
+        if settings_.instance_bounds and target_objects:
+            aggregate = merge_instance_bounds(context, target_objects, aggregate)
+        measured = (measure_aabb(aggregate), aggregate)
+        cache.clipping_cache.store(key, measured)
+    clipping_pass.key = key
+    clipping_pass.measurement, clipping_pass.aggregate = measured
+    profiling.count('objects', len(clipping_pass.target_objects))
+    return True
+
+
+def stage_component_bounds(settings_, clipping_pass):
+    '''
+    In mesh edit mode the selected vertices of every mesh being edited are
+    the target. Without a selection the object bounds stages run instead.
+    '''
+    context = clipping_pass.context
+    if context.mode != 'EDIT_MESH':
+        return None
+    edit_objects = [obj for obj in context.objects_in_mode if obj.type == 'MESH']
+    aggregate = components.selected_components.aggregate(edit_objects)
+    if aggregate is None:
+        return None
+    key = cache.fingerprint(edit_objects, context.active_object, settings_.clipping_mode,
+                            'EDIT', components.selected_components.counter)
+    measured = cache.clipping_cache.lookup(key)
+    if measured is cache.MISS:
+        measured = (measure_aabb(aggregate), aggregate)
+        cache.clipping_cache.store(key, measured)
+    clipping_pass.target_objects = edit_objects
+    clipping_pass.key = key
+    clipping_pass.measurement, clipping_pass.aggregate = measured
+    profiling.count('objects', len(edit_objects))
+    return True
+
+
+def component_bounds(stage):
+    ''' Bounds stage that measures the edit mode selection first and falls back to stage. '''
+    def run(settings_, clipping_pass):
+        measured = stage_component_bounds(settings_, clipping_pass)
+        return stage(settings_, clipping_pass) if measured is None else measured
+    return run
+
+
+def stage_manual_bounds(settings_, clipping_pass):
+    clipping_pass.key = (settings_.clip_start_distance, settings_.clip_end_distance)
+    return True
+
+
+def stage_policy(settings_, clipping_pass):
+    ''' Only the view math runs per view, views with unchanged inputs are skipped. '''
+    key = clipping_pass.key
+    measurement = clipping_pass.measurement
+    aggregate = clipping_pass.aggregate
+    # Depth fitting depends on the whole view matrix, the other modes only on the view distance
+    depth_fit = settings_.clipping_mode == 'DEPTH_FIT' and aggregate is not None
+    # Without targets the objects visible in the frustum are fitted, this depends on the projection as well
+    scene_fit = settings_.visible_scene_clipping and not clipping_pass.target_objects
+    # The nearest surface moves with the viewpoint, not only with the view distance
+    view_fit = depth_fit or (settings_.near_clip == 'SURFACE' and not scene_fit)
+
+    view_clipping = []
+    for space in clipping_pass.spaces:
+        region_3d = space.region_3d
+        view_distance = region_3d.view_distance
+        if scene_fit:
+            view_key = (key, tuple(map(tuple, region_3d.view_matrix)), cache.projection_key(region_3d))
+        elif view_fit:
+            view_key = (key, tuple(map(tuple, region_3d.view_matrix)))
+        else:
+            view_key = (key, cache.distance_key(view_distance))
+        if not cache.view_states.changed(space, view_key):
+            continue
+
+        if scene_fit:
+            minClipping, maxClipping = visible_scene_clipping(clipping_pass.context, region_3d, settings_.depth_margin)
+        elif depth_fit:
+            minClipping, maxClipping = depth_fit_clipping(region_3d, measurement, aggregate, settings_.depth_margin)
+        else:
+            minClipping, maxClipping = clipping_from_measurement(view_distance, measurement)
+        view_clipping.append((space, minClipping, maxClipping))
 
-    # Apply camera clipping
-    if space.camera and prefs_.camera_clipping:
-        camera = bpy.data.cameras.get(space.camera.name)
-        if camera:
-            camera.clip_start = minClipping
-            camera.clip_end = maxClipping
+    clipping_pass.view_clipping = view_clipping
+    return bool(view_clipping)
 
-    if prefs_.debug_profiling:
-        calc_time = profiler(calc_time, "Camera Clipping Applied")
 
-    if prefs().debug_profiling:
+def stage_surface_near(settings_, clipping_pass):
+    ''' Move the near clip up to the nearest target surface, the far clip stays with the policy. '''
+    target_objects = clipping_pass.target_objects
+    if not target_objects:
+        return True
+
+    depsgraph = clipping_pass.context.evaluated_depsgraph_get()
+    lo, hi = bounds_store.store.boxes(target_objects)
+    memory_limit = settings_.surface_cache_size * 1048576
+    view_clipping = []
+    for space, minClipping, maxClipping in clipping_pass.view_clipping:
+        region_3d = space.region_3d
+        if region_3d.is_perspective:
+            eye = numpy.linalg.inv(numpy.asarray(region_3d.view_matrix, dtype=numpy.float64))[:3, 3]
+            distance = surface.surface_trees.nearest(eye, target_objects, lo, hi, depsgraph, memory_limit)
+            if distance:
+                minClipping = min(distance * (1.0 - settings_.depth_margin), maxClipping * 0.5)
+        view_clipping.append((space, minClipping, maxClipping))
+    clipping_pass.view_clipping = view_clipping
+    profiling.count('surface trees', len(surface.surface_trees.trees))
+    return True
+
+
+def stage_manual_policy(settings_, clipping_pass):
+    ''' Fixed distances, each view is written once per change of the values. '''
+    key = clipping_pass.key
+    clipping_pass.view_clipping = [(space,) + key for space in clipping_pass.spaces
+                                   if cache.view_states.changed(space, key)]
+    return bool(clipping_pass.view_clipping)
+
+
+def stage_viewport(settings_, clipping_pass):
+    ''' Writes tag the depsgraph and redraw, skip those that would barely change anything. '''
+    threshold = settings_.write_threshold
+    write = cache.write_elision.write
+    for space, minClipping, maxClipping in clipping_pass.view_clipping:
+        write(space, 'clip_start', 'clip_end', minClipping, maxClipping, threshold)
+    # Volumetrics and camera follow the primary view, which is always first
+    return clipping_pass.view_clipping[0][0] == clipping_pass.spaces[0]
+
+
+def stage_volume(settings_, clipping_pass):
+    _, minClipping, maxClipping = clipping_pass.view_clipping[0]
+    cache.write_elision.write(clipping_pass.context.scene.eevee, 'volumetric_start', 'volumetric_end',
+                              minClipping, maxClipping, settings_.write_threshold)
+    return True
+
+
+def stage_view_camera(settings_, clipping_pass):
+    space, minClipping, maxClipping = clipping_pass.view_clipping[0]
+    if space.camera and space.camera.type == 'CAMERA':
+        cache.write_elision.write(space.camera.data, 'clip_start', 'clip_end',
+                                  minClipping, maxClipping, settings_.write_threshold)
+    return True
+
+
+def stage_scene_cameras(settings_, clipping_pass):
+    _, minClipping, maxClipping = clipping_pass.view_clipping[0]
+    apply_cameras_clipping(clipping_pass.context.scene, settings_, clipping_pass.aggregate, minClipping, maxClipping)
+    return True
+
+
+def stage_debug_bounds(settings_, clipping_pass):
+    print(cache.clipping_cache.stats_text())
+    print(f"\nTarget objects: {[(obj.name, obj.type) for obj in clipping_pass.target_objects]}")
+    print(f"  Measurement (min dimension, max dimension, spread): {clipping_pass.measurement}")
+    if clipping_pass.aggregate is not None:
+        print(f"  Enclosing box: {clipping_pass.aggregate[0]} <-> {clipping_pass.aggregate[1]}")
+    return True
+
+
+def stage_debug_views(settings_, clipping_pass):
+    print(cache.view_states.stats_text())
+    for space, minClipping, maxClipping in clipping_pass.view_clipping or ():
         print('-' * 40)
-        total_time = profiler(total_time, "Total clipping time")
-        print("=" * 40, end='\n\n')
-        
+        print(f"View Distance: {space.region_3d.view_distance:.4f}")
+        print(f"Set Viewport Clipping: {minClipping:.4f} <-> {maxClipping:.4f}")
+        print('=' * 40)
+    return bool(clipping_pass.view_clipping)
+
+
+def stage_debug_writes(settings_, clipping_pass):
+    print(cache.write_elision.stats_text())
+    return True
+
+
+def compose_pipeline(settings_):
+    ''' Stages for one settings snapshot, features that are turned off are left out. '''
+    timed = settings_.debug_profiling
+    debug = settings_.debug_output
+
+    stages = [stage_spaces]
+    if settings_.auto_clipping:
+        # update_clipping already times resolving the targets it passes in
+        stages.append(stage_targets)
+        if settings_.include_children:
+            bounds_stage = stage_hierarchy_bounds
+        elif settings_.threaded_bounds and settings_.bounds_mode == 'AABB':
+            bounds_stage = stage_threaded_bounds
+        else:
+            bounds_stage = stage_bounds
+        if settings_.component_clipping:
+            bounds_stage = component_bounds(bounds_stage)
+        stages.append(pipeline.timed('bounds', bounds_stage, timed))
+        if debug:
+            stages.append(stage_debug_bounds)
+        stages.append(pipeline.timed('policy', stage_policy, timed))
+        if settings_.near_clip == 'SURFACE':
+            stages.append(pipeline.timed('surface', stage_surface_near, timed))
+    else:
+        stages.append(stage_manual_bounds)
+        stages.append(pipeline.timed('policy', stage_manual_policy, timed))
+    if debug:
+        stages.append(stage_debug_views)
+    # The viewport stage ends the pass when the primary view was not updated
+    stages.append(pipeline.timed('apply', stage_viewport, timed))
+    if settings_.volume_clipping:
+        stages.append(pipeline.timed('volume', stage_volume, timed))
+    if settings_.camera_clipping:
+        camera_stage = stage_view_camera if settings_.camera_scope == 'VIEW' else stage_scene_cameras
+        stages.append(pipeline.timed('camera', camera_stage, timed))
+    if debug:
+        stages.append(stage_debug_writes)
+    return pipeline.Pipeline(settings_, stages)
+
+
 # Removed request_topbar_redraw timer function as it was unreliable
 
+def apply_cameras_clipping(scene, settings_, aggregate, minClipping, maxClipping):
+    '''
+    Clip every scene or marker camera. With a target aggregate each camera gets
+    its own depth fit from one batched pass, otherwise the primary view values.
+    '''
+    cameras = render.scene_cameras(scene, settings_.camera_scope)
+    if not cameras:
+        return
+    profiling.count('cameras', len(cameras))
+
+    if aggregate is not None:
+        starts, ends = render.cameras_clipping(cameras, aggregate, settings_.depth_margin)
+    else:
+        starts = [minClipping] * len(cameras)
+        ends = [maxClipping] * len(cameras)
+
+    threshold = settings_.write_threshold
+    for camera, start, end in zip(cameras, starts, ends):
+        cache.write_elision.write(camera.data, 'clip_start', 'clip_end', float(start), float(end), threshold)
+
+
 def get_outliner_objects():
     '''Retrieve the active object from the Outliner area.'''
     for area in bpy.context.screen.areas:
@@ -213,7 +556,6 @@ def get_outliner_objects():
 
 def get_object_dimensions_and_locations(context, target_objects):  
     """Gets the dimensions and locations of selected objects, or the active object if none are selected."""
-    selected_objects = context.selected_objects
     active_object = context.active_object
 
     # Determine the target objects
@@ -221,11 +563,6 @@ def get_object_dimensions_and_locations(context, target_objects):
     if not target_objects and active_object:
         target_objects = [active_object] # Use a list containing the active object
 
-    if prefs().debug_output:
-        print(f"\nActive object: {active_object.name if active_object else 'None'}, type: {active_object.type if active_object else 'None'}")
-        print(f"  Selected objects: {[(obj.name, obj.type) for obj in selected_objects]}")
-        print(f"  Target objects for data: {[(obj.name, obj.type) for obj in target_objects]}")
-        
     if not target_objects:
         return None, None # Return None if no valid objects
 
@@ -242,21 +579,62 @@ def get_object_dimensions_and_locations(context, target_objects):
 
     return obj_dimensions, obj_locations
 
-    
-def calculate_clipping(context, view_distance, obj_dimensions, obj_locations):
-    prefs_ = prefs() # Get prefs once
-    if prefs_.debug_profiling:
-        print('-' *40)
-        start_time = profiler(time.perf_counter(), "Start calculate_clipping") 
 
-    if prefs_.debug_profiling:
-       start_time =  profiler(start_time, "Retrieved object dimensions and locations")
+
+def merge_instance_bounds(context, target_objects, aggregate):
+    '''
+    aggregate grown by the depsgraph instances the targets spawn. Collection
+    instances and geometry nodes scatters only exist as depsgraph instances.
+    '''
+    instance_aggregate = instances.instance_bounds.aggregate_instances(
+        context.evaluated_depsgraph_get(), target_objects,
+        (cache.selection_key(target_objects), cache.update_counter))
+    profiling.count('instances', instances.instance_bounds.instances)
+    return bounds.merge_aggregates(aggregate, instance_aggregate)
+
+
+def measure_targets(settings_, context, target_objects):
+    '''
+    Reduce the target objects to (measurement, aggregate).
+    measurement is (min_dim, max_dim, spread) from the configured bounds mode,
+    None if the targets have no size at all. aggregate is the enclosing world
+    box (union_lo, union_hi, min_extent), only built for world bounds or depth fitting.
+    The result does not depend on the view and is shared by all viewports.
+    '''
+    if settings_.bounds_mode == 'AABB' or settings_.clipping_mode == 'DEPTH_FIT':
+        # World-space bounds of every target reduced to one enclosing box,
+        # the store only re-reads objects the depsgraph reported as changed
+        if settings_.incremental_bounds:
+            aggregate = bounds_store.store.aggregate(target_objects)
+        else:
+            aggregate = bounds.aggregate_aabbs(*blend_cache.world_aabbs(target_objects))
+        if settings_.instance_bounds and target_objects:
+            aggregate = merge_instance_bounds(context, target_objects, aggregate)
+        if settings_.bounds_mode == 'AABB':
+            return measure_aabb(aggregate), aggregate
+    else:
+        aggregate = None
+
+    # Get dimensions and locations, either as (N, 3) arrays in one bulk read or
+    # through the scalar reference path
+    if settings_.vectorized_bounds:
+        obj_dimensions, obj_locations = bounds.gather_dimensions_and_locations(target_objects)
+    else:
+        obj_dimensions, obj_locations = get_object_dimensions_and_locations(context, target_objects)
+
+    if settings_.vectorized_bounds:
+        return measure_dimensions_vectorized(obj_dimensions, obj_locations), aggregate
+    return measure_dimensions(obj_dimensions, obj_locations), aggregate
+
+
+def measure_dimensions(obj_dimensions, obj_locations):
+    ''' Scalar reference reduction of Vector dimensions and locations to (min_dim, max_dim, spread). '''
+    if not obj_locations:
+        return None
  
     # --- Calculate Proximity ---   
     min_loc_vec = None
     max_loc_vec = None 
-    if prefs_.debug_output:
-        print('\nObject count: ', len(obj_locations))
 
     if len(obj_locations) > 1:
         # Store min/max vectors to avoid recalculating
@@ -270,69 +648,220 @@ def calculate_clipping(context, view_distance, obj_dimensions, obj_locations):
     selection_spread = 0.0
     selection_spread = (max_loc_vec - min_loc_vec).length
 
-    if prefs_.debug_output:
-        print(f'\nSelection Spread: {selection_spread:.4f}')
-        #if len(obj_locations) == 1:
-        # Check if vectors were assigned before accessing .length
-        if min_loc_vec is not None:
-            print(f'  Min Loc Vec: {min_loc_vec} length: {min_loc_vec.length:.4f}')
-        if max_loc_vec is not None:
-            print(f'  Max Loc Vec: {max_loc_vec} length: {max_loc_vec.length:.4f}')
-
-    if prefs_.debug_profiling:
-        start_time = profiler(start_time, "Calculated selection spread")
     # --- End Proximity ---
 
-    min_view_range = abs(view_distance / (1 + view_distance) / 10)
-    max_view_range = abs((1 + view_distance) * 10)
-
-    # --- Early exit or default calculation if no objects ---
     if obj_dimensions == None: # If no dimensions
-        if prefs_.debug_output:
-            print("No target objects found. Using default clipping based on view distance.")
-        # Calculate clipping based only on view distance and factors
-        minClipping = min_view_range 
-        maxClipping = max_view_range
-
-        if prefs_.debug_profiling:
-            profiler(start_time, "Finished calculate_clipping (no objects)")
-            print('-' * 40)
-        return minClipping, maxClipping
-    # --- End Early Exit ---
-
-    # --- Calculate Clipping ---
+        return None
+
     # Find min non-zero dimension value across all objects using the corrected helper
     min_dim_value = get_min_dimension(obj_dimensions)
     max_dim_value = get_max_dimension(obj_dimensions)
 
+    return min_dim_value, max_dim_value, selection_spread
+
+
+def measure_dimensions_vectorized(obj_dimensions, obj_locations):
+    '''
+    Array counterpart of measure_dimensions, takes the (N, 3) arrays returned by
+    bounds.gather_dimensions_and_locations and reduces them with NumPy.
+    '''
+    selection_spread = bounds.location_spread(obj_locations)
+
+    if obj_dimensions is None:
+        return None
+
+    min_dim_value = bounds.min_dimension(obj_dimensions)
+    max_dim_value = bounds.max_dimension(obj_dimensions)
+
+    return min_dim_value, max_dim_value, selection_spread
+
+
+def measure_aabb(aggregate):
+    '''
+    Reduction of the world-space AABBs of the targets, rotation and scale
+    included. The enclosing box diagonal replaces max dimension plus spread.
+    aggregate is (union_lo, union_hi, min_extent) as built by bounds.aggregate_aabbs.
+    '''
+    sizes = bounds.aggregate_sizes(aggregate)
+    if sizes is None:
+        return None
+    min_size, max_size = sizes
+    return min_size, max_size, 0.0
+
+    
+def calculate_clipping(context, view_distance, obj_dimensions, obj_locations):
+    ''' Scalar reference: clip start and end from Vector dimensions and locations. '''
+    return clipping_from_measurement(view_distance, measure_dimensions(obj_dimensions, obj_locations))
+
+
+def calculate_clipping_vectorized(context, view_distance, obj_dimensions, obj_locations):
+    ''' Clip start and end from (N, 3) dimension and location arrays. '''
+    return clipping_from_measurement(view_distance, measure_dimensions_vectorized(obj_dimensions, obj_locations))
+
+
+def clipping_from_measurement(view_distance, measurement):
+    ''' Clip start and end for one view from a target measurement, or from the view distance alone. '''
+    if measurement is None:
+        return view_range_clipping(view_distance)
+    return clipping_from_dimensions(view_distance, *measurement)
+
+
+def depth_fit_clipping(region_3d, measurement, aggregate, margin):
+    '''
+    Tight clip range from the depth interval of the enclosing target box along
+    the view axis, widened by the depth margin. Falls back to the view distance
+    heuristic for orthographic views, boxes behind the view and for the near
+    plane when the view is inside the box.
+    '''
+    fallback = clipping_from_measurement(region_3d.view_distance, measurement)
+    if not region_3d.is_perspective:
+        return fallback
+
+    near_depth, far_depth = bounds.depth_interval(region_3d.view_matrix, aggregate[0], aggregate[1])
+    return fit_depth_range(near_depth, far_depth, fallback, margin)
+
+
+def ensure_scene_index(scene):
+    ''' Spatial index of the supported scene objects, rebuilt when objects were added or removed. '''
+    index = spatial.scene_index
+    with profiling.span('index'):
+        index.ensure(cache.scene_key(scene),
+                     lambda: [obj for obj in scene.objects if obj.type in ClippingAssistant.ob_type])
+    return index
+
+
+def visible_scene_clipping(context, region_3d, margin):
+    '''
+    Clipping from the scene objects inside the view frustum, used when nothing
+    is selected. The spatial index is kept between calls and refit from
+    depsgraph updates, only added or removed objects trigger a rebuild.
+    '''
+    fallback = view_range_clipping(region_3d.view_distance)
+    if not region_3d.is_perspective:
+        return fallback
+
+    index = ensure_scene_index(context.scene)
+
+    with profiling.span('frustum'):
+        slots = index.query(spatial.frustum_planes(region_3d.perspective_matrix, region_3d.view_matrix))
+    profiling.count('visible objects', len(slots))
+    if not len(slots):
+        return fallback
+
+    lo, hi = index.boxes(slots)
+    depths = bounds.view_depths(region_3d.view_matrix, bounds.box_corners(lo, hi).reshape(-1, 3))
+    return fit_depth_range(float(depths.min()), float(depths.max()), fallback, margin)
+
+
+def fit_depth_range(near_depth, far_depth, fallback, margin):
+    ''' Widen a view depth interval by the depth margin, fallback covers what lies behind the view. '''
+    if far_depth <= 0.0:
+        return fallback
+
+    maxClipping = far_depth * (1.0 + margin)
+    minClipping = near_depth * (1.0 - margin)
+    if minClipping <= 0.0:
+        minClipping = fallback[0]
+    minClipping = min(minClipping, maxClipping * 0.5)
+    return minClipping, maxClipping
+
+
+def view_range_clipping(view_distance):
+    ''' Default clipping based only on the view distance. '''
+    min_view_range = abs(view_distance / (1 + view_distance) / 10)
+    max_view_range = abs((1 + view_distance) * 10)
+    return min_view_range, max_view_range
+
+
+def clipping_from_dimensions(view_distance, min_dim_value, max_dim_value, selection_spread):
+    ''' Turn the reduced target dimensions into clip start and end distances. '''
+    min_view_range, max_view_range = view_range_clipping(view_distance)
+
     minClipping = (min_dim_value / 2) * min_view_range
     maxClipping = (max_dim_value + selection_spread) * 2 * max_view_range
-  
-    if prefs_.debug_output:
-        print(f"\nMin Clipping Calculation:")
-        print(f"  View Distance: {view_distance:.4f}")
-        print(f"  Min View Range: {min_view_range:.4f}")
-        print(f"  Min Dimension: {min_dim_value / 2:.4f}")
-        print(f"    -> Min Clipping:      {minClipping:.4f}")
-
-        print(f"\nMax Clipping Calculation:")
-        print(f"  View Distance: {view_distance:.4f}")
-        print(f"  Max View Range: {max_view_range:.4f}")
-        print(f"  Spread:        {selection_spread:.4f}")
-        print(f"  Max Dimension:    {max_dim_value:.4f}") # Use new variable name
-        print(f"    -> Max Clipping:      {maxClipping:.4f}")
-
-    if prefs_.debug_profiling:
-        start_time = profiler(start_time, "Calculated initial min/max clipping")
-    # --- End Clipping Calculation ---
-
-    if prefs_.debug_profiling:
-        start_time = profiler(start_time, "Finished calculate_clipping")
-        print('-' *40)
-
     return minClipping, maxClipping
 
 
+def update_clipping(context):
+    ''' Apply clipping for the current targets and refresh the Top Bar readout. '''
+    settings_ = current_settings()
+    with profiling.span('targets'):
+        target_objects = resolve_targets(context)
+    if not (target_objects or (context.active_object and context.active_object.type in ClippingAssistant.ob_type)
+            or settings_.visible_scene_clipping):
+        return
+    if settings_.debug_output:
+        print("Clipping Assistant: Auto Update applied to selected objects")   
+
+    apply_clipping(context, target_objects)
+
+    with profiling.span('redraw'):
+        if settings_.show_clipping_distance:
+            update_readout(context)
+        if settings_.redraw_method == 'FRAME_SET':
+            frame_set_redraw(context)
+        else:
+            request_header_redraw()
+
+
+def frame_set_redraw(context):
+    '''
+    Legacy refresh, re-evaluates the whole depsgraph on every update.
+    Kept to compare against the targeted header redraw.
+    '''
+    try:
+        for area in context.screen.areas:
+            if area.type == 'TOPBAR':
+                for region in area.regions:
+                    if region.type == 'HEADER': region.tag_redraw(); break
+                break
+        original_frame = context.scene.frame_current
+        context.scene.frame_set(original_frame + 0) # Force update by setting frame
+    except Exception as e:
+        print(f"WARNING: Clipping Assistant frame_set redraw hack failed - {e}") # Use WARNING for actual errors
+
+
+_header_redraw_pending = False
+
+def request_header_redraw():
+    '''
+    Tag the Top Bar headers for redraw on the next timer tick.
+    Tagging from inside the modal handler is not picked up reliably during
+    continuous navigation, a deferred tag is. Repeated requests before the
+    tick collapse into one.
+    '''
+    global _header_redraw_pending
+    if _header_redraw_pending:
+        return
+    _header_redraw_pending = True
+    bpy.app.timers.register(redraw_headers, first_interval=0.0)
+
+
+def redraw_headers():
+    ''' Timer callback, tags only the TOPBAR header regions of every window. '''
+    global _header_redraw_pending
+    _header_redraw_pending = False
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'TOPBAR':
+                for region in area.regions:
+                    if region.type == 'HEADER':
+                        region.tag_redraw()
+    return None
+
+
+def scheduled_update(window, area):
+    ''' Timer callback of the scheduler, timers run without a window in context. '''
+    if not clipping_active:
+        return
+    if area is not None and area.type == 'VIEW_3D':
+        override = bpy.context.temp_override(window=window, screen=window.screen, area=area)
+    else:
+        override = bpy.context.temp_override(window=window, screen=window.screen)
+    with override:
+        update_clipping(bpy.context)
+
+
 class ClippingAssistant(Operator):
     """
     Operator for managing automatic clipping distances in Blender.
@@ -382,8 +911,14 @@ class ClippingAssistant(Operator):
         else:
             
             print("Clipping Assistant: Enable Auto Update")
+            load_engine()
+            # Clip values may have been changed by hand while the assistant was off
+            cache.view_states.clear()
+            cache.write_elision.clear()
             wm.modal_handler_add(self)
             clipping_active = True
+            if current_settings().warmup:
+                bpy.app.timers.register(warmup, first_interval=0.0)
             # detect the mouse button used for selection, this causes conflicts in certain scenarios when interacting with gizmos with LMB  
             #   0 == LMB, 1 == RMB          
             active_keymap = bpy.context.preferences.keymap.active_keyconfig            
@@ -407,120 +942,220 @@ class ClippingAssistant(Operator):
     def cancel(self, context) -> None:
         global clipping_active   
         clipping_active = False     
+        scheduler.scheduler.cancel()
+        workers.bounds_worker.cancel()
         return None
 
     def modal(self, context, event): 
         global clipping_active
 
         if clipping_active:
-            redraw_needed = False # Flag to track if we need to redraw
             if (event.type in self.trigger_event_types
                 or event.ctrl or event.shift or event.alt):  
-                selected_objects = [obj for obj in context.selected_objects if obj.type in self.ob_type]
-                if selected_objects or (context.active_object and context.active_object.type in self.ob_type):
-                    if prefs().debug_output:
-                        print("Clipping Assistant: Auto Update applied to selected objects")   
-                        print('Event type:', event.type, event.value)
-
-                    apply_clipping(context)  
-                    redraw_needed = True # Mark that we need to redraw the Top Bar header
-
-            # Attempt to force redraw if clipping was applied
-            if redraw_needed:
-                # Standard redraw methods (like region.tag_redraw()) proved insufficient
-                # to reliably update the Top Bar during continuous events (scroll, pan).
-                # print(f"DEBUG: Redraw needed for event {event.type}. Applying frame_set hack.") # Keep for debugging if needed
-                try:
-                    # 1. Explicitly tag the header region (best practice, even if insufficient alone)
-                    for area in context.screen.areas:
-                        if area.type == 'TOPBAR':
-                            for region in area.regions:
-                                if region.type == 'HEADER': region.tag_redraw(); break
-                            break
-                    # 2. Apply the frame_set hack to force broader UI update
-                    original_frame = context.scene.frame_current
-                    context.scene.frame_set(original_frame + 0) # Force update by setting frame
-                except Exception as e:
-                    print(f"WARNING: Clipping Assistant frame_set redraw hack failed - {e}") # Use WARNING for actual errors
+                settings_ = current_settings()
+                if settings_.debug_output:
+                    print('Event type:', event.type, event.value)
+                if trace.recorder.active:
+                    trace.recorder.record(event, resolve_targets(context), context.active_object, view_spaces(context))
+
+                interval = settings_.update_interval / 1000.0
+                if interval > 0.0:
+                    # Collapse the burst of events into one trailing update
+                    scheduler.scheduler.request(scheduled_update, context.window, context.area,
+                                                interval, settings_.max_update_latency / 1000.0)
+                else:
+                    update_clipping(context)
 
             return {'PASS_THROUGH'}
         else:
             print("Clipping Assistant: Stop auto update")  
             clipping_active = False           
+            scheduler.scheduler.cancel()
+            workers.bounds_worker.cancel()
             return {'FINISHED'}
         
 
 
-def profiler(start_time=None, message=None): 
-    """Measure and print elapsed time with 4 decimal precision."""
-    if prefs().debug_profiling is False:
-        return start_time  # Skip profiling if debug_profiling is disabled
+readout = "" # Top Bar clipping readout, formatted after each update
 
-    current_time = time.perf_counter()
-    if start_time is not None:
-        elapsed_time = current_time - start_time
-        print(f"{elapsed_time * 1000:.4f} ms << {message}")
-    else:
-        print(f"debug_profiling: {message}")
-    return current_time
+def update_readout(context):
+    ''' Format the clip range of the main 3D view in scene units for the Top Bar. '''
+    global readout
+    try:
+        scene = context.scene
+        unit_settings = scene.unit_settings
+        scale_length = scene.unit_settings.scale_length
+
+        if unit_settings.system == 'METRIC':
+            scale_length *= 100.0
+        elif unit_settings.system == 'IMPERIAL':
+            scale_length *= 3.28084
+
+        # Report the main 3D view of this screen, not whichever comes last
+        view_areas = [area for area in context.screen.areas if area.type == 'VIEW_3D']
+        clip_start_value = clip_end_value = None
+        if view_areas:
+            space = max(view_areas, key=lambda area: area.width * area.height).spaces.active
+            clip_start_value = space.clip_start * scale_length
+            clip_end_value = space.clip_end * scale_length
 
+        readout = f"[{clip_start_value:.2f} | {clip_end_value:.2f}]" if clip_start_value and clip_end_value else ""
+
+    except (KeyError, IndexError, AttributeError):
+        readout = "Clip: N/A"
 
 
 def draw_button(self, context): 
-    global clipping_active   
+    ''' Runs on every Top Bar redraw, only shows the readout formatted by update_readout. '''
     if context.region.alignment == 'RIGHT':
-        layout = self.layout
-        row = layout.row(align=True)   
-        
-        # Display the clip start and end values
-        if clipping_active:
-            if prefs().show_clipping_distance:
-                try:                                
-                    scene = context.scene
-                    unit_settings = scene.unit_settings
-                    scale_length = scene.unit_settings.scale_length
-
-                    if unit_settings.system == 'METRIC':
-                        scale_length *= 100.0
-                    elif unit_settings.system == 'IMPERIAL':
-                        scale_length *= 3.28084
-
-                    for area in context.screen.areas:
-                        if area.type == 'VIEW_3D':
-                            space = area.spaces.active
-                            clip_start_value = space.clip_start * scale_length
-                            clip_end_value = space.clip_end * scale_length
-                    
-                    if clip_start_value and clip_end_value:
-                        row = layout.row(align=True)
-                        row.label(text=f"[{clip_start_value:.2f} | {clip_end_value:.2f}]")
-
-                except (KeyError, IndexError, AttributeError):
-                    layout.row(align=True).label(text="Clip: N/A")
-                
-        row.operator(
-            operator="scene.clipping_assistant", 
-            text="", 
-            icon='VIEW_CAMERA', 
-            emboss=True, 
-            depress=clipping_active
-        )
+        with profiling.span('header'):
+            layout = self.layout
+            row = layout.row(align=True)
+            if clipping_active and readout:
+                layout.row(align=True).label(text=readout)
+            row.operator(
+                operator="scene.clipping_assistant", 
+                text="", 
+                icon='VIEW_CAMERA', 
+                emboss=True, 
+                depress=clipping_active
+            )
 
 
 classes = (
     ClippingAssistant,
+    operators.ClippingAssistant_BakeCamera,
+    profiling.ClippingAssistant_ExportProfile,
+    profiling.ClippingAssistant_ResetProfile,
+    operators.ClippingAssistant_RecordTrace,
+    operators.ClippingAssistant_StopTrace,
+    operators.ClippingAssistant_ReplayTrace,
     preferences.ClippingAssistant_Preferences,
 )
 
 
+@persistent
+def depsgraph_update_handler(scene, depsgraph):
+    ''' Invalidate cached clipping and mark moved or changed objects dirty. '''
+    cache.note_depsgraph_update(depsgraph)
+    cache.note_scene_update(scene, depsgraph)
+    bounds_store.store.note_depsgraph_update(depsgraph)
+    spatial.scene_index.note_depsgraph_update(depsgraph)
+    instances.instance_bounds.note_depsgraph_update(depsgraph)
+    surface.surface_trees.note_depsgraph_update(depsgraph)
+    blend_cache.datablock_bounds.note_depsgraph_update(depsgraph)
+    components.selected_components.note_depsgraph_update(depsgraph)
+    hierarchy.hierarchy.note_depsgraph_update(depsgraph)
+
+
+@persistent
+def save_pre_handler(*args):
+    '''
+    Store the local bounds of the mesh datablocks with the file. Installed on
+    registration: without the engine edits are not tracked and bounds saved
+    earlier are removed instead of carried along.
+    '''
+    if engine_loaded and blend_cache.enabled:
+        blend_cache.datablock_bounds.save()
+        return
+    text = bpy.data.texts.get(SAVED_BOUNDS_TEXT)
+    if text is not None:
+        bpy.data.texts.remove(text)
+
+
+@persistent
+def load_post_handler(*args):
+    ''' Pointers of the previous file are meaningless now, saved bounds load lazily on first use. '''
+    clear_caches()
+
+
+@persistent
+def undo_post_handler(*args):
+    '''
+    Undo and redo recreate the datablocks, object references and pointers
+    held by the caches are invalid. Meshes edited since loading stay marked,
+    the restored state is not the saved one either.
+    '''
+    edited = blend_cache.datablock_bounds.edited
+    clear_caches()
+    blend_cache.datablock_bounds.edited.update(edited)
+
+
+def camera_render_clipping(camera, target_objects, margin):
+    ''' Clip start and end for a camera without any 3D view, depth fit with the view distance fallback. '''
+    interval = render.camera_depth_interval(camera, target_objects)
+    if interval is None:
+        return None
+    near_depth, far_depth, view_distance, aggregate = interval
+    fallback = clipping_from_measurement(view_distance, measure_aabb(aggregate))
+    return fit_depth_range(near_depth, far_depth, fallback, margin)
+
+
+@persistent
+def frame_change_handler(scene, depsgraph):
+    ''' Fit the scene camera clipping on every frame, for renders where the modal operator never runs. '''
+    settings_ = current_settings()
+    if settings_ is None or not settings_.render_clipping:
+        return
+    with profiling.span('render'):
+        state = (scene.as_pointer(), cache.update_counter, settings_.depth_margin)
+        margin = settings_.depth_margin
+        render.frame_change_clipping(scene, state, ClippingAssistant.ob_type,
+                                     lambda camera, target_objects: camera_render_clipping(camera, target_objects, margin),
+                                     log=bpy.app.background or settings_.debug_output)
+
+
+def clear_caches():
+    # A reduction in flight was keyed on pointers that may be gone
+    workers.bounds_worker.cancel()
+    cache.clipping_cache.clear()
+    cache.view_states.clear()
+    cache.write_elision.clear()
+    bounds_store.store.clear()
+    spatial.scene_index.clear()
+    instances.instance_bounds.clear()
+    render.clear()
+    surface.surface_trees.clear()
+    blend_cache.datablock_bounds.clear()
+    components.selected_components.clear()
+    hierarchy.hierarchy.clear()
+
+
 def register():   
-    global _cached_prefs
+    global _cached_prefs, _pipeline
+    start = time.perf_counter()
     _cached_prefs = None # Reset cache on registration
+    _pipeline = None
     [bpy.utils.register_class(c) for c in classes]  
     bpy.types.TOPBAR_HT_upper_bar.prepend(draw_button)
+    bpy.app.handlers.save_pre.append(save_pre_handler)
+    active_pipeline() # Snapshot the preferences, also syncs profiling and loads the engine if render clipping needs it
+    profiling.record('register', time.perf_counter() - start)
     # Note: The startup_check timer logic from the previous request should be added here if used.
 
 def unregister():
+    global engine_loaded
+    scheduler.scheduler.cancel()
+    if engine_loaded:
+        workers.bounds_worker.shutdown()
+        trace.recorder.stop()
+        engine_loaded = False # Handlers are removed below, a new registration installs them again
+    if bpy.app.timers.is_registered(redraw_headers):
+        bpy.app.timers.unregister(redraw_headers)
+    if bpy.app.timers.is_registered(warmup):
+        bpy.app.timers.unregister(warmup)
+    if depsgraph_update_handler in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(depsgraph_update_handler)
+    if frame_change_handler in bpy.app.handlers.frame_change_post:
+        bpy.app.handlers.frame_change_post.remove(frame_change_handler)
+    if save_pre_handler in bpy.app.handlers.save_pre:
+        bpy.app.handlers.save_pre.remove(save_pre_handler)
+    if load_post_handler in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(load_post_handler)
+    if undo_post_handler in bpy.app.handlers.undo_post:
+        bpy.app.handlers.undo_post.remove(undo_post_handler)
+    if undo_post_handler in bpy.app.handlers.redo_post:
+        bpy.app.handlers.redo_post.remove(undo_post_handler)
     bpy.types.TOPBAR_HT_upper_bar.remove(draw_button)
     [bpy.utils.unregister_class(c) for c in classes]
 
@@ -0,0 +1,147 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+'''
+Bake per-frame camera clipping into F-curves.
+
+The frame range is stepped once, collecting the camera matrix and the
+enclosing box of the targets per frame. All clip values are then computed
+in one vectorized pass and written as simplified linear keyframes on the
+camera data, so rendering needs no Python at all.
+'''
+
+import bpy
+import numpy
+from . import bounds
+from . import cache
+
+
+def sample_frames(scene, camera, target_objects, frames):
+    '''
+    Step the scene through frames and collect (camera_matrices (F, 4, 4),
+    lo (F, 3), hi (F, 3), min_extent (F,)) of the targets.
+    '''
+    count = len(frames)
+    matrices = numpy.empty((count, 4, 4))
+    lo = numpy.empty((count, 3))
+    hi = numpy.empty((count, 3))
+    min_extent = numpy.empty(count)
+
+    for index, frame in enumerate(frames):
+        scene.frame_set(frame)
+        matrices[index] = bounds.gather_matrices([camera], 1)[0]
+        lo[index], hi[index], min_extent[index] = bounds.aggregate_aabbs(*bounds.world_aabbs(target_objects))
+    return matrices, lo, hi, min_extent
+
+
+def clip_ranges(camera_matrices, lo, hi, min_extent, margin):
+    '''
+    Clip start and end for every frame at once. Depths of the 8 box corners
+    along each camera's view axis give the tight interval, frames where the
+    camera is inside the box fall back to the view distance rule for the start.
+    '''
+    view_matrices = bounds.camera_view_matrices(camera_matrices)
+    forward = -view_matrices[:, 2, :]
+    corners = bounds.box_corners(lo, hi)
+    depths = numpy.einsum('fkj,fj->fk', corners, forward[:, :3]) + forward[:, 3, None]
+    near = depths.min(axis=1) * (1.0 - margin)
+    far = numpy.maximum(depths.max(axis=1) * (1.0 + margin), 1e-3)
+
+    center = (lo + hi) * 0.5 - camera_matrices[:, :3, 3]
+    view_distance = numpy.sqrt(numpy.einsum('fj,fj->f', center, center))
+    extent = numpy.where(numpy.isfinite(min_extent), min_extent, bounds.DEFAULT_MIN_DIMENSION)
+    fallback = extent / 2 * numpy.abs(view_distance / (1 + view_distance) / 10)
+
+    near = numpy.where(near > 0.0, near, fallback)
+    return numpy.minimum(near, far * 0.5), far
+
+
+def simplify(frames, values, tolerance):
+    '''
+    Indices of the keys needed so linear interpolation stays within
+    tolerance (relative) of every sample, Ramer-Douglas-Peucker style.
+    '''
+    count = len(values)
+    if count <= 2:
+        return numpy.arange(count)
+
+    keep = numpy.zeros(count, dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        inner = numpy.arange(first + 1, last)
+        t = (frames[inner] - frames[first]) / (frames[last] - frames[first])
+        interpolated = values[first] + t * (values[last] - values[first])
+        error = numpy.abs(interpolated - values[inner]) / numpy.maximum(numpy.abs(values[inner]), 1e-12)
+        worst = int(error.argmax())
+        if error[worst] > tolerance:
+            split = int(inner[worst])
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return numpy.flatnonzero(keep)
+
+
+def write_fcurve(action, data_path, frames, values):
+    ''' Replace the F-curve of data_path with linear keys in one bulk write. '''
+    fcurve = action.fcurves.find(data_path)
+    if fcurve is None:
+        fcurve = action.fcurves.new(data_path)
+    fcurve.keyframe_points.clear()
+    fcurve.keyframe_points.add(len(frames))
+    co = numpy.empty(len(frames) * 2, dtype=numpy.float32)
+    co[0::2] = frames
+    co[1::2] = values
+    fcurve.keyframe_points.foreach_set('co', co)
+    fcurve.keyframe_points.foreach_set('interpolation', [1] * len(frames)) # 'LINEAR'
+    fcurve.update()
+    return fcurve
+
+
+def bake_camera(scene, camera, target_objects, frame_start, frame_end, tolerance, margin):
+    '''
+    Key clip_start and clip_end of camera on every frame of the range.
+    Returns the number of frames sampled and of keys written.
+    '''
+    frames = numpy.arange(frame_start, frame_end + 1)
+    original_frame = scene.frame_current
+    try:
+        samples = sample_frames(scene, camera, target_objects, frames)
+    finally:
+        scene.frame_set(original_frame)
+
+    starts, ends = clip_ranges(*samples, margin)
+
+    data = camera.data
+    if data.animation_data is None:
+        data.animation_data_create()
+    action = data.animation_data.action
+    if action is None:
+        action = data.animation_data.action = bpy.data.actions.new(f"{data.name}Clipping")
+
+    keys = 0
+    for data_path, values in (('clip_start', starts), ('clip_end', ends)):
+        kept = simplify(frames, values, tolerance)
+        write_fcurve(action, data_path, frames[kept], values[kept])
+        keys += len(kept)
+    # The keys drive the clip values from now on, the last viewport write no longer holds
+    cache.write_elision.forget(data, 'clip_start')
+    return len(frames), keys
@@ -0,0 +1,110 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+'''
+Headless benchmark and accuracy suite.
+
+Run from the repository root with `python -m pytest benchmarks -q -s`.
+The 1M object selections only run with CLIPPING_BENCH_LARGE=1 set.
+'''
+
+import importlib.util
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+import standins
+
+PACKAGE_NAME = "clipping_assistant"
+PACKAGE_DIR = Path(__file__).resolve().parent.parent
+
+SIZES = [1, 100, 10_000]
+if os.environ.get("CLIPPING_BENCH_LARGE"):
+    SIZES.append(1_000_000)
+
+_results = []
+
+
+def _load_addon():
+    bpy = standins.install(PACKAGE_NAME)
+    spec = importlib.util.spec_from_file_location(
+        PACKAGE_NAME, PACKAGE_DIR / "__init__.py", submodule_search_locations=[str(PACKAGE_DIR)])
+    addon = importlib.util.module_from_spec(spec)
+    sys.modules[PACKAGE_NAME] = addon
+    spec.loader.exec_module(addon)
+    # The suite exercises the computational modules directly, load them as the first toggle would
+    addon.load_engine()
+    return bpy, addon
+
+
+bpy, addon = _load_addon()
+
+
+@pytest.fixture
+def prefs(monkeypatch):
+    ''' Default preferences, synchronous updates so modal dispatch does the work inline. '''
+    values = standins.preference_defaults(addon.preferences.ClippingAssistant_Preferences)
+    monkeypatch.setattr(addon, "_cached_prefs", values)
+    values.update_interval = 0.0
+    addon.cache.clipping_cache.clear()
+    addon.cache.view_states.clear()
+    addon.cache.write_elision.clear()
+    addon.bounds_store.store.clear()
+    return values
+
+
+@pytest.fixture
+def make_context():
+    ''' Build a stand-in context and make it bpy.context for the duration of the test. '''
+    def factory(objects, **kwargs):
+        context = standins.Context(objects, **kwargs)
+        bpy.context = context
+        return context
+    yield factory
+    bpy.context = None
+
+
+@pytest.fixture
+def bench(request):
+    ''' Time a callable a few times and keep the median for the summary table. '''
+    def run(label, function, repeat=5):
+        timings = []
+        result = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = function()
+            timings.append(time.perf_counter() - start)
+        _results.append((request.node.name, label, statistics.median(timings) * 1000.0, min(timings) * 1000.0))
+        run.best[label] = min(timings) * 1000.0
+        return result
+    # Best time in milliseconds per label, for tests comparing two paths
+    run.best = {}
+    return run
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _results:
+        return
+    terminalreporter.section("clipping benchmarks")
+    terminalreporter.write_line(f"{'benchmark':<64} {'median ms':>12} {'best ms':>12}")
+    for name, label, median, best in _results:
+        terminalreporter.write_line(f"{(name + ' ' + label)[:64]:<64} {median:>12.4f} {best:>12.4f}")
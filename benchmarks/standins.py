@@ -0,0 +1,604 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+'''
+Lightweight stand-ins for bpy and mathutils.
+
+Just enough of the API for the add-on to import and for the clipping
+pipeline to run on plain CPython, no Blender required.
+'''
+
+import contextlib
+import math
+import random
+import sys
+import types
+from itertools import product
+
+
+class Vector(tuple):
+    ''' mathutils.Vector stand-in, ordered by length like the real one. '''
+
+    def __new__(cls, values=(0.0, 0.0, 0.0)):
+        return tuple.__new__(cls, (float(value) for value in values))
+
+    def __add__(self, other):
+        return Vector(a + b for a, b in zip(self, other))
+
+    def __sub__(self, other):
+        return Vector(a - b for a, b in zip(self, other))
+
+    def __mul__(self, scalar):
+        return Vector(a * scalar for a in self)
+
+    @property
+    def length(self):
+        return math.sqrt(sum(a * a for a in self))
+
+    @property
+    def length_squared(self):
+        return sum(a * a for a in self)
+
+    def __lt__(self, other):
+        return self.length_squared < Vector(other).length_squared
+
+    def __gt__(self, other):
+        return self.length_squared > Vector(other).length_squared
+
+    def __le__(self, other):
+        return self.length_squared <= Vector(other).length_squared
+
+    def __ge__(self, other):
+        return self.length_squared >= Vector(other).length_squared
+
+
+class Matrix(tuple):
+    ''' Row-major 4x4 mathutils.Matrix stand-in. '''
+
+    def __new__(cls, rows=None):
+        if rows is None:
+            rows = [[float(i == j) for j in range(4)] for i in range(4)]
+        return tuple.__new__(cls, (tuple(float(v) for v in row) for row in rows))
+
+    @property
+    def translation(self):
+        return Vector(row[3] for row in self[:3])
+
+    def __matmul__(self, other):
+        if len(other) == 3:
+            return Vector(sum(row[j] * (other[j] if j < 3 else 1.0) for j in range(4)) for row in self[:3])
+        return Matrix([[sum(self[i][k] * other[k][j] for k in range(4)) for j in range(4)] for i in range(4)])
+
+
+def trs_matrix(location, rotation_z=0.0, scale=(1.0, 1.0, 1.0)):
+    c, s = math.cos(rotation_z), math.sin(rotation_z)
+    return Matrix([
+        [c * scale[0], -s * scale[1], 0.0, location[0]],
+        [s * scale[0], c * scale[1], 0.0, location[1]],
+        [0.0, 0.0, scale[2], location[2]],
+        [0.0, 0.0, 0.0, 1.0],
+        ])
+
+
+class Data:
+    ''' Object data stand-in (mesh, curve, ...). '''
+
+    def __init__(self, name, half_size):
+        self.name = name
+        self.half_size = half_size
+
+    def as_pointer(self):
+        return id(self)
+
+
+class Vertices(list):
+    ''' MeshVertices stand-in with the flat foreach_get of bpy_prop_collection. '''
+
+    def foreach_get(self, attribute, buffer):
+        values = [getattr(vertex, attribute) for vertex in self]
+        if attribute == 'co':
+            values = [component for co in values for component in co]
+        buffer[:] = values
+
+
+class Mesh(Data):
+    ''' Mesh datablock stand-in, a box of `half_size` given as its 8 vertices. '''
+
+    def __init__(self, name, half_size):
+        super().__init__(name, half_size)
+        self.name_full = name
+        self.shape_keys = None
+        self.vertices = Vertices(types.SimpleNamespace(co=Vector(tuple(sign * h for sign, h in zip(signs, half_size))),
+                                                       select=False)
+                                 for signs in product((-1.0, 1.0), repeat=3))
+        self.edges = [None] * 12
+        self.polygons = [None] * 6
+
+    @property
+    def total_vert_sel(self):
+        return sum(vertex.select for vertex in self.vertices)
+
+
+class ScanVertex:
+    ''' Vertex of a ScanMesh, a view into its coordinate array. '''
+    __slots__ = ('mesh', 'index')
+
+    def __init__(self, mesh, index):
+        self.mesh = mesh
+        self.index = index
+
+    @property
+    def co(self):
+        return Vector(float(value) for value in self.mesh.co[self.index])
+
+    @co.setter
+    def co(self, value):
+        self.mesh.co[self.index] = tuple(value)
+        self.mesh.unload()
+
+
+class ScanVertices:
+    ''' MeshVertices stand-in backed by the coordinate array of a ScanMesh. '''
+
+    def __init__(self, mesh):
+        self.mesh = mesh
+
+    def __len__(self):
+        return len(self.mesh.co)
+
+    def __getitem__(self, index):
+        return ScanVertex(self.mesh, index % len(self))
+
+    def foreach_get(self, attribute, buffer):
+        buffer[:] = self.mesh.co.ravel()
+
+
+class ScanMesh(Data):
+    '''
+    Mesh datablock stand-in with `count` vertices spread inside a box of
+    `half_size`. As after loading a file in Blender, its bounds are only
+    computed from the vertices when the bound box is first asked for.
+    '''
+
+    def __init__(self, name, half_size, count, seed=0):
+        # Imported here, the registration benchmark checks that nothing loads NumPy early
+        import numpy
+        super().__init__(name, half_size)
+        self.name_full = name
+        self.shape_keys = None
+        half = numpy.array(half_size, dtype=numpy.float32)
+        self.co = numpy.random.default_rng(seed).uniform(-1.0, 1.0, (count, 3)).astype(numpy.float32) * half
+        self.co[:2] = (-half, half)
+        self.vertices = ScanVertices(self)
+        self.edges = range(count * 3)
+        self.polygons = range(count)
+        self.bounds = None
+
+    def unload(self):
+        ''' Forget the computed bounds, as reopening the file or editing the mesh does. '''
+        self.bounds = None
+
+    @property
+    def bound_box(self):
+        if self.bounds is None:
+            self.bounds = (self.co.min(axis=0).tolist(), self.co.max(axis=0).tolist())
+        return [tuple(self.bounds[side][axis] for axis, side in enumerate(sides))
+                for sides in product((0, 1), repeat=3)]
+
+
+class Text:
+    def __init__(self, name):
+        self.name = name
+        self.body = ""
+        self.use_fake_user = False
+
+    def as_string(self):
+        return self.body
+
+    def from_string(self, body):
+        self.body = body
+
+
+class Texts(dict):
+    ''' bpy.data.texts stand-in. '''
+
+    def new(self, name):
+        text = self[name] = Text(name)
+        return text
+
+    def remove(self, text):
+        del self[text.name]
+
+
+class Object:
+    ''' bpy.types.Object stand-in with consistent location, dimensions and bounds. '''
+
+    def __init__(self, name, type='MESH', location=(0.0, 0.0, 0.0), half_size=(0.5, 0.5, 0.5),
+                 rotation_z=0.0, scale=(1.0, 1.0, 1.0), data=None):
+        self.name = name
+        self.type = type
+        self.data = data
+        self.parent = None
+        self.children = ()
+        self.mode = 'OBJECT'
+        self.selected = False
+        self.modifiers = []
+        self.instance_type = 'NONE'
+        self.instance_collection = None
+        self.set_transform(location, half_size, rotation_z, scale)
+
+    def set_transform(self, location, half_size=None, rotation_z=0.0, scale=(1.0, 1.0, 1.0)):
+        if half_size is None:
+            half_size = self._half_size
+        self._half_size = half_size
+        self.location = Vector(location)
+        self.matrix_world = trs_matrix(location, rotation_z, scale)
+        self.bound_box = [tuple(sign * h for sign, h in zip(signs, half_size))
+                          for signs in product((-1.0, 1.0), repeat=3)]
+        self.dimensions = Vector(2.0 * h * abs(s) for h, s in zip(half_size, scale))
+
+    @property
+    def original(self):
+        return self
+
+    @property
+    def is_instancer(self):
+        return self.instance_type != 'NONE'
+
+    def as_pointer(self):
+        return id(self)
+
+    def select_get(self):
+        return self.selected
+
+    def evaluated_get(self, depsgraph):
+        return self
+
+    def update_from_editmode(self):
+        return self.mode == 'EDIT'
+
+
+class ScanObject(Object):
+    ''' Object of a ScanMesh, its bound box is the one of the mesh. '''
+
+    @property
+    def bound_box(self):
+        return self.data.bound_box
+
+    @bound_box.setter
+    def bound_box(self, corners):
+        pass # Follows the mesh
+
+
+class TemporaryObject(Object):
+    ''' Object of a geometry nodes geometry instance, its original is the instancer. '''
+
+    def __init__(self, name, instancer, data, half_size):
+        super().__init__(name, data=data, half_size=half_size)
+        self.instancer = instancer
+
+    @property
+    def original(self):
+        return self.instancer
+
+
+class BVHTree:
+    ''' mathutils.bvhtree.BVHTree stand-in, the surface is the local bound box of the object. '''
+
+    builds = 0
+
+    def __init__(self, lo, hi):
+        self.lo = lo
+        self.hi = hi
+
+    @classmethod
+    def FromObject(cls, obj, depsgraph):
+        cls.builds += 1
+        corners = obj.bound_box
+        return cls([min(c[axis] for c in corners) for axis in range(3)],
+                   [max(c[axis] for c in corners) for axis in range(3)])
+
+    def find_nearest(self, point):
+        clamped = [min(max(p, l), h) for p, l, h in zip(point, self.lo, self.hi)]
+        if clamped == list(point):
+            # Inside the box, the nearest surface point is on the closest face
+            gaps = [(p - l, axis, l) for axis, (p, l) in enumerate(zip(point, self.lo))]
+            gaps += [(h - p, axis, h) for axis, (p, h) in enumerate(zip(point, self.hi))]
+            distance, axis, value = min(gaps)
+            clamped[axis] = value
+        location = Vector(clamped)
+        return location, None, 0, (location - Vector(point)).length
+
+
+class Region3D:
+    def __init__(self, view_distance=10.0):
+        self.view_distance = view_distance
+        self.view_matrix = Matrix([[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 1, -view_distance], [0, 0, 0, 1]])
+        self.window_matrix = Matrix()
+        self.perspective_matrix = self.view_matrix
+        self.is_perspective = True
+
+
+class SpaceView3D:
+    def __init__(self, view_distance=10.0):
+        self.region_3d = Region3D(view_distance)
+        self.clip_start = 0.01
+        self.clip_end = 1000.0
+        self.camera = None
+        self.lens = 50.0
+
+    def as_pointer(self):
+        return id(self)
+
+
+class Region:
+    def __init__(self, type, alignment='NONE'):
+        self.type = type
+        self.alignment = alignment
+
+    def tag_redraw(self):
+        pass
+
+
+class Area:
+    def __init__(self, type, space=None):
+        self.type = type
+        self.width = 800
+        self.height = 600
+        self.spaces = types.SimpleNamespace(active=space)
+        self.regions = [Region('HEADER'), Region('WINDOW')]
+
+    def tag_redraw(self):
+        pass
+
+
+class Layout:
+    ''' UILayout stand-in, rows are the layout itself and labels are kept. '''
+
+    def __init__(self):
+        self.labels = []
+
+    def row(self, align=False):
+        return self
+
+    def column(self, align=False):
+        return self
+
+    def box(self):
+        return self
+
+    def prop(self, data, property, **options):
+        pass
+
+    def label(self, text=""):
+        self.labels.append(text)
+
+    def operator(self, operator, **options):
+        pass
+
+
+class Event:
+    def __init__(self, type='WHEELUPMOUSE', value='PRESS', ctrl=False, shift=False, alt=False):
+        self.type = type
+        self.value = value
+        self.ctrl = ctrl
+        self.shift = shift
+        self.alt = alt
+
+
+class Struct(types.SimpleNamespace):
+    ''' Plain RNA struct stand-in (scene.eevee, camera data, ...). '''
+
+    def as_pointer(self):
+        return id(self)
+
+
+class Scene:
+    def __init__(self, objects):
+        self.objects = objects
+        self.frame_current = 1
+        self.camera = None
+        self.timeline_markers = []
+        self.eevee = Struct(volumetric_start=0.1, volumetric_end=100.0)
+        self.unit_settings = types.SimpleNamespace(system='METRIC', scale_length=1.0)
+
+    def frame_set(self, frame):
+        self.frame_current = frame
+
+    def as_pointer(self):
+        return id(self)
+
+
+class ObjectInstance:
+    ''' depsgraph.object_instances entry, an instance of prototype placed by parent. '''
+
+    def __init__(self, parent, prototype, matrix_world):
+        self.is_instance = True
+        self.parent = parent
+        self.object = prototype
+        self.matrix_world = matrix_world
+
+
+class Depsgraph:
+    def __init__(self, object_instances=()):
+        self.object_instances = list(object_instances)
+        self.updates = []
+
+
+class Context:
+    ''' bpy.context stand-in holding a scene, a selection and one or more 3D views. '''
+
+    def __init__(self, objects, selected=None, active=None, views=1, view_distance=10.0):
+        self.scene = Scene(objects)
+        self.selected_objects = list(objects if selected is None else selected)
+        self.active_object = active
+        self.mode = 'OBJECT'
+        self.view_areas = [Area('VIEW_3D', SpaceView3D(view_distance)) for _ in range(views)]
+        self.screen = types.SimpleNamespace(areas=[Area('TOPBAR')] + self.view_areas)
+        self.window = types.SimpleNamespace(screen=self.screen)
+        self.window_manager = types.SimpleNamespace(windows=[self.window], modal_handler_add=lambda operator: None,
+                                                    keyconfigs={'Blender': types.SimpleNamespace(preferences=None)})
+        self.preferences = types.SimpleNamespace(keymap=types.SimpleNamespace(active_keyconfig='Blender'))
+        self.area = self.view_areas[0]
+        self.view_layer = types.SimpleNamespace(objects=objects)
+        self.depsgraph = Depsgraph()
+
+    def evaluated_depsgraph_get(self):
+        return self.depsgraph
+
+    @property
+    def objects_in_mode(self):
+        return [obj for obj in self.view_layer.objects if obj.mode == self.mode.split('_')[0]]
+
+    def temp_override(self, **kwargs):
+        return contextlib.nullcontext()
+
+    @property
+    def spaces(self):
+        return [area.spaces.active for area in self.view_areas]
+
+
+def make_objects(count, seed=0, empties=0.0, extent=1000.0):
+    '''
+    Scattered objects with random size, rotation and scale. `empties` is the
+    share of zero-dimension EMPTY objects mixed into the selection.
+    '''
+    rng = random.Random(seed)
+    objects = []
+    for index in range(count):
+        location = (rng.uniform(-extent, extent), rng.uniform(-extent, extent), rng.uniform(-extent, extent))
+        if rng.random() < empties:
+            objects.append(Object(f"Empty.{index}", 'EMPTY', location, half_size=(0.0, 0.0, 0.0)))
+            continue
+        half_size = (rng.uniform(0.01, 5.0), rng.uniform(0.01, 5.0), rng.uniform(0.01, 5.0))
+        scale = (rng.uniform(0.5, 2.0),) * 3
+        objects.append(Object(f"Object.{index}", 'MESH', location, half_size,
+                              rotation_z=rng.uniform(0.0, math.pi), scale=scale))
+    return objects
+
+
+class _Timers:
+    ''' bpy.app.timers stand-in, callbacks are collected and can be run by hand. '''
+
+    def __init__(self):
+        self.registered = []
+
+    def register(self, function, first_interval=0.0, persistent=False):
+        if function not in self.registered:
+            self.registered.append(function)
+
+    def unregister(self, function):
+        self.registered.remove(function)
+
+    def is_registered(self, function):
+        return function in self.registered
+
+    def run_all(self):
+        ''' Run pending callbacks once, re-queueing those that ask to be called again. '''
+        pending, self.registered = self.registered, []
+        for function in pending:
+            if function() is not None:
+                self.registered.append(function)
+
+
+def _property(**options):
+    return options
+
+
+class _Base:
+    ''' Base class stand-in for Operator, AddonPreferences, Panel, ... '''
+
+    def report(self, level, message):
+        pass
+
+
+def install(package_name):
+    '''
+    Put bpy, bpy_extras and mathutils stand-ins into sys.modules.
+    Returns the fake bpy module, bpy.context is set by the caller.
+    '''
+    bpy = types.ModuleType('bpy')
+    bpy.types = types.ModuleType('bpy.types')
+    for name in ('Operator', 'AddonPreferences', 'Panel', 'PropertyGroup', 'Menu', 'Header'):
+        setattr(bpy.types, name, type(name, (_Base,), {}))
+    bpy.types.Object = Object
+    bpy.types.TOPBAR_HT_upper_bar = types.SimpleNamespace(prepend=lambda f: None, remove=lambda f: None)
+
+    bpy.props = types.ModuleType('bpy.props')
+    for name in ('BoolProperty', 'FloatProperty', 'IntProperty', 'EnumProperty', 'StringProperty',
+                 'PointerProperty', 'CollectionProperty', 'FloatVectorProperty'):
+        setattr(bpy.props, name, _property)
+
+    bpy.app = types.ModuleType('bpy.app')
+    bpy.app.background = True
+    bpy.app.version = (4, 2, 0)
+    bpy.app.timers = _Timers()
+    bpy.app.handlers = types.ModuleType('bpy.app.handlers')
+    bpy.app.handlers.persistent = lambda function: function
+    for name in ('depsgraph_update_post', 'frame_change_pre', 'frame_change_post',
+                 'load_post', 'save_pre', 'undo_post', 'redo_post', 'render_pre', 'render_post'):
+        setattr(bpy.app.handlers, name, [])
+
+    bpy.utils = types.SimpleNamespace(register_class=lambda c: None, unregister_class=lambda c: None)
+    bpy.data = types.SimpleNamespace(objects=[], cameras={}, texts=Texts())
+    bpy.context = None
+
+    bpy_extras = types.ModuleType('bpy_extras')
+    bpy_extras.io_utils = types.ModuleType('bpy_extras.io_utils')
+    bpy_extras.io_utils.ExportHelper = type('ExportHelper', (), {})
+    bpy_extras.io_utils.ImportHelper = type('ImportHelper', (), {})
+
+    mathutils = types.ModuleType('mathutils')
+    mathutils.Vector = Vector
+    mathutils.Matrix = Matrix
+    mathutils.bvhtree = types.ModuleType('mathutils.bvhtree')
+    mathutils.bvhtree.BVHTree = BVHTree
+
+    sys.modules.update({
+        'bpy': bpy,
+        'bpy.types': bpy.types,
+        'bpy.props': bpy.props,
+        'bpy.app': bpy.app,
+        'bpy.app.handlers': bpy.app.handlers,
+        'bpy_extras': bpy_extras,
+        'bpy_extras.io_utils': bpy_extras.io_utils,
+        'mathutils': mathutils,
+        'mathutils.bvhtree': mathutils.bvhtree,
+        })
+    return bpy
+
+
+class Preferences:
+    ''' AddonPreferences stand-in, assignments run the update callback of the property like RNA does. '''
+
+    def __init__(self, properties):
+        object.__setattr__(self, '_properties', properties)
+        for name, options in properties.items():
+            object.__setattr__(self, name, options.get('default'))
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        update = self._properties.get(name, {}).get('update')
+        if update is not None:
+            update(self, None)
+
+
+def preference_defaults(preferences_class):
+    ''' Preferences stand-in filled with the defaults declared on the AddonPreferences class. '''
+    return Preferences({name: options for name, options in preferences_class.__annotations__.items()
+                        if isinstance(options, dict)})
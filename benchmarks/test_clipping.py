@@ -0,0 +1,1075 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import base64
+import json
+import random
+import subprocess
+import sys
+import zlib
+
+import numpy
+import pytest
+
+import standins
+from conftest import SIZES, addon, bpy
+
+bounds = addon.bounds
+
+REL_TOLERANCE = 1e-9
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_calculate_clipping_matches_scalar(count, prefs, make_context, bench):
+    objects = standins.make_objects(count, seed=count, empties=0.1)
+    context = make_context(objects)
+
+    scalar = bench("scalar", lambda: addon.calculate_clipping(
+        context, 10.0, *addon.get_object_dimensions_and_locations(context, objects)))
+    vectorized = bench("vectorized", lambda: addon.calculate_clipping_vectorized(
+        context, 10.0, *bounds.gather_dimensions_and_locations(objects)))
+
+    assert vectorized == pytest.approx(scalar, rel=REL_TOLERANCE)
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_min_max_dimension_matches_scalar(count, prefs, make_context, bench):
+    objects = standins.make_objects(count, seed=count, empties=0.1)
+    dimensions = [obj.dimensions for obj in objects]
+    array = bounds.gather_dimensions_and_locations(objects)[0]
+
+    scalar_min = bench("get_min_dimension", lambda: addon.get_min_dimension(dimensions))
+    scalar_max = bench("get_max_dimension", lambda: addon.get_max_dimension(dimensions))
+    vector_min = bench("bounds.min_dimension", lambda: bounds.min_dimension(array))
+    vector_max = bench("bounds.max_dimension", lambda: bounds.max_dimension(array))
+
+    assert vector_min == pytest.approx(scalar_min, rel=REL_TOLERANCE)
+    assert vector_max == pytest.approx(scalar_max, rel=REL_TOLERANCE)
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_world_aabbs_match_corner_loop(count, prefs, bench):
+    objects = standins.make_objects(min(count, 10_000), seed=count)
+    lo, hi = bench("world_aabbs", lambda: bounds.world_aabbs(objects))
+
+    for index in range(0, len(objects), max(1, len(objects) // 50)):
+        obj = objects[index]
+        corners = [obj.matrix_world @ corner for corner in obj.bound_box]
+        expected_lo = [min(corner[axis] for corner in corners) for axis in range(3)]
+        expected_hi = [max(corner[axis] for corner in corners) for axis in range(3)]
+        assert lo[index] == pytest.approx(expected_lo, abs=1e-9)
+        assert hi[index] == pytest.approx(expected_hi, abs=1e-9)
+
+
+def test_zero_dimension_empties_fall_back_to_view_distance(prefs, make_context):
+    empties = [standins.Object(f"Empty.{i}", 'EMPTY', (i, 0, 0), half_size=(0, 0, 0)) for i in range(3)]
+    context = make_context(empties)
+    expected = addon.view_range_clipping(10.0)
+
+    assert addon.calculate_clipping(
+        context, 10.0, *addon.get_object_dimensions_and_locations(context, empties)) == pytest.approx(expected)
+    assert addon.calculate_clipping_vectorized(
+        context, 10.0, *bounds.gather_dimensions_and_locations(empties)) == pytest.approx(expected)
+
+
+def test_no_selection_leaves_views_untouched(prefs, make_context):
+    context = make_context([], selected=[], active=None)
+    space = context.spaces[0]
+    before = (space.clip_start, space.clip_end)
+
+    operator = addon.ClippingAssistant()
+    addon.clipping_active = True
+    try:
+        operator.modal(context, standins.Event('WHEELUPMOUSE'))
+    finally:
+        addon.clipping_active = False
+
+    assert (space.clip_start, space.clip_end) == before
+
+
+@pytest.mark.parametrize("bounds_mode", ['ORIGIN', 'AABB'])
+@pytest.mark.parametrize("count", SIZES)
+def test_modal_dispatch(count, bounds_mode, prefs, make_context, bench):
+    prefs.bounds_mode = bounds_mode
+    objects = standins.make_objects(count, seed=count, empties=0.1)
+    context = make_context(objects, active=objects[0])
+    space = context.spaces[0]
+    operator = addon.ClippingAssistant()
+    event = standins.Event('WHEELUPMOUSE')
+
+    def dispatch():
+        # Fresh fingerprint every round so the full pipeline runs
+        addon.cache.update_counter += 1
+        addon.cache.view_states.clear()
+        return operator.modal(context, event)
+
+    addon.clipping_active = True
+    try:
+        result = bench(f"modal {bounds_mode}", dispatch)
+    finally:
+        addon.clipping_active = False
+        bpy.app.timers.registered.clear()
+
+    assert result == {'PASS_THROUGH'}
+    assert 0.0 < space.clip_start < space.clip_end
+
+
+def test_depth_fit_encloses_targets(prefs, make_context):
+    prefs.clipping_mode = 'DEPTH_FIT'
+    objects = standins.make_objects(100, seed=3, extent=10.0)
+    context = make_context(objects, view_distance=100.0)
+    region_3d = context.spaces[0].region_3d
+
+    addon.apply_clipping(context, objects)
+
+    lo, hi = bounds.world_aabbs(objects)
+    corners = numpy.concatenate([bounds.box_corners(l, h) for l, h in zip(lo, hi)])
+    depths = bounds.view_depths(region_3d.view_matrix, corners)
+    space = context.spaces[0]
+    assert space.clip_start <= depths.min()
+    assert space.clip_end >= depths.max()
+    assert space.clip_end / space.clip_start < 100.0
+
+
+def perspective(view_matrix, near=0.1, far=10_000.0):
+    ''' OpenGL style projection (90 degree field of view) times view matrix. '''
+    projection = standins.Matrix([
+        [1, 0, 0, 0],
+        [0, 1, 0, 0],
+        [0, 0, -(far + near) / (far - near), -2 * far * near / (far - near)],
+        [0, 0, -1, 0],
+        ])
+    return numpy.asarray(projection) @ numpy.asarray(view_matrix)
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_scene_index_query_matches_brute_force(count, prefs, bench):
+    objects = standins.make_objects(count, seed=count, extent=500.0)
+    index = addon.spatial.SceneIndex()
+    bench("build", lambda: index.build(objects), repeat=1)
+
+    view_matrix = standins.Region3D(view_distance=200.0).view_matrix
+    planes = addon.spatial.frustum_planes(perspective(view_matrix), view_matrix)
+    slots = bench("query", lambda: index.query(planes))
+
+    lo, hi = index.boxes(numpy.arange(count))
+    outside, _ = addon.spatial.classify_boxes(lo, hi, planes)
+    assert sorted(slots.tolist()) == numpy.flatnonzero(~outside).tolist()
+
+    # Move a few objects and refit instead of rebuilding
+    moved = objects[::max(1, count // 10)]
+    for obj in moved:
+        obj.set_transform(obj.location + standins.Vector((0.0, 0.0, -300.0)))
+        index.dirty.add(obj.as_pointer())
+    bench("refit", index.refit, repeat=1)
+    slots = bench("query after refit", lambda: index.query(planes))
+
+    expected_lo, expected_hi = bounds.world_aabbs(index.objects)
+    outside, _ = addon.spatial.classify_boxes(expected_lo, expected_hi, planes)
+    assert sorted(slots.tolist()) == numpy.flatnonzero(~outside).tolist()
+
+    # With no object added or removed, the per-event check costs less than the query it guards
+    scene = standins.Scene(objects)
+    addon.spatial.scene_index.clear()
+    addon.ensure_scene_index(scene)
+    bench("ensure unchanged", lambda: addon.ensure_scene_index(scene))
+    assert addon.spatial.scene_index.builds == 1
+    assert bench.best["ensure unchanged"] < bench.best["query"]
+
+
+def scene_update(scene, id_type='SCENE'):
+    ''' Send the depsgraph update Blender reports after linking, unlinking or selecting objects. '''
+    update = standins.Struct(id=standins.Struct(id_type=id_type, original=scene),
+                             is_updated_geometry=False, is_updated_transform=False)
+    addon.depsgraph_update_handler(scene, standins.Struct(updates=[update]))
+
+
+def test_visible_scene_fit_ignores_own_clip_values(prefs, make_context):
+    prefs.visible_scene_clipping = True
+    addon.spatial.scene_index.clear()
+    # The view looks down -Z from z=10, Near is 2.5 to 3.5 in front of it
+    near = standins.Object("Near", location=(0.0, 0.0, 7.0))
+    far = standins.Object("Far", location=(0.0, 0.0, -50.0))
+    context = make_context([near, far], selected=[], active=None)
+    space = context.spaces[0]
+    region_3d = space.region_3d
+
+    def visible(clip_start):
+        planes = addon.spatial.frustum_planes(perspective(region_3d.view_matrix, near=clip_start), region_3d.view_matrix)
+        index = addon.ensure_scene_index(context.scene)
+        return sorted(index.objects[slot].name for slot in index.query(planes))
+    assert visible(0.1) == visible(5.0) == ['Far', 'Near']
+
+    region_3d.perspective_matrix = perspective(region_3d.view_matrix, near=5.0)
+    addon.apply_clipping(context, [])
+    assert space.clip_start <= 2.5
+
+    # Writing the clip values changes the perspective matrix, not the view key
+    applied = addon.cache.view_states.applied
+    region_3d.perspective_matrix = perspective(region_3d.view_matrix, near=space.clip_start)
+    addon.apply_clipping(context, [])
+    assert addon.cache.view_states.applied == applied
+
+    # A selection change updates the scene without touching the object set
+    scene_update(context.scene)
+    counter = addon.cache.scene_counter
+    scene_update(context.scene)
+    assert addon.cache.scene_counter == counter
+
+    # One object deleted and another added at the same count rebuilds the index
+    other = standins.Object("Other", location=(0.0, 0.0, -20.0))
+    context.scene.objects = [far]
+    scene_update(context.scene)
+    context.scene.objects = [far, other]
+    scene_update(context.scene)
+    assert visible(0.1) == ['Far', 'Other']
+
+
+def transform_corners(matrices, corners):
+    '''
+    Reference for bounds.transform_boxes: (N, 8, 3) local corners through
+    (N, 4, 4) matrices in one batched multiply over homogeneous corners.
+    '''
+    homogeneous = numpy.empty(corners.shape[:-1] + (4,), dtype=corners.dtype)
+    homogeneous[..., :3] = corners
+    homogeneous[..., 3] = 1.0
+    return numpy.einsum('nij,nkj->nki', matrices[:, :3, :], homogeneous)
+
+
+def test_transform_boxes_matches_corners(prefs):
+    objects = standins.make_objects(200, seed=7)
+    matrices = bounds.gather_matrices(objects, len(objects))
+    corners = bounds.gather_bound_boxes(objects, len(objects))
+    world = transform_corners(matrices, corners)
+    lo, hi = bounds.transform_boxes(matrices, corners.min(axis=1), corners.max(axis=1))
+    assert numpy.allclose(lo, world.min(axis=1))
+    assert numpy.allclose(hi, world.max(axis=1))
+
+
+@pytest.mark.parametrize("count", [1, 100, 10_000])
+def test_collection_instance_bounds(count, prefs, make_context, bench):
+    instancer = standins.Object("Instancer", 'EMPTY', (0, 0, 0), half_size=(0, 0, 0))
+    instancer.instance_type = 'COLLECTION'
+    prototypes = [standins.Object(f"Proto.{i}", 'MESH', half_size=(i + 1.0,) * 3, data=standins.Data(f"Mesh.{i}", 1.0))
+                  for i in range(5)]
+    placed = standins.make_objects(count, seed=count, extent=100.0)
+    depsgraph_instances = [standins.ObjectInstance(instancer, prototypes[i % 5], obj.matrix_world)
+                           for i, obj in enumerate(placed)]
+    context = make_context([instancer], active=instancer)
+    context.depsgraph = standins.Depsgraph(depsgraph_instances)
+
+    cache = addon.instances.InstanceBounds()
+    aggregate = bench("instances", lambda: (cache.clear(), cache.aggregate_instances(
+        context.depsgraph, [instancer], key=count))[1])
+
+    assert len(cache.prototypes) == min(count, 5)
+    expected_lo = numpy.min([(p.matrix_world @ c) for i, p in enumerate(depsgraph_instances)
+                             for c in prototypes[i % 5].bound_box], axis=0)
+    assert aggregate[0] == pytest.approx(expected_lo, abs=1e-9)
+    assert addon.measure_targets(addon.current_settings(), context, [instancer])[0] is not None
+
+
+def test_geometry_instances_keyed_on_evaluated_data(prefs):
+    cache = addon.instances.InstanceBounds()
+    plain = standins.make_objects(10, seed=1)
+    # The instance walk is skipped entirely while no target can spawn instances
+    assert cache.instance_boxes(standins.Struct(object_instances=None), plain) is None
+
+    scatter = standins.Object("Scatter", data=standins.Mesh("Scatter", (1.0, 1.0, 1.0)))
+    scatter.modifiers = [standins.Struct(type='NODES')]
+    pebbles = [standins.TemporaryObject(f"Pebble.{i}", scatter, standins.Data(f"Pebble.{i}", 1.0), (i + 1.0,) * 3)
+               for i in range(2)]
+    depsgraph = standins.Depsgraph([standins.ObjectInstance(scatter, pebbles[i % 2], standins.trs_matrix((i * 10.0, 0, 0)))
+                                    for i in range(4)])
+
+    matrices, lo, hi = cache.instance_boxes(depsgraph, plain + [scatter])
+    assert hi[:, 0].tolist() == [1.0, 2.0, 1.0, 2.0]
+    assert scatter.data.as_pointer() not in cache.prototypes
+
+
+def test_write_elision_skips_small_changes(prefs):
+    space = standins.SpaceView3D()
+    elision = addon.cache.WriteElision()
+
+    assert elision.write(space, 'clip_start', 'clip_end', 1.0, 100.0, 0.05)
+    assert not elision.write(space, 'clip_start', 'clip_end', 1.01, 101.0, 0.05)
+    assert not elision.write(space, 'clip_start', 'clip_end', 1.04, 104.0, 0.05)
+    assert (space.clip_start, space.clip_end) == (1.0, 100.0)
+    assert elision.write(space, 'clip_start', 'clip_end', 1.06, 100.0, 0.05)
+    assert (elision.written, elision.skipped) == (2, 2)
+
+
+def test_enabling_forgets_applied_clipping(prefs, make_context):
+    objects = standins.make_objects(10, seed=2)
+    context = make_context(objects, view_distance=20.0)
+    space = context.spaces[0]
+    addon.apply_clipping(context, objects)
+    fitted = (space.clip_start, space.clip_end)
+
+    # Set by hand while the assistant is off
+    space.clip_start, space.clip_end = 0.5, 50.0
+    try:
+        assert addon.ClippingAssistant().execute(context) == {'RUNNING_MODAL'}
+        addon.apply_clipping(context, objects)
+    finally:
+        addon.clipping_active = False
+        bpy.app.timers.registered.clear()
+    assert (space.clip_start, space.clip_end) == pytest.approx(fitted)
+
+
+def test_bake_clip_ranges_and_simplify(prefs, bench):
+    frames = numpy.arange(1, 1001)
+    targets = standins.make_objects(500, seed=11, extent=50.0)
+    lo, hi, min_extent = bounds.aggregate_aabbs(*bounds.world_aabbs(targets))
+    # Camera flying along +Y past the targets, looking down -Z from above
+    heights = 200.0 + 50.0 * numpy.sin(numpy.linspace(0.0, 6.0, len(frames)))
+    cameras = numpy.stack([numpy.asarray(standins.trs_matrix((0.0, y, z)))
+                           for y, z in zip(numpy.linspace(-100, 100, len(frames)), heights)])
+    repeat = lambda array: numpy.repeat(array[None], len(frames), axis=0)
+
+    starts, ends = bench("clip_ranges", lambda: addon.bake.clip_ranges(
+        cameras, repeat(lo), repeat(hi), numpy.full(len(frames), min_extent), 0.1))
+    assert numpy.all(starts < ends)
+    assert numpy.allclose(ends, (heights - lo[2]) * 1.1)
+
+    # Blender builds the camera view without its scale, a scaled camera clips the same
+    scaled = numpy.stack([numpy.asarray(standins.trs_matrix((0.0, y, z), rotation_z=0.3, scale=(2.5, 2.5, 2.5)))
+                          for y, z in zip(numpy.linspace(-100, 100, len(frames)), heights)])
+    scaled_starts, scaled_ends = addon.bake.clip_ranges(
+        scaled, repeat(lo), repeat(hi), numpy.full(len(frames), min_extent), 0.1)
+    assert numpy.allclose(scaled_ends, ends)
+    assert numpy.allclose(scaled_starts, starts)
+
+    kept = bench("simplify", lambda: addon.bake.simplify(frames, ends, 0.01))
+    assert 2 < len(kept) < len(frames) / 4
+    interpolated = numpy.interp(frames, frames[kept], ends[kept])
+    assert numpy.all(numpy.abs(interpolated - ends) <= 0.01 * ends + 1e-9)
+
+
+
+@pytest.mark.parametrize("scope", ['SCENE', 'MARKERS'])
+def test_scene_cameras_fit_from_their_own_view(scope, prefs, make_context, bench):
+    prefs.camera_clipping = True
+    prefs.camera_scope = scope
+    addon.render.clear()
+    targets = standins.make_objects(100, seed=5, extent=20.0)
+    heights = [50.0, 120.0, 400.0]
+    cameras = [standins.Object(f"Camera{i}", type='CAMERA', location=(0.0, 0.0, height),
+                               data=standins.Struct(clip_start=0.1, clip_end=100.0))
+               for i, height in enumerate(heights)]
+    context = make_context(targets + cameras, selected=targets)
+    if scope == 'MARKERS':
+        # The same camera bound to two markers is clipped once, unbound cameras are left alone
+        context.scene.timeline_markers = [standins.Struct(camera=camera) for camera in cameras[:2] + cameras[:1]]
+        heights = heights[:2]
+
+    bench("apply", lambda: (addon.cache.view_states.clear(), addon.apply_clipping(context, targets)))
+    lo, hi = bounds.aggregate_aabbs(*bounds.world_aabbs(targets))[:2]
+    for camera, height in zip(cameras, heights):
+        assert camera.data.clip_end == pytest.approx((height - lo[2]) * 1.1)
+        assert camera.data.clip_start == pytest.approx(min((height - hi[2]) * 0.9, camera.data.clip_end * 0.5))
+    for camera in cameras[len(heights):]:
+        assert (camera.data.clip_start, camera.data.clip_end) == (0.1, 100.0)
+
+    if scope == 'MARKERS':
+        # Rebinding a marker to another camera is picked up at the same marker count
+        context.scene.timeline_markers[1].camera = cameras[2]
+        assert addon.render.scene_cameras(context.scene, scope) == [cameras[0], cameras[2]]
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_frame_change_handler(count, prefs, bench):
+    prefs.render_clipping = True
+    addon.render.clear()
+    targets = standins.make_objects(count, seed=count, extent=50.0)
+    camera = standins.Object("Camera", type='CAMERA', location=(0.0, 0.0, 200.0),
+                             data=standins.Struct(clip_start=0.1, clip_end=100.0))
+    scene = standins.Scene(targets + [camera])
+    scene.camera = camera
+    lo, hi, _ = bounds.aggregate_aabbs(*bounds.world_aabbs(targets))
+    addon.cache.write_elision.write(camera.data, 'clip_start', 'clip_end', 0.1, 100.0, 0.0)
+
+    bench("frame change", lambda: (addon.render.frame_cache.clear(), addon.frame_change_handler(scene, None)))
+    assert camera.data.clip_end == pytest.approx((200.0 - lo[2]) * 1.1)
+    assert camera.data.clip_start == pytest.approx(min((200.0 - hi[2]) * 0.9, camera.data.clip_end * 0.5))
+    assert (camera.data.as_pointer(), 'clip_start') not in addon.cache.write_elision.applied
+
+    # Same frame again is served from the cache, a new frame is computed
+    bench("frame change cached", lambda: addon.frame_change_handler(scene, None))
+    scene.frame_set(2)
+    addon.frame_change_handler(scene, None)
+    assert len(addon.render.frame_cache) == 2
+
+    # Selecting a target drops the cached frames, the selection alone is fitted
+    targets[0].selected = True
+    addon.frame_change_handler(scene, None)
+    assert len(addon.render.frame_cache) == (1 if count > 1 else 2)
+    assert addon.render.scene_targets(scene, addon.ClippingAssistant.ob_type) == [targets[0]]
+
+
+def apply_clipping_reference(context, target_objects=None):
+    '''
+    Monolithic apply_clipping reading the preferences on every call, as it
+    was before the pipeline. Kept to compare dispatch overhead against the
+    composed stages, covers the stages the default settings run.
+    '''
+    prefs_ = addon.prefs()
+    cache = addon.cache
+    spaces = addon.view_spaces(context)
+    if not spaces:
+        return
+
+    if prefs_.auto_clipping:
+        if target_objects is None:
+            target_objects = addon.resolve_targets(context)
+        key = cache.fingerprint(target_objects, context.active_object,
+                                prefs_.bounds_mode, prefs_.clipping_mode, prefs_.instance_bounds,
+                                prefs_.vectorized_bounds, prefs_.incremental_bounds)
+        measured = cache.clipping_cache.lookup(key)
+        if measured is cache.MISS:
+            measured = addon.measure_targets(prefs_, context, target_objects)
+            cache.clipping_cache.store(key, measured)
+        measurement, aggregate = measured
+        if prefs_.debug_output:
+            print(cache.clipping_cache.stats_text())
+    else:
+        key = (prefs_.clip_start_distance, prefs_.clip_end_distance)
+        aggregate = None
+
+    depth_fit = prefs_.auto_clipping and prefs_.clipping_mode == 'DEPTH_FIT' and aggregate is not None
+    view_clipping = []
+    for space in spaces:
+        region_3d = space.region_3d
+        view_distance = region_3d.view_distance
+        if depth_fit:
+            view_key = (key, tuple(map(tuple, region_3d.view_matrix)))
+        else:
+            view_key = (key, cache.distance_key(view_distance))
+        if not cache.view_states.changed(space, view_key):
+            continue
+        if depth_fit:
+            clipping = addon.depth_fit_clipping(region_3d, measurement, aggregate, prefs_.depth_margin)
+        elif prefs_.auto_clipping:
+            clipping = addon.clipping_from_measurement(view_distance, measurement)
+        else:
+            clipping = prefs_.clip_start_distance, prefs_.clip_end_distance
+        view_clipping.append((space,) + tuple(clipping))
+    if not view_clipping:
+        return
+
+    threshold = prefs_.write_threshold
+    write = cache.write_elision.write
+    for space, minClipping, maxClipping in view_clipping:
+        write(space, 'clip_start', 'clip_end', minClipping, maxClipping, threshold)
+    space, minClipping, maxClipping = view_clipping[0]
+    if space == spaces[0]:
+        if prefs_.volume_clipping:
+            write(context.scene.eevee, 'volumetric_start', 'volumetric_end', minClipping, maxClipping, threshold)
+        if prefs_.camera_clipping and prefs_.camera_scope == 'VIEW' and space.camera and space.camera.type == 'CAMERA':
+            write(space.camera.data, 'clip_start', 'clip_end', minClipping, maxClipping, threshold)
+
+
+@pytest.mark.parametrize("clipping_mode", ['DISTANCE', 'DEPTH_FIT'])
+def test_pipeline_dispatch(clipping_mode, prefs, make_context, bench):
+    prefs.clipping_mode = clipping_mode
+    prefs.volume_clipping = True
+    objects = standins.make_objects(100, seed=9, extent=20.0)
+    context = make_context(objects, views=4, view_distance=80.0)
+
+    def clip_values():
+        return [(space.clip_start, space.clip_end) for space in context.spaces] + [
+            (context.scene.eevee.volumetric_start, context.scene.eevee.volumetric_end)]
+
+    apply_clipping_reference(context, objects)
+    reference = clip_values()
+    addon.cache.view_states.clear()
+    addon.cache.write_elision.clear()
+    for space in context.spaces:
+        space.clip_start, space.clip_end = 0.01, 1000.0
+    addon.apply_clipping(context, objects)
+    assert clip_values() == pytest.approx(reference)
+
+    # Measurement cached and views unchanged, only the dispatch itself is left
+    bench("reference", lambda: apply_clipping_reference(context, objects), repeat=200)
+    bench("pipeline", lambda: addon.apply_clipping(context, objects), repeat=200)
+
+
+def test_update_records_one_sample_per_span(prefs, make_context):
+    prefs.debug_profiling = True
+    context = make_context(standins.make_objects(10, seed=6))
+    addon.profiling.reset()
+    addon.update_clipping(context)
+    bpy.app.timers.registered.clear()
+    assert {name: len(values) for name, values in addon.profiling.samples.items()} == {
+        'targets': 1, 'bounds': 1, 'policy': 1, 'apply': 1, 'redraw': 1}
+
+
+def test_settings_snapshot_is_rebuilt_on_update(prefs):
+    settings = addon.current_settings()
+    with pytest.raises(AttributeError):
+        settings.depth_margin = 0.5
+    assert addon.stage_volume not in addon.active_pipeline().stages
+
+    prefs.volume_clipping = True
+    assert addon.current_settings() is not settings
+    assert addon.current_settings().volume_clipping
+    assert addon.stage_volume in addon.active_pipeline().stages
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_surface_near_clip(count, prefs, make_context, bench):
+    prefs.near_clip = 'SURFACE'
+    addon.surface.surface_trees.clear()
+    # A wide slab under the view and small parts scattered far away from it
+    slab = standins.Object("Slab", location=(0.0, 0.0, 0.0), half_size=(1000.0, 1000.0, 1.0))
+    parts = standins.make_objects(count - 1, seed=count, extent=5000.0)
+    for part in parts:
+        part.set_transform(part.location + standins.Vector((0.0, 0.0, -3000.0)))
+    targets = [slab] + parts
+    context = make_context(targets, view_distance=5.0)
+    space = context.spaces[0]
+
+    bench("first query", lambda: (addon.cache.view_states.clear(), addon.apply_clipping(context, targets)), repeat=1)
+    assert space.clip_start == pytest.approx(4.0 * (1.0 - prefs.depth_margin))
+    builds = addon.surface.surface_trees.builds
+    assert builds == 1
+
+    # Orbiting reuses the built trees
+    def orbit():
+        addon.cache.view_states.clear()
+        addon.cache.write_elision.clear()
+        addon.apply_clipping(context, targets)
+    space.region_3d = standins.Region3D(view_distance=2.0)
+    bench("orbit", orbit)
+    assert space.clip_start == pytest.approx(1.0 * (1.0 - prefs.depth_margin))
+    assert addon.surface.surface_trees.builds == builds
+
+    # Geometry edits drop the tree of the edited object
+    update = standins.Struct(id=standins.Struct(id_type='OBJECT', original=slab),
+                             is_updated_geometry=True, is_updated_transform=False)
+    addon.surface.surface_trees.note_depsgraph_update(standins.Struct(updates=[update]))
+    assert not addon.surface.surface_trees.trees
+
+
+def test_surface_trees_respect_memory_cap(prefs):
+    trees = addon.surface.SurfaceTrees()
+    objects = standins.make_objects(10, seed=2)
+    limit = 3 * 1024 * addon.surface.BYTES_PER_TRIANGLE
+    for obj in objects:
+        trees.tree(obj, None, limit)
+    assert len(trees.trees) == 3
+    assert trees.memory <= limit
+    assert trees.evictions == 7
+
+
+@pytest.mark.parametrize("instanced", [False, True])
+@pytest.mark.parametrize("count", SIZES)
+def test_threaded_bounds(count, instanced, prefs, make_context, bench):
+    objects = standins.make_objects(count, seed=count, extent=100.0)
+    instance_list = ()
+    if instanced:
+        # A scatter of ten instances per object, only the instancer is selected alongside
+        prefs.instance_bounds = True
+        instancer = standins.Object("Scatter", 'EMPTY', half_size=(0.0, 0.0, 0.0))
+        instancer.instance_type = 'COLLECTION'
+        prototypes = [standins.Object(f"Rock.{i}", half_size=(i + 1.0,) * 3, data=standins.Data(f"Rock.{i}", 1.0))
+                      for i in range(5)]
+        instance_list = [standins.ObjectInstance(instancer, prototypes[i % 5], obj.matrix_world)
+                         for i, obj in enumerate(standins.make_objects(count * 10, seed=count + 1, extent=300.0))]
+        objects.append(instancer)
+    context = make_context(objects, view_distance=50.0)
+    context.depsgraph = standins.Depsgraph(instance_list)
+    space = context.spaces[0]
+    settings = addon.current_settings()
+    depsgraph = context.evaluated_depsgraph_get()
+
+    # UI thread cost of the first, cold inline measurement against taking the snapshot only
+    def inline():
+        addon.bounds_store.store.clear()
+        addon.instances.instance_bounds.clear()
+        return addon.measure_targets(settings, context, objects)[1]
+    def take_snapshot():
+        addon.instances.instance_bounds.clear()
+        instance_boxes = addon.instances.instance_bounds.instance_boxes(depsgraph, objects) if instanced else None
+        return addon.workers.snapshot(objects, instance_boxes)
+    expected = bench("inline", inline, repeat=3)
+    data = bench("snapshot", take_snapshot, repeat=3)
+    aggregate, _ = bench("worker", lambda: addon.workers.reduce_snapshot(*data))
+    for value, reference in zip(aggregate, expected):
+        assert value == pytest.approx(reference)
+    if count >= addon.workers.MIN_OBJECTS and not instanced:
+        # With instances both sides are dominated by the depsgraph walk, only reported
+        assert bench.best["snapshot"] < bench.best["inline"]
+
+    addon.apply_clipping(context, objects)
+    inline_clipping = (space.clip_start, space.clip_end)
+
+    prefs.threaded_bounds = True
+    addon.cache.clipping_cache.clear()
+    addon.cache.view_states.clear()
+    addon.cache.write_elision.clear()
+    space.clip_start, space.clip_end = 0.01, 1000.0
+    worker = addon.workers.bounds_worker
+    addon.clipping_active = True
+    try:
+        addon.apply_clipping(context, objects)
+        if count >= addon.workers.MIN_OBJECTS:
+            # Nothing is applied until the worker result is picked up
+            assert (space.clip_start, space.clip_end) == (0.01, 1000.0)
+            worker.wait()
+    finally:
+        addon.clipping_active = False
+        bpy.app.timers.registered.clear()
+    assert (space.clip_start, space.clip_end) == pytest.approx(inline_clipping)
+
+    # The snapshot reads the current matrices, the worker transforms them
+    objects[0].set_transform((900.0, 0.0, 0.0))
+    aggregate, _ = addon.workers.reduce_snapshot(*addon.workers.snapshot(objects[:1]))
+    assert aggregate[1][0] >= 900.0
+
+
+def test_worker_discards_superseded_results(prefs):
+    worker = addon.workers.BoundsWorker()
+    data = addon.workers.snapshot(standins.make_objects(10, seed=1))
+    received = []
+    callback = lambda key, aggregate, window, area: received.append(key)
+    try:
+        worker.submit('old', data, callback, None, None)
+        worker.submit('new', data, callback, None, None)
+        worker.wait()
+        worker.submit('cancelled', data, callback, None, None)
+        worker.cancel()
+        worker.wait()
+    finally:
+        worker.shutdown()
+        bpy.app.timers.registered.clear()
+    assert received == ['new']
+    assert worker.discarded == 2
+
+
+def mesh_objects(count, seed):
+    ''' Mesh objects sharing a few datablocks, bounds match their mesh. '''
+    objects = standins.make_objects(count, seed=seed, extent=100.0)
+    meshes = [standins.Mesh(f"Mesh.{i}", (i + 1.0, 0.5, 0.25)) for i in range(min(count, 50))]
+    for index, obj in enumerate(objects):
+        obj.data = meshes[index % len(meshes)]
+        obj.set_transform(obj.location, half_size=obj.data.half_size, rotation_z=index * 0.1)
+    return objects
+
+
+# Vertices per scanned mesh, bounds computed from them are what the saved rows replace
+SCAN_VERTICES = 100_000
+
+
+def scan_objects(count, seed):
+    ''' Objects sharing up to 50 dense meshes whose bounds are only computed on first use. '''
+    meshes = [standins.ScanMesh(f"Scan.{i}", (i + 1.0, 0.5, 0.25), SCAN_VERTICES, seed=i) for i in range(min(count, 50))]
+    rng = random.Random(seed)
+    return [standins.ScanObject(f"Object.{index}", 'MESH', [rng.uniform(-100.0, 100.0) for _ in range(3)],
+                                rotation_z=index * 0.1, data=meshes[index % len(meshes)])
+            for index in range(count)]
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_saved_datablock_bounds(count, prefs, bench):
+    prefs.persistent_bounds = True
+    cache = addon.blend_cache
+    cache.datablock_bounds.clear()
+    bpy.data.texts.clear()
+    objects = scan_objects(count, seed=count)
+    meshes = {obj.data for obj in objects}
+    expected_lo, expected_hi = bounds.world_aabbs(objects)
+
+    # Opening the file: mesh bounds are not computed yet, both paths start from there
+    def reopen():
+        for mesh in meshes:
+            mesh.unload()
+        cache.datablock_bounds.clear()
+        return cache.world_aabbs(objects)
+
+    prefs.persistent_bounds = False
+    bench("cold", reopen, repeat=3)
+    prefs.persistent_bounds = True
+    reopen()
+    cache.datablock_bounds.save()
+
+    # Rows are decoded lazily and no bound box is computed
+    lo, hi = bench("after load", reopen, repeat=3)
+    assert cache.datablock_bounds.misses == 0
+    assert all(mesh.bounds is None for mesh in meshes)
+    assert lo == pytest.approx(expected_lo, abs=1e-4)
+    assert hi == pytest.approx(expected_hi, abs=1e-4)
+    assert bench.best["after load"] < bench.best["cold"]
+
+    # Only the edited mesh is read again
+    edited = objects[0].data
+    edited.vertices[0].co = standins.Vector((-9.0, -9.0, -9.0))
+    update = standins.Struct(id=standins.Struct(id_type='OBJECT', original=objects[0]),
+                             is_updated_geometry=True, is_updated_transform=False)
+    cache.datablock_bounds.note_depsgraph_update(standins.Struct(updates=[update]))
+    lo, hi = cache.world_aabbs(objects)
+    assert cache.datablock_bounds.misses == 1
+    assert lo.min(axis=0) == pytest.approx(bounds.world_aabbs(objects)[0].min(axis=0), abs=1e-4)
+
+
+def test_undo_drops_object_references(prefs, make_context):
+    assert addon.undo_post_handler in bpy.app.handlers.undo_post
+    assert addon.undo_post_handler in bpy.app.handlers.redo_post
+    prefs.include_children = True
+    root, groups, parts = assembly(100, seed=4)
+    camera = standins.Object("Camera", type='CAMERA', data=standins.Struct(clip_start=0.1, clip_end=100.0))
+    context = make_context([root] + groups + parts + [camera], selected=[root], active=root)
+    addon.apply_clipping(context)
+    addon.bounds_store.store.aggregate(parts)
+    addon.ensure_scene_index(context.scene)
+    addon.render.scene_cameras(context.scene, 'SCENE')
+    addon.blend_cache.datablock_bounds.edited.add("Mesh.0")
+
+    addon.undo_post_handler()
+    assert not addon.bounds_store.store.objects
+    assert not addon.spatial.scene_index.objects
+    assert not addon.hierarchy.hierarchy.children and not addon.hierarchy.hierarchy.expanded[1]
+    assert not addon.render._cameras
+    # Edits since loading still keep their saved rows out
+    assert "Mesh.0" in addon.blend_cache.datablock_bounds.edited
+    addon.blend_cache.datablock_bounds.clear()
+
+
+@pytest.mark.parametrize("engine_loaded", [False, True])
+def test_saved_bounds_removed_when_not_tracked(engine_loaded, prefs, monkeypatch):
+    # Without the engine edits are not tracked, with it saving may be turned off
+    monkeypatch.setattr(addon, "engine_loaded", engine_loaded)
+    prefs.persistent_bounds = not engine_loaded
+    bpy.data.texts.clear()
+    bpy.data.texts.new(addon.SAVED_BOUNDS_TEXT)
+    addon.save_pre_handler()
+    assert addon.SAVED_BOUNDS_TEXT not in bpy.data.texts
+
+
+def test_saved_bounds_reject_other_versions(prefs):
+    blob = addon.blend_cache.encode(["Mesh"], [1], numpy.zeros((1, 6)))
+    names, hashes, boxes = addon.blend_cache.decode(blob)
+    assert names == ["Mesh"] and boxes.shape == (1, 6)
+
+    payload = bytearray(zlib.decompress(base64.b64decode(blob)))
+    payload[4] = 99 # Version field
+    with pytest.raises(ValueError):
+        addon.blend_cache.decode(base64.b64encode(zlib.compress(bytes(payload))))
+    with pytest.raises(ValueError):
+        addon.blend_cache.decode("not a cache")
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_edit_mode_selected_vertices(count, prefs, make_context, bench):
+    components = addon.components.selected_components
+    components.clear()
+    objects = mesh_objects(count, seed=count)
+    for obj in objects:
+        obj.mode = 'EDIT'
+    # The +X half of every mesh is selected, the other objects in the scene stay out of it
+    for mesh in {obj.data for obj in objects}:
+        for vertex in mesh.vertices:
+            vertex.select = vertex.co[0] > 0.0
+    context = make_context(objects + standins.make_objects(10, seed=1, extent=5000.0),
+                           selected=objects[:1], active=objects[0], view_distance=50.0)
+    context.mode = 'EDIT_MESH'
+    space = context.spaces[0]
+
+    points = numpy.array([obj.matrix_world @ vertex.co for obj in objects
+                          for vertex in obj.data.vertices if vertex.select])
+    aggregate = bench("first read", lambda: (components.clear(), components.aggregate(objects))[1], repeat=1)
+    assert aggregate[0] == pytest.approx(points.min(axis=0))
+    assert aggregate[1] == pytest.approx(points.max(axis=0))
+
+    addon.apply_clipping(context)
+    expected = addon.clipping_from_measurement(50.0, addon.measure_aabb(aggregate))
+    assert (space.clip_start, space.clip_end) == pytest.approx(expected)
+
+    # Orbiting reads no mesh
+    reads = components.reads
+    def orbit():
+        addon.cache.view_states.clear()
+        addon.apply_clipping(context)
+    bench("orbit", orbit)
+    assert components.reads == reads
+
+    # Changing the selection re-reads only the objects using the edited mesh
+    edited = objects[0].data
+    edited.vertices[0].select = True
+    addon.apply_clipping(context)
+    assert components.reads == reads + sum(obj.data is edited for obj in objects)
+
+    # Moving a single selected vertex keeps the count, the mesh update drops the box
+    for mesh in {obj.data for obj in objects}:
+        for vertex in mesh.vertices:
+            vertex.select = False
+    edited.vertices[0].select = True
+    components.aggregate(objects)
+    edited.vertices[0].co = standins.Vector((-50.0, -50.0, -50.0))
+    update = standins.Struct(id=standins.Struct(id_type='MESH', original=edited),
+                             is_updated_geometry=False, is_updated_transform=False)
+    addon.depsgraph_update_handler(context.scene, standins.Struct(updates=[update]))
+    moved = components.aggregate(objects)
+    points = numpy.array([obj.matrix_world @ edited.vertices[0].co for obj in objects if obj.data is edited])
+    assert moved[0] == pytest.approx(points.min(axis=0))
+    assert moved[1] == pytest.approx(points.max(axis=0))
+
+    # Without a selection the whole targets are clipped again
+    edited.vertices[0].select = False
+    assert components.aggregate(objects) is None
+
+
+def assembly(count, seed):
+    ''' An empty root with groups of parts below it, the parts far larger than the root. '''
+    root = standins.Object("Root", 'EMPTY', half_size=(0.0, 0.0, 0.0))
+    groups = [standins.Object(f"Group.{i}", 'EMPTY', half_size=(0.0, 0.0, 0.0)) for i in range(max(1, count // 100))]
+    parts = standins.make_objects(count, seed=seed, extent=300.0)
+    for group in groups:
+        group.parent = root
+    for index, part in enumerate(parts):
+        part.parent = groups[index % len(groups)]
+    return root, groups, parts
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_hierarchy_bounds(count, prefs, make_context, bench):
+    prefs.include_children = True
+    index = addon.hierarchy.hierarchy
+    index.clear()
+    root, groups, parts = assembly(count, seed=count)
+    context = make_context([root] + groups + parts, selected=[root], active=root, view_distance=50.0)
+    space = context.spaces[0]
+    expected = bounds.aggregate_aabbs(*bounds.world_aabbs([root] + groups + parts))
+
+    def reselect():
+        addon.cache.clipping_cache.clear()
+        addon.cache.view_states.clear()
+        addon.apply_clipping(context)
+    bench("first", reselect, repeat=1)
+    assert index.builds == 1
+    reduced = index.reduced
+    assert addon.cache.clipping_cache.value[1][0] == pytest.approx(expected[0])
+    assert addon.cache.clipping_cache.value[1][1] == pytest.approx(expected[1])
+    assert space.clip_end == pytest.approx(addon.clipping_from_measurement(50.0, addon.measure_aabb(expected))[1])
+
+    # Reselecting the root walks nothing
+    bench("reselect", reselect)
+    assert index.reduced == reduced
+
+    # A moved part re-reduces its ancestor chain only
+    parts[0].set_transform((5000.0, 0.0, 0.0))
+    update = standins.Struct(id=standins.Struct(id_type='OBJECT', original=parts[0]),
+                             is_updated_geometry=False, is_updated_transform=True)
+    addon.depsgraph_update_handler(context.scene, standins.Struct(updates=[update]))
+    reselect()
+    assert index.reduced == reduced + 3
+    assert addon.cache.clipping_cache.value[1][1][0] == pytest.approx(5000.0 + parts[0].dimensions[0] / 2.0)
+
+    # Reparenting rebuilds the index
+    parts[0].parent = root
+    addon.depsgraph_update_handler(context.scene, standins.Struct(updates=[update]))
+    reselect()
+    assert index.builds == 2
+
+    # Deleting one part and adding another keeps the object count, the index is rebuilt all the same
+    spare = standins.Object("Spare", location=(-5000.0, 0.0, 0.0))
+    spare.parent = groups[0]
+    context.scene.objects[-1] = spare
+    scene_update(context.scene, 'COLLECTION')
+    reselect()
+    assert index.builds == 3
+    assert addon.cache.clipping_cache.value[1][0][0] == pytest.approx(-5000.0 - spare.dimensions[0] / 2.0)
+
+
+def test_hierarchy_bounds_include_instances(prefs, make_context):
+    prefs.include_children = True
+    prefs.instance_bounds = True
+    addon.hierarchy.hierarchy.clear()
+    addon.instances.instance_bounds.clear()
+    root = standins.Object("Root", 'EMPTY', half_size=(0.0, 0.0, 0.0))
+    instancer = standins.Object("Instancer", 'EMPTY', half_size=(0.0, 0.0, 0.0))
+    instancer.instance_type = 'COLLECTION'
+    instancer.parent = root
+    prototype = standins.Object("Proto", 'MESH', half_size=(1.0, 1.0, 1.0), data=standins.Data("Proto", 1.0))
+    context = make_context([root, instancer], selected=[root], active=root, view_distance=50.0)
+    context.depsgraph = standins.Depsgraph([standins.ObjectInstance(instancer, prototype, standins.trs_matrix((500.0, 0.0, 0.0)))])
+
+    addon.apply_clipping(context)
+    assert addon.cache.clipping_cache.value[1][1][0] == pytest.approx(501.0)
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_linked_duplicates_read_bounds_once(count, prefs, bench):
+    prefs.debug_profiling = True
+    objects = mesh_objects(count, seed=count)
+    # A modifier gives the object geometry of its own, even on a shared mesh
+    objects[-1].modifiers = [standins.Struct(type='BEVEL')]
+    meshes = len({obj.data for obj in objects})
+
+    def per_object():
+        matrices = bounds.gather_matrices(objects, len(objects))
+        corners = transform_corners(matrices, bounds.gather_bound_boxes(objects, len(objects)))
+        return corners.min(axis=1), corners.max(axis=1)
+    expected_lo, expected_hi = bench("per object", per_object)
+    lo, hi = bench("per datablock", lambda: addon.blend_cache.world_aabbs(objects))
+    assert lo == pytest.approx(expected_lo, abs=1e-9)
+    assert hi == pytest.approx(expected_hi, abs=1e-9)
+
+    assert bounds.local_boxes(objects)[2] == min(meshes + 1, count)
+    counters = addon.profiling.counters
+    assert counters['bounds objects'] == count
+    assert counters['bounds datablocks'] == min(meshes + 1, count)
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_trace_replay_reproduces_session(count, prefs, make_context, bench, tmp_path, monkeypatch):
+    objects = standins.make_objects(count, seed=count, extent=200.0)
+    context = make_context(objects, active=objects[0], views=2)
+    space = context.spaces[0]
+    operator = addon.ClippingAssistant()
+    path = str(tmp_path / "session.catrace")
+    addon.clear_caches()
+
+    live = []
+    addon.trace.recorder.start(path, addon.current_settings())
+    addon.clipping_active = True
+    try:
+        for step, distance in enumerate((10.0, 25.0, 80.0, 300.0, 40.0)):
+            space.region_3d = standins.Region3D(view_distance=distance)
+            if step == 3:
+                objects[0].set_transform((900.0, 0.0, 0.0))
+                update = standins.Struct(id=standins.Struct(id_type='OBJECT', original=objects[0]),
+                                         is_updated_geometry=False, is_updated_transform=True)
+                addon.depsgraph_update_handler(context.scene, standins.Struct(updates=[update]))
+            operator.modal(context, standins.Event('WHEELUPMOUSE' if step % 2 else 'MIDDLEMOUSE', ctrl=step == 2))
+            live.append((space.clip_start, space.clip_end))
+    finally:
+        addon.clipping_active = False
+        assert addon.trace.recorder.stop() == 5
+        bpy.app.timers.registered.clear()
+
+    settings, events = addon.trace.read_trace(path)
+    assert settings['update_interval'] == 0.0
+    assert [event.type for event in events] == ['MIDDLEMOUSE', 'WHEELUPMOUSE', 'MIDDLEMOUSE', 'WHEELUPMOUSE', 'MIDDLEMOUSE']
+    assert events[2].modifiers == addon.trace.CTRL
+    # Matrices are only stored when the targets moved
+    assert [event.matrices is not None for event in events] == [True, False, False, True, False]
+
+    # The replay runs with the recorded settings, not the ones changed since
+    prefs.clipping_mode = 'DEPTH_FIT'
+    settings, rows = bench("replay", lambda: addon.trace.replay(path), repeat=1)
+    replayed = [(row['clip_start'], row['clip_end']) for row in rows]
+    assert numpy.array(replayed) == pytest.approx(numpy.array(live), rel=1e-4)
+    assert all(row['latency_ms'] >= 0.0 for row in rows)
+    assert addon.trace.replay_summary(rows)['events'] == 5
+
+    # A session recorded with threaded bounds is replayed inline, no timer tick applies worker results
+    read_trace = addon.trace.read_trace
+    with monkeypatch.context() as patch:
+        patch.setattr(addon.trace, "read_trace",
+                      lambda filepath: (dict(settings, threaded_bounds=True), read_trace(filepath)[1]))
+        _, rows = addon.trace.replay(path)
+    assert numpy.array([(row['clip_start'], row['clip_end']) for row in rows]) == pytest.approx(numpy.array(live), rel=1e-4)
+
+    recorded_surface = dict(settings, near_clip='SURFACE')
+    with pytest.raises(ValueError):
+        addon.trace.replay_settings(recorded_surface, addon.current_settings())
+
+    with open(path, 'r+b') as file:
+        file.seek(4)
+        file.write(b'\x63')
+    with pytest.raises(ValueError):
+        addon.trace.read_trace(path)
+
+
+REGISTER_SCRIPT = """
+import importlib.util, json, sys, time, types
+sys.path.insert(0, {benchmarks!r})
+import standins
+bpy = standins.install('clipping_assistant')
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location(
+    'clipping_assistant', {package!r} + '/__init__.py', submodule_search_locations=[{package!r}])
+addon = importlib.util.module_from_spec(spec)
+sys.modules['clipping_assistant'] = addon
+spec.loader.exec_module(addon)
+addon.register()
+registered = time.perf_counter()
+numpy_on_register = 'numpy' in sys.modules
+defaults = standins.preference_defaults(addon.preferences.ClippingAssistant_Preferences)
+panel = types.SimpleNamespace(layout=standins.Layout(), **{{name: getattr(defaults, name) for name in addon.pipeline.FIELDS}})
+panel.debug_profiling = True
+addon.preferences.ClippingAssistant_Preferences.draw(panel, bpy.context)
+numpy_on_draw = 'numpy' in sys.modules
+engine_start = time.perf_counter()
+addon.load_engine()
+print(json.dumps({{'register_ms': (registered - start) * 1000.0,
+                  'engine_ms': (time.perf_counter() - engine_start) * 1000.0,
+                  'numpy_on_register': numpy_on_register,
+                  'numpy_on_draw': numpy_on_draw,
+                  'handlers': len(bpy.app.handlers.depsgraph_update_post)}}))
+"""
+
+
+def test_registration_defers_numpy(bench):
+    from conftest import PACKAGE_DIR
+    script = REGISTER_SCRIPT.format(benchmarks=str(PACKAGE_DIR / "benchmarks"), package=str(PACKAGE_DIR))
+    run = lambda: json.loads(subprocess.run([sys.executable, "-c", script], check=True,
+                                            capture_output=True, text=True).stdout)
+    timings = bench("fresh interpreter", run, repeat=3)
+    print(f"\nimport + register {timings['register_ms']:.2f} ms, engine {timings['engine_ms']:.2f} ms")
+    assert not timings['numpy_on_register']
+    # The debug panel only shows the engine caches once the engine is loaded
+    assert not timings['numpy_on_draw']
+    assert timings['handlers'] == 1
+
+
+def test_header_draw_reads_precomputed_readout(prefs, make_context, bench):
+    prefs.show_clipping_distance = True
+    context = make_context(standins.make_objects(100, seed=3), view_distance=20.0)
+    context.region = standins.Region('HEADER', alignment='RIGHT')
+    header = standins.Struct(layout=standins.Layout())
+    addon.clipping_active = True
+    try:
+        addon.update_clipping(context)
+        space = context.spaces[0]
+        expected = f"[{space.clip_start * 100.0:.2f} | {space.clip_end * 100.0:.2f}]"
+        assert addon.readout == expected
+
+        # Drawing touches neither the screen nor the unit settings
+        context.screen = context.scene.unit_settings = None
+        bench("draw_button", lambda: addon.draw_button(header, context), repeat=1000)
+        assert header.layout.labels[-1] == expected
+    finally:
+        addon.clipping_active = False
+        bpy.app.timers.registered.clear()
+
+    prefs.show_clipping_distance = False
+    assert addon.readout == ""
+
+
+def test_warmup_builds_target_bounds(prefs, make_context):
+    objects = standins.make_objects(1000, seed=4)
+    make_context(objects)
+    addon.clipping_active = True
+    try:
+        addon.warmup()
+    finally:
+        addon.clipping_active = False
+    store = addon.bounds_store.store
+    assert store.rebuilds == 1 and len(store.objects) == len(objects)
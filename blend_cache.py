@@ -0,0 +1,223 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+'''
+Local bounds of mesh datablocks saved with the .blend file.
+
+Reading bound_box costs 32 RNA accesses per object, on a cold set with
+hundreds of thousands of objects that dominates the first interaction.
+The local box of every plain mesh datablock (no modifiers, no shape keys)
+is kept in a hidden text datablock as one compressed binary blob: names,
+geometry hashes and float32 boxes. It is decoded into arrays on first use
+after loading, rows are only trusted while the hash of the mesh matches,
+and meshes the depsgraph reported as edited in this session are re-read.
+Edits made while the engine is not loaded are not tracked, the add-on
+removes the saved bounds on save in that case.
+'''
+
+import base64
+import struct
+import zlib
+import bpy
+import numpy
+from . import bounds
+from . import profiling
+from . import SAVED_BOUNDS_TEXT as TEXT_NAME
+
+
+MAGIC = b'CABN'
+VERSION = 1
+HEADER = struct.Struct('<4sIII') # magic, version, count, name bytes
+
+# Synced from the persistent_bounds preference
+enabled = False
+
+
+def geometry_hash(mesh):
+    '''
+    Cheap fingerprint of mesh geometry: element counts and a few sampled
+    vertex positions, stable across sessions unlike pointers and hash().
+    Constant time, the lookup must stay cheaper than reading the bound box.
+    '''
+    vertices = mesh.vertices
+    count = len(vertices)
+    sample = tuple(tuple(vertices[index].co) for index in {0, count // 2, count - 1}) if count else ()
+    return zlib.crc32(repr((count, len(mesh.edges), len(mesh.polygons), sorted(sample))).encode())
+
+
+def cacheable(obj):
+    ''' True if the object bounds are exactly the bounds of its mesh datablock. '''
+    return obj.type == 'MESH' and obj.data is not None and not obj.modifiers and obj.data.shape_keys is None
+
+
+def encode(names, hashes, boxes):
+    ''' Text blob of names, uint32 hashes and (N, 6) lo/hi boxes. '''
+    name_blob = '\0'.join(names).encode('utf-8')
+    payload = b''.join((
+        HEADER.pack(MAGIC, VERSION, len(names), len(name_blob)),
+        name_blob,
+        numpy.asarray(hashes, dtype='<u4').tobytes(),
+        numpy.asarray(boxes, dtype='<f4').tobytes(),
+        ))
+    return base64.b64encode(zlib.compress(payload)).decode('ascii')
+
+
+def decode(text):
+    ''' (names, hashes, boxes) of a blob, ValueError for other versions or damaged data. '''
+    try:
+        payload = zlib.decompress(base64.b64decode(text))
+        magic, version, count, name_size = HEADER.unpack_from(payload)
+    except (zlib.error, struct.error, ValueError) as error:
+        raise ValueError(f"unreadable bounds cache: {error}")
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"unsupported bounds cache version {version}")
+
+    offset = HEADER.size
+    names = payload[offset:offset + name_size].decode('utf-8').split('\0') if count else []
+    offset += name_size
+    hashes = numpy.frombuffer(payload, dtype='<u4', count=count, offset=offset)
+    offset += hashes.nbytes
+    boxes = numpy.frombuffer(payload, dtype='<f4', count=count * 6, offset=offset).reshape(count, 6)
+    if len(names) != count:
+        raise ValueError("bounds cache names do not match the entry count")
+    return names, hashes, boxes
+
+
+class DatablockBounds:
+    ''' Saved rows of the file plus the datablocks resolved in this session. '''
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.loaded = False
+        self.rows = {}
+        self.hashes = None
+        self.boxes = None
+        # data pointer -> (name, hash, box (6,)), resolved this session
+        self.session = {}
+        self.edited = set()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        self.loaded = True
+        text = bpy.data.texts.get(TEXT_NAME)
+        if text is None:
+            return
+        try:
+            names, self.hashes, self.boxes = decode(text.as_string())
+        except ValueError as error:
+            print(f"Clipping Assistant: ignoring saved bounds, {error}")
+            return
+        self.rows = {name: row for row, name in enumerate(names)}
+
+    def note_depsgraph_update(self, depsgraph):
+        ''' Forget meshes whose geometry changed, their saved rows are not trusted anymore either. '''
+        for update in depsgraph.updates:
+            if update.is_updated_geometry and update.id.id_type == 'OBJECT':
+                data = update.id.original.data
+                if data is not None:
+                    self.session.pop(data.as_pointer(), None)
+                    self.edited.add(data.name_full)
+
+    def _resolve(self, obj):
+        data = obj.data
+        name = data.name_full
+        digest = geometry_hash(data)
+        row = self.rows.get(name)
+        if row is not None and name not in self.edited and self.hashes[row] == digest:
+            self.hits += 1
+            box = self.boxes[row].astype(numpy.float64)
+        else:
+            self.misses += 1
+            corners = numpy.array([tuple(corner) for corner in obj.bound_box], dtype=numpy.float64)
+            box = numpy.concatenate((corners.min(axis=0), corners.max(axis=0)))
+        entry = self.session[data.as_pointer()] = (name, digest, box)
+        return entry
+
+    def local_boxes(self, target_objects):
+        ''' Local (N, 3) lo and hi of the targets, from the cache where possible, and the number of distinct boxes. '''
+        if not self.loaded:
+            self._load()
+        session = self.session
+        unique, rows = bounds.group_by_data(target_objects)
+        boxes = numpy.empty((len(unique), 6))
+        read = []
+        for row, obj in enumerate(unique):
+            if cacheable(obj):
+                entry = session.get(obj.data.as_pointer())
+                if entry is None:
+                    entry = self._resolve(obj)
+                boxes[row] = entry[2]
+            else:
+                read.append(row)
+        if read:
+            corners = bounds.gather_bound_boxes([unique[row] for row in read], len(read))
+            boxes[read, :3] = corners.min(axis=1)
+            boxes[read, 3:] = corners.max(axis=1)
+        boxes = boxes[rows]
+        return boxes[:, :3], boxes[:, 3:], len(unique)
+
+    def save(self):
+        ''' Write the saved rows still valid and everything resolved this session into the file. '''
+        if not self.loaded:
+            self._load()
+        entries = {name: (self.hashes[row], self.boxes[row]) for name, row in self.rows.items()
+                   if name not in self.edited}
+        entries.update((name, (digest, box)) for name, digest, box in self.session.values())
+        if not entries:
+            return
+
+        names = list(entries)
+        text = bpy.data.texts.get(TEXT_NAME)
+        if text is None:
+            text = bpy.data.texts.new(TEXT_NAME)
+            text.use_fake_user = True
+        text.from_string(encode(names,
+                                [entries[name][0] for name in names],
+                                numpy.array([entries[name][1] for name in names]).reshape(-1, 6)))
+
+    def stats_text(self):
+        return f"Saved bounds: {len(self.rows)} rows, {self.hits} used / {self.misses} read"
+
+
+datablock_bounds = DatablockBounds()
+
+
+def local_boxes(target_objects):
+    '''
+    Local (N, 3) lo and hi of the targets, through the saved datablock bounds
+    when enabled. Reports how many distinct boxes the targets share.
+    '''
+    if enabled:
+        local_lo, local_hi, unique = datablock_bounds.local_boxes(target_objects)
+    else:
+        local_lo, local_hi, unique = bounds.local_boxes(target_objects)
+    profiling.count('bounds objects', len(target_objects))
+    profiling.count('bounds datablocks', unique)
+    return local_lo, local_hi
+
+
+def world_aabbs(target_objects):
+    ''' bounds.world_aabbs, reading local boxes through local_boxes(). '''
+    count = len(target_objects)
+    if not count:
+        return None, None
+    local_lo, local_hi = local_boxes(target_objects)
+    return bounds.transform_boxes(bounds.gather_matrices(target_objects, count), local_lo, local_hi)
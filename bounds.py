@@ -0,0 +1,255 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+'''
+Vectorized bounds engine.
+
+Reads object locations and dimensions into contiguous (N, 3) arrays in one
+bulk pass and reduces them with NumPy instead of looping over Vectors.
+The scalar helpers in __init__ stay as the reference implementation.
+
+World bounds read the local bound_box once per shared datablock, linked
+duplicates reuse it, and transform all boxes by their matrix_world in one
+batched step before reducing them to per-object and union AABBs.
+Depth intervals project box corners onto the view axis of a view matrix.
+'''
+
+import numpy
+from itertools import chain
+
+
+DEFAULT_MIN_DIMENSION = 0.001
+DEFAULT_MAX_DIMENSION = 10.0
+
+# Object types whose bound box only depends on their data, shared by all users of it
+SHARED_BOUNDS_TYPES = {'MESH', 'CURVE', 'SURFACE', 'FONT', 'VOLUME', 'POINTCLOUD', 'CURVES'}
+
+
+def gather_vectors(vectors, count, dtype=numpy.float64):
+    ''' Read `count` 3D vectors into a contiguous (count, 3) array in one pass. '''
+    flat = numpy.fromiter(chain.from_iterable(vectors), dtype=dtype, count=count * 3)
+    return flat.reshape(count, 3)
+
+
+def gather_dimensions_and_locations(target_objects, dtype=numpy.float64):
+    '''
+    Array counterpart of get_object_dimensions_and_locations.
+    Returns (dimensions, locations) as (N, 3) arrays, dimensions is None when
+    every target has zero size, both are None when there are no targets.
+    '''
+    count = len(target_objects)
+    if not count:
+        return None, None
+
+    locations = gather_vectors((obj.location for obj in target_objects), count, dtype)
+    dimensions = gather_vectors((obj.dimensions for obj in target_objects), count, dtype)
+
+    if not dimensions.any():
+        dimensions = None
+    return dimensions, locations
+
+
+def min_dimension(dimensions):
+    ''' Smallest positive dimension value, 0.001 if there is none. '''
+    if dimensions is None:
+        return DEFAULT_MIN_DIMENSION
+    positive = dimensions[dimensions > 0.0]
+    if not positive.size:
+        return DEFAULT_MIN_DIMENSION
+    return float(positive.min())
+
+
+def max_dimension(dimensions):
+    ''' Largest dimension value, 10.0 if there is none. '''
+    if dimensions is None or not dimensions.size:
+        return DEFAULT_MAX_DIMENSION
+    return float(dimensions.max())
+
+
+def location_spread(locations):
+    '''
+    Distance between the shortest and the longest location vector.
+    Matches (max(obj_locations) - min(obj_locations)).length, mathutils
+    orders Vectors by length and min()/max() keep the first match, as does argmin/argmax.
+    '''
+    if locations is None or len(locations) < 2:
+        return 0.0
+    lengths = numpy.einsum('ij,ij->i', locations, locations)
+    delta = locations[lengths.argmax()] - locations[lengths.argmin()]
+    return float(numpy.sqrt(delta.dot(delta)))
+
+
+def gather_matrices(target_objects, count, dtype=numpy.float64):
+    ''' Read matrix_world of `count` objects into a (count, 4, 4) array. '''
+    flat = numpy.fromiter(
+        (value for obj in target_objects for row in obj.matrix_world for value in row),
+        dtype=dtype, count=count * 16)
+    return flat.reshape(count, 4, 4)
+
+
+def gather_bound_boxes(target_objects, count, dtype=numpy.float64):
+    ''' Read the local bound_box corners of `count` objects into a (count, 8, 3) array. '''
+    flat = numpy.fromiter(
+        (value for obj in target_objects for corner in obj.bound_box for value in corner),
+        dtype=dtype, count=count * 24)
+    return flat.reshape(count, 8, 3)
+
+
+def group_by_data(target_objects):
+    '''
+    One representative object per distinct local bound box, and for every
+    target the row of its representative. Objects sharing a datablock share
+    a row unless modifiers make their evaluated geometry their own.
+    '''
+    unique = []
+    rows = numpy.empty(len(target_objects), dtype=numpy.intp)
+    shared = {}
+    for index, obj in enumerate(target_objects):
+        data = obj.data
+        if data is None or obj.type not in SHARED_BOUNDS_TYPES or obj.modifiers:
+            row = len(unique)
+            unique.append(obj)
+        else:
+            pointer = data.as_pointer()
+            row = shared.get(pointer)
+            if row is None:
+                row = shared[pointer] = len(unique)
+                unique.append(obj)
+        rows[index] = row
+    return unique, rows
+
+
+def local_boxes(target_objects, dtype=numpy.float64):
+    ''' Local (N, 3) lo and hi of the targets and the number of bound boxes actually read. '''
+    unique, rows = group_by_data(target_objects)
+    corners = gather_bound_boxes(unique, len(unique), dtype)
+    return corners.min(axis=1)[rows], corners.max(axis=1)[rows], len(unique)
+
+
+def transform_boxes(matrices, local_lo, local_hi):
+    '''
+    World AABBs of local (N, 3) boxes under (N, 4, 4) matrices without
+    expanding the 8 corners: center through the full matrix, half extents
+    through the absolute linear part.
+    '''
+    center = (local_lo + local_hi) * 0.5
+    half = (local_hi - local_lo) * 0.5
+    linear = matrices[:, :3, :3]
+    world_center = numpy.einsum('nij,nj->ni', linear, center) + matrices[:, :3, 3]
+    world_half = numpy.einsum('nij,nj->ni', numpy.abs(linear), half)
+    return world_center - world_half, world_center + world_half
+
+
+def world_aabbs(target_objects, dtype=numpy.float64):
+    ''' Per-object world-space AABBs as (lo, hi) arrays of shape (N, 3), None if there are no targets. '''
+    count = len(target_objects)
+    if not count:
+        return None, None
+
+    local_lo, local_hi, _ = local_boxes(target_objects, dtype)
+    return transform_boxes(gather_matrices(target_objects, count, dtype), local_lo, local_hi)
+
+
+def union_aabb(lo, hi):
+    ''' Reduce per-object AABBs to the single box enclosing all of them. '''
+    return lo.min(axis=0), hi.max(axis=0)
+
+
+def positive_min_extent(lo, hi):
+    ''' Smallest positive extent of each (lo, hi) box, inf for boxes without one. '''
+    extent = hi - lo
+    return numpy.where(extent > 0.0, extent, numpy.inf).min(axis=-1)
+
+
+def aggregate_aabbs(lo, hi):
+    '''
+    Reduce per-object AABBs to (union_lo, union_hi, min_extent), where
+    min_extent is the smallest positive extent of any single box.
+    '''
+    if lo is None:
+        return None
+    union_lo, union_hi = union_aabb(lo, hi)
+    return union_lo, union_hi, float(positive_min_extent(lo, hi).min())
+
+
+def merge_aggregates(first, second):
+    ''' Union of two aggregates, either may be None. '''
+    if first is None:
+        return second
+    if second is None:
+        return first
+    return (numpy.minimum(first[0], second[0]), numpy.maximum(first[1], second[1]),
+            min(first[2], second[2]))
+
+
+def aggregate_sizes(aggregate):
+    '''
+    Turn an aggregate into (min_size, max_size).
+    min_size is the smallest positive extent of any single box (0.001 if none),
+    max_size is the diagonal of the enclosing box, which already covers the
+    spread between the targets. Returns None if everything collapses to a point.
+    '''
+    if aggregate is None:
+        return None
+    union_lo, union_hi, min_extent = aggregate
+    diagonal = union_hi - union_lo
+    max_size = float(numpy.sqrt(diagonal.dot(diagonal)))
+    if not max_size > 0.0:
+        return None
+    if not numpy.isfinite(min_extent):
+        min_extent = DEFAULT_MIN_DIMENSION
+    return min_extent, max_size
+
+
+def box_corners(lo, hi):
+    ''' The 8 corners of axis aligned boxes, (3,) -> (8, 3) or (N, 3) -> (N, 8, 3). '''
+    lo = numpy.asarray(lo, dtype=numpy.float64)[..., None, :]
+    hi = numpy.asarray(hi, dtype=numpy.float64)[..., None, :]
+    return numpy.where(BOX_CORNER_MASK, hi, lo)
+
+
+# Corner selection of box_corners, True picks the hi value of an axis
+BOX_CORNER_MASK = numpy.array([[(i >> axis) & 1 for axis in range(3)] for i in range(8)], dtype=bool)
+
+
+def view_depths(view_matrix, points):
+    '''
+    Distance in front of the view for (N, 3) world points, one dot product per
+    point with the view matrix forward row (views look down -Z).
+    '''
+    forward = -numpy.asarray(view_matrix[2], dtype=numpy.float64)
+    return points @ forward[:3] + forward[3]
+
+
+def camera_view_matrices(camera_matrices):
+    '''
+    View matrices of (..., 4, 4) camera world matrices. Blender ignores the
+    scale of a camera for its view, so the axes are normalized first as
+    matrix_world.normalized() does, then the matrices are inverted.
+    '''
+    matrices = numpy.array(camera_matrices, dtype=numpy.float64)
+    linear = matrices[..., :3, :3]
+    lengths = numpy.linalg.norm(linear, axis=-2, keepdims=True)
+    linear /= numpy.where(lengths > 0.0, lengths, 1.0)
+    return numpy.linalg.inv(matrices)
+
+
+def depth_interval(view_matrix, lo, hi):
+    ''' (near, far) depth of the box lo/hi along the view axis. '''
+    depths = view_depths(view_matrix, box_corners(lo, hi))
+    return float(depths.min()), float(depths.max())
@@ -0,0 +1,140 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+'''
+Incremental world bounds of the current targets.
+
+Per-object AABBs are kept in a segment tree so the union box and the
+smallest extent can be maintained while objects move. The depsgraph
+handler only marks objects dirty, the next aggregate() re-reads those
+objects and re-reduces their ancestors: O(changed * log N) per event.
+'''
+
+import numpy
+from . import bounds
+from . import blend_cache
+
+
+class SegmentTree:
+    ''' Array-backed min/max tree over (N, 3) lo/hi boxes. '''
+
+    def __init__(self, lo, hi):
+        count = len(lo)
+        size = 1 << max(0, (count - 1).bit_length())
+        self.size = size
+        self.lo = numpy.full((2 * size, 3), numpy.inf)
+        self.hi = numpy.full((2 * size, 3), -numpy.inf)
+        self.extent = numpy.full(2 * size, numpy.inf)
+
+        self.lo[size:size + count] = lo
+        self.hi[size:size + count] = hi
+        self.extent[size:size + count] = bounds.positive_min_extent(lo, hi)
+
+        # Reduce level by level, each level is a single vectorized step
+        start = size
+        while start > 1:
+            self._pull(numpy.arange(start // 2, start))
+            start //= 2
+
+    def _pull(self, nodes):
+        left = nodes * 2
+        right = left + 1
+        self.lo[nodes] = numpy.minimum(self.lo[left], self.lo[right])
+        self.hi[nodes] = numpy.maximum(self.hi[left], self.hi[right])
+        self.extent[nodes] = numpy.minimum(self.extent[left], self.extent[right])
+
+    def update(self, slots, lo, hi):
+        ''' Replace the boxes at slots and re-reduce only their ancestors. '''
+        nodes = slots + self.size
+        self.lo[nodes] = lo
+        self.hi[nodes] = hi
+        self.extent[nodes] = bounds.positive_min_extent(lo, hi)
+
+        nodes = numpy.unique(nodes // 2)
+        while nodes.size and nodes[0] >= 1:
+            self._pull(nodes)
+            nodes = numpy.unique(nodes // 2)
+
+    def root(self):
+        ''' (union_lo, union_hi, min_extent) over all boxes. '''
+        return self.lo[1].copy(), self.hi[1].copy(), float(self.extent[1])
+
+
+class BoundsStore:
+    ''' World bounds of the last target set, refreshed from depsgraph updates. '''
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.selection = None
+        self.slots = {}
+        self.objects = []
+        self.tree = None
+        self.dirty = set()
+        self.rebuilds = 0
+        self.refreshed = 0
+
+    def note_depsgraph_update(self, depsgraph):
+        ''' Mark stored objects that moved or changed geometry as dirty. '''
+        if self.tree is None:
+            return
+        for update in depsgraph.updates:
+            if update.id.id_type != 'OBJECT':
+                continue
+            if update.is_updated_transform or update.is_updated_geometry:
+                pointer = update.id.original.as_pointer()
+                if pointer in self.slots:
+                    self.dirty.add(pointer)
+
+    def aggregate(self, target_objects):
+        ''' (union_lo, union_hi, min_extent) of the targets, None if there are none. '''
+        if not target_objects:
+            return None
+
+        selection = tuple(obj.as_pointer() for obj in target_objects)
+        if selection != self.selection:
+            self._rebuild(target_objects, selection)
+        elif self.dirty:
+            self._refresh()
+        return self.tree.root()
+
+    def boxes(self, target_objects):
+        ''' Up to date per-object (lo, hi) arrays of the targets, in target order. '''
+        self.aggregate(target_objects)
+        start = self.tree.size
+        return self.tree.lo[start:start + len(self.objects)], self.tree.hi[start:start + len(self.objects)]
+
+    def _rebuild(self, target_objects, selection):
+        lo, hi = blend_cache.world_aabbs(target_objects)
+        self.tree = SegmentTree(lo, hi)
+        self.slots = {pointer: slot for slot, pointer in enumerate(selection)}
+        self.objects = list(target_objects)
+        self.selection = selection
+        self.dirty.clear()
+        self.rebuilds += 1
+
+    def _refresh(self):
+        slots = numpy.fromiter((self.slots[pointer] for pointer in self.dirty), dtype=numpy.intp, count=len(self.dirty))
+        self.dirty.clear()
+        lo, hi = bounds.world_aabbs([self.objects[slot] for slot in slots])
+        self.tree.update(slots, lo, hi)
+        self.refreshed += len(slots)
+
+
+store = BoundsStore()
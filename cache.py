@@ -0,0 +1,219 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+'''
+Fingerprint cache for the clipping calculation.
+
+While the user only orbits, the selection and the object transforms stay
+the same and apply_clipping would recompute identical results. The
+fingerprint combines the selection identity, the active object and a
+counter bumped by depsgraph updates. The target measurement is shared by
+all viewports, each viewport additionally remembers the rounded view
+distance it was last clipped for and is skipped while that stays the same.
+'''
+
+# Bumped by the depsgraph_update_post handler whenever objects move or change
+update_counter = 0
+
+# Bumped by the depsgraph_update_post handler when objects may have been added or removed
+scene_counter = 0
+# scene pointer -> object count seen on the last scene update
+scene_object_counts = {}
+
+# Significant digits of view_distance kept in the fingerprint
+VIEW_DISTANCE_DIGITS = 6
+
+
+def note_depsgraph_update(depsgraph):
+    '''
+    Bump the update counter if the depsgraph reports changed objects.
+    Only object updates count, our own camera clip writes must not invalidate the cache.
+    '''
+    global update_counter
+    for update in depsgraph.updates:
+        if update.id.id_type != 'OBJECT':
+            continue
+        if update.is_updated_transform or update.is_updated_geometry:
+            update_counter += 1
+            return
+
+
+def selection_key(target_objects):
+    ''' Identity of the target set, independent of Python wrapper objects. '''
+    return hash(tuple(obj.as_pointer() for obj in target_objects))
+
+
+def fingerprint(target_objects, active_object, *settings):
+    ''' Cheap key describing everything the target measurement depends on. '''
+    return (
+        selection_key(target_objects),
+        active_object.as_pointer() if active_object else 0,
+        update_counter,
+        settings,
+        )
+
+
+def distance_key(view_distance):
+    ''' view_distance rounded to the significant digits kept in view keys. '''
+    return float(f"{view_distance:.{VIEW_DISTANCE_DIGITS}g}")
+
+
+def projection_key(region_3d):
+    '''
+    Lens, aspect and shift of a view: the rows of the window matrix clip_start
+    and clip_end do not enter, rounded like the view distance. The perspective
+    matrix changes with every clip write and cannot be part of a view key.
+    '''
+    return region_3d.is_perspective, tuple(distance_key(value) for row in region_3d.window_matrix[:2] for value in row)
+
+
+def note_scene_update(scene, depsgraph):
+    '''
+    Bump the scene counter if objects may have been added or removed. Linking
+    to or unlinking from a collection updates the collection, the scene
+    collection reports as the scene, which selection changes update as well,
+    so scene updates only count once the number of objects changed.
+    '''
+    global scene_counter
+    for update in depsgraph.updates:
+        id_type = update.id.id_type
+        if id_type == 'COLLECTION':
+            scene_counter += 1
+            return
+        if id_type == 'SCENE':
+            count = len(scene.objects)
+            if scene_object_counts.get(scene.as_pointer()) != count:
+                scene_object_counts[scene.as_pointer()] = count
+                scene_counter += 1
+            return
+
+
+def scene_key(scene):
+    ''' Identity of the scene and its object set, constant time, see note_scene_update(). '''
+    return scene.as_pointer(), scene_counter
+
+
+# Returned by ClippingCache.lookup on a miss, None is a valid cached measurement
+MISS = object()
+
+
+class ClippingCache:
+    ''' Single entry memo of the last target measurement, with hit and miss counters. '''
+
+    def __init__(self):
+        self.key = None
+        self.value = None
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key):
+        ''' Return the cached value for key, or MISS. '''
+        if key == self.key:
+            self.hits += 1
+            return self.value
+        self.misses += 1
+        return MISS
+
+    def store(self, key, value):
+        self.key = key
+        self.value = value
+
+    def clear(self):
+        self.key = None
+        self.value = None
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def stats_text(self):
+        total = self.hits + self.misses
+        ratio = self.hits / total * 100.0 if total else 0.0
+        return f"Cache: {self.hits} hits / {self.misses} misses ({ratio:.1f}%)"
+
+
+class ViewStates:
+    ''' Last applied key of every 3D view, to skip views whose inputs did not change. '''
+
+    def __init__(self):
+        self.keys = {}
+        self.applied = 0
+        self.skipped = 0
+
+    def changed(self, space, key):
+        ''' True (and remember key) if space was last clipped for a different key. '''
+        pointer = space.as_pointer()
+        if self.keys.get(pointer) == key:
+            self.skipped += 1
+            return False
+        self.keys[pointer] = key
+        self.applied += 1
+        return True
+
+    def clear(self):
+        self.keys.clear()
+
+    def stats_text(self):
+        return f"Views: {self.applied} applied / {self.skipped} skipped"
+
+
+def within(old, new, threshold):
+    ''' True if new differs from old by no more than threshold relative to old. '''
+    return abs(new - old) <= threshold * abs(old)
+
+
+class WriteElision:
+    '''
+    Last applied clip range of every written datablock. Writes closer than the
+    relative threshold to the last applied range are skipped, so small drifts
+    accumulate until they cross the threshold instead of writing on every event.
+    '''
+
+    def __init__(self):
+        self.applied = {}
+        self.written = 0
+        self.skipped = 0
+
+    def write(self, owner, start_attr, end_attr, start, end, threshold):
+        ''' Set owner.start_attr/end_attr unless both stay within threshold, returns True if written. '''
+        key = (owner.as_pointer(), start_attr)
+        last = self.applied.get(key)
+        if last is not None and within(last[0], start, threshold) and within(last[1], end, threshold):
+            self.skipped += 1
+            return False
+
+        setattr(owner, start_attr, start)
+        setattr(owner, end_attr, end)
+        self.applied[key] = (start, end)
+        self.written += 1
+        return True
+
+    def forget(self, owner, start_attr):
+        ''' Drop the last applied range of owner, after its clip values were set some other way. '''
+        self.applied.pop((owner.as_pointer(), start_attr), None)
+
+    def clear(self):
+        self.applied.clear()
+
+    def stats_text(self):
+        return f"Writes: {self.written} performed / {self.skipped} skipped"
+
+
+clipping_cache = ClippingCache()
+view_states = ViewStates()
+write_elision = WriteElision()
@@ -0,0 +1,110 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+'''
+Bounds of the selected vertices in mesh edit mode.
+
+Tweaking a few vertices of a huge scan, the whole object says nothing
+about where the work happens. The edit mesh is synced to the mesh once,
+coordinates and selection flags are read with foreach_get and reduced to
+the local box of the selected vertices. That box is kept per object until
+the selected vertex count changes or the depsgraph reports any update of
+the object or its mesh, so orbiting never reads the mesh again.
+'''
+
+import numpy
+from . import bounds
+
+
+class SelectedComponents:
+    ''' Local boxes of the selected vertices per object in edit mode. '''
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        # object pointer -> ((local_lo, local_hi) or None, selected vertex count, mesh pointer)
+        self.boxes = {}
+        # Bumped whenever a box is read or dropped, part of the measurement fingerprint
+        self.counter = 0
+        self.reads = 0
+
+    def note_depsgraph_update(self, depsgraph):
+        '''
+        Drop the boxes of objects with any update of their own or of their
+        mesh. Moving a selection keeps its count, edit mode tweaks are often
+        only reported on the mesh ID, so no update flag is trusted.
+        '''
+        if not self.boxes:
+            return
+        for update in depsgraph.updates:
+            id_type = update.id.id_type
+            if id_type == 'OBJECT':
+                stale = [update.id.original.as_pointer()]
+            elif id_type == 'MESH':
+                mesh = update.id.original.as_pointer()
+                stale = [pointer for pointer, entry in self.boxes.items() if entry[2] == mesh]
+            else:
+                continue
+            for pointer in stale:
+                if self.boxes.pop(pointer, None) is not None:
+                    self.counter += 1
+
+    def _read(self, obj):
+        ''' (local_lo, local_hi) of the selected vertices of obj, None if none is selected. '''
+        obj.update_from_editmode()
+        vertices = obj.data.vertices
+        count = len(vertices)
+        self.reads += 1
+        if not count:
+            return None
+        mask = numpy.empty(count, dtype=bool)
+        vertices.foreach_get('select', mask)
+        if not mask.any():
+            return None
+        co = numpy.empty(count * 3, dtype=numpy.float32)
+        vertices.foreach_get('co', co)
+        selected = co.reshape(-1, 3)[mask]
+        return selected.min(axis=0).astype(numpy.float64), selected.max(axis=0).astype(numpy.float64)
+
+    def aggregate(self, edit_objects):
+        '''
+        (union_lo, union_hi, min_extent) of the selected vertices of all
+        objects in edit mode, None if no vertex is selected.
+        '''
+        found = []
+        for obj in edit_objects:
+            pointer = obj.as_pointer()
+            # Read from the edit mesh without a sync, constant time
+            selected = obj.data.total_vert_sel
+            entry = self.boxes.get(pointer)
+            if entry is None or entry[1] != selected:
+                entry = self.boxes[pointer] = (self._read(obj), selected, obj.data.as_pointer())
+                self.counter += 1
+            if entry[0] is not None:
+                found.append((obj, entry[0]))
+        if not found:
+            return None
+
+        matrices = bounds.gather_matrices([obj for obj, _ in found], len(found))
+        local_lo = numpy.array([box[0] for _, box in found])
+        local_hi = numpy.array([box[1] for _, box in found])
+        return bounds.aggregate_aabbs(*bounds.transform_boxes(matrices, local_lo, local_hi))
+
+
+selected_components = SelectedComponents()
@@ -0,0 +1,157 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+'''
+World bounds of selected objects including all their descendants.
+
+The root of a rig or an assembly is often an empty or an armature of no
+size while its children span the whole set. A parent to children index of
+the scene is built once, then the bounds of every subtree are reduced
+bottom-up and kept per object. A moved or edited object only drops its own
+box and the subtree bounds along its ancestor chain, so reselecting a large
+assembly re-reduces just the branches that changed.
+'''
+
+from . import bounds
+from . import blend_cache
+from . import cache
+
+
+class Hierarchy:
+    ''' Parent to children index of a scene with cached subtree aggregates. '''
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.key = None
+        # object pointer -> child objects, and child pointer -> parent pointer
+        self.children = {}
+        self.parents = {}
+        # object pointer -> (lo, hi, extent) of the object itself
+        self.boxes = {}
+        # object pointer -> (union_lo, union_hi, min_extent) of the object and its descendants, None if empty
+        self.subtrees = {}
+        # (root pointers, object types) -> descendants, see expand()
+        self.expanded = (None, [])
+        self.builds = 0
+        self.reduced = 0
+
+    def ensure(self, scene):
+        ''' Build the parent index if objects were added or removed since the last build. '''
+        key = cache.scene_key(scene)
+        if key == self.key:
+            return
+        builds = self.builds
+        self.clear()
+        self.key = key
+        self.builds = builds
+        children = self.children
+        parents = self.parents
+        for obj in scene.objects:
+            parent = obj.parent
+            if parent is not None:
+                parent_pointer = parent.as_pointer()
+                children.setdefault(parent_pointer, []).append(obj)
+                parents[obj.as_pointer()] = parent_pointer
+        self.builds += 1
+
+    def note_depsgraph_update(self, depsgraph):
+        '''
+        Drop the box of changed objects and the subtrees of their ancestors.
+        A changed parent means the index itself is out of date.
+        '''
+        if self.key is None:
+            return
+        parents = self.parents
+        subtrees = self.subtrees
+        for update in depsgraph.updates:
+            if update.id.id_type != 'OBJECT':
+                continue
+            if not (update.is_updated_transform or update.is_updated_geometry):
+                continue
+            original = update.id.original
+            pointer = original.as_pointer()
+            parent = original.parent
+            if parents.get(pointer) != (parent.as_pointer() if parent is not None else None):
+                self.key = None
+                return
+            self.boxes.pop(pointer, None)
+            while pointer is not None and subtrees.pop(pointer, False) is not False:
+                pointer = parents.get(pointer)
+
+    def expand(self, roots, object_types):
+        ''' Roots and all their descendants of a supported type, each object once. '''
+        selection = (tuple(obj.as_pointer() for obj in roots), tuple(object_types))
+        if self.expanded[0] == selection:
+            return self.expanded[1]
+        found = {}
+        stack = list(reversed(roots))
+        while stack:
+            obj = stack.pop()
+            pointer = obj.as_pointer()
+            if pointer in found:
+                continue
+            found[pointer] = obj
+            stack.extend(reversed(self.children.get(pointer, ())))
+        expanded = [obj for obj in found.values() if obj.type in object_types]
+        self.expanded = (selection, expanded)
+        return expanded
+
+    def aggregate(self, roots, object_types):
+        ''' (union_lo, union_hi, min_extent) of the roots and their descendants, None if all are empty. '''
+        children = self.children
+        subtrees = self.subtrees
+        # Pre-order walk that stops at subtrees still cached, parents come before their children
+        order = []
+        stack = list(roots)
+        while stack:
+            obj = stack.pop()
+            pointer = obj.as_pointer()
+            if pointer in subtrees:
+                continue
+            order.append(obj)
+            stack.extend(children.get(pointer, ()))
+
+        boxes = self.boxes
+        missing = [obj for obj in order if obj.type in object_types and obj.as_pointer() not in boxes]
+        if missing:
+            lo, hi = blend_cache.world_aabbs(missing)
+            extents = bounds.positive_min_extent(lo, hi)
+            for obj, box_lo, box_hi, extent in zip(missing, lo, hi, extents):
+                boxes[obj.as_pointer()] = (box_lo, box_hi, float(extent))
+
+        merge = bounds.merge_aggregates
+        for obj in reversed(order):
+            pointer = obj.as_pointer()
+            subtree = boxes.get(pointer) if obj.type in object_types else None
+            for child in children.get(pointer, ()):
+                subtree = merge(subtree, subtrees[child.as_pointer()])
+            subtrees[pointer] = subtree
+        self.reduced += len(order)
+
+        aggregate = None
+        for obj in roots:
+            aggregate = merge(aggregate, subtrees[obj.as_pointer()])
+        return aggregate
+
+    def stats_text(self):
+        return f"Hierarchy: {len(self.parents)} parented, {len(self.subtrees)} subtrees cached, {self.reduced} reduced"
+
+
+hierarchy = Hierarchy()
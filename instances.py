@@ -0,0 +1,141 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+'''
+Bounds of instances spawned by the targets.
+
+An empty instancing a collection or a geometry nodes scatter reports zero
+or tiny dimensions, the geometry only exists as depsgraph instances. The
+instances of the targets are collected from depsgraph.object_instances,
+the local bounds are read once per prototype datablock and all instance
+matrices are applied to them in one batch.
+'''
+
+import numpy
+from . import bounds
+
+
+def spawns_instances(obj):
+    ''' True if obj can have depsgraph instances: instancing is set up or a geometry nodes modifier may add them. '''
+    return obj.is_instancer or obj.instance_type != 'NONE' or any(modifier.type == 'NODES' for modifier in obj.modifiers)
+
+
+def prototype_key(instance, parent_pointer):
+    '''
+    (key, persistent) of the source datablock of an instance, shared by all
+    its instances. Geometry nodes geometry instances come as temporary objects
+    whose original is the instancer itself, they are keyed on their evaluated
+    data. Those keys only hold for one walk and are not kept between walks.
+    '''
+    prototype = instance.object
+    original = prototype.original
+    if original.as_pointer() == parent_pointer:
+        data = prototype.data
+        return (data.as_pointer() if data is not None else prototype.as_pointer()), False
+    data = original.data
+    return (data.as_pointer() if data is not None else original.as_pointer()), True
+
+
+class InstanceBounds:
+    ''' Prototype bound cache and the last instance aggregate of the targets. '''
+
+    def __init__(self):
+        self.prototypes = {}
+        self.clear()
+
+    def clear(self):
+        self.prototypes.clear()
+        self.key = object() # Matches no caller key
+        self.aggregate = None
+        self.instances = 0
+
+    def note_depsgraph_update(self, depsgraph):
+        ''' Drop cached prototype bounds of changed geometry. '''
+        for update in depsgraph.updates:
+            if update.is_updated_geometry and update.id.id_type == 'OBJECT':
+                original = update.id.original
+                data = original.data
+                self.prototypes.pop(data.as_pointer() if data is not None else original.as_pointer(), None)
+
+    def _prototype_index(self, instance, parent_pointer, boxes, indices):
+        key, persistent = prototype_key(instance, parent_pointer)
+        index = indices.get(key)
+        if index is None:
+            box = self.prototypes.get(key) if persistent else None
+            if box is None:
+                corners = numpy.array([tuple(corner) for corner in instance.object.bound_box], dtype=numpy.float64)
+                box = (corners.min(axis=0), corners.max(axis=0))
+                if persistent:
+                    self.prototypes[key] = box
+            index = indices[key] = len(boxes)
+            boxes.append(box)
+        return index
+
+    def aggregate_instances(self, depsgraph, target_objects, key):
+        '''
+        (union_lo, union_hi, min_extent) of all instances whose instancer is
+        one of the targets, None if they spawn none. key identifies the
+        selection and depsgraph state, the walk is skipped while it is unchanged.
+        '''
+        if key == self.key:
+            return self.aggregate
+
+        boxes = self.instance_boxes(depsgraph, target_objects)
+        self.key = key
+        self.aggregate = None if boxes is None else bounds.aggregate_aabbs(*bounds.transform_boxes(*boxes))
+        return self.aggregate
+
+    def instance_boxes(self, depsgraph, target_objects):
+        '''
+        Instance matrices (N, 4, 4) with the local (N, 3) lo and hi of their
+        prototypes, None if the targets spawn no instances. Only reads the
+        depsgraph, the transform is left to the caller. The instances of the
+        whole scene are only walked if one of the targets can spawn any.
+        '''
+        parents = {obj.as_pointer() for obj in target_objects if spawns_instances(obj)}
+        if not parents:
+            self.instances = 0
+            return None
+        prototype_boxes = []
+        prototype_indices = {}
+        instance_prototypes = []
+        matrices = []
+        for instance in depsgraph.object_instances:
+            if not instance.is_instance:
+                continue
+            parent = instance.parent
+            if parent is None:
+                continue
+            parent_pointer = parent.original.as_pointer()
+            if parent_pointer not in parents:
+                continue
+            instance_prototypes.append(self._prototype_index(instance, parent_pointer, prototype_boxes, prototype_indices))
+            # The iterator reuses the instance, copy the values out right away
+            matrices.extend(value for row in instance.matrix_world for value in row)
+
+        self.instances = len(instance_prototypes)
+        if not instance_prototypes:
+            return None
+
+        matrices = numpy.array(matrices, dtype=numpy.float64).reshape(-1, 4, 4)
+        instance_prototypes = numpy.array(instance_prototypes)
+        local_lo = numpy.array([box[0] for box in prototype_boxes])[instance_prototypes]
+        local_hi = numpy.array([box[1] for box in prototype_boxes])[instance_prototypes]
+        return matrices, local_lo, local_hi
+
+instance_bounds = InstanceBounds()
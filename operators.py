@@ -0,0 +1,124 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+'''
+Operators of the baking and tracing tools.
+
+They are registered with the add-on, the modules doing the actual work
+import NumPy and are only loaded once one of them runs.
+'''
+
+from bpy.types import Operator
+from bpy.props import IntProperty, FloatProperty, StringProperty
+from bpy_extras.io_utils import ExportHelper, ImportHelper
+
+
+class ClippingAssistant_BakeCamera(Operator):
+    bl_idname = "scene.clipping_assistant_bake_camera"
+    bl_label = "Bake Camera Clipping"
+    bl_description = "Key the clipping of the scene camera on every frame of the range so it fits the selected objects"
+    bl_options = {"REGISTER", "UNDO"}
+
+    frame_start: IntProperty(name="Start Frame", default=1)
+    frame_end: IntProperty(name="End Frame", default=250)
+    tolerance: FloatProperty(
+        name="Tolerance",
+        description="Relative error allowed between baked keys, higher values give fewer keys",
+        default=0.01,
+        min=0.0,
+        soft_max=0.1,
+        subtype='FACTOR')
+
+    @classmethod
+    def poll(cls, context):
+        return context.scene.camera is not None and context.scene.camera.type == 'CAMERA'
+
+    def invoke(self, context, event):
+        self.frame_start = context.scene.frame_start
+        self.frame_end = context.scene.frame_end
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        from . import load_engine, prefs, resolve_targets, ClippingAssistant
+        load_engine()
+        from . import bake
+
+        scene = context.scene
+        camera = scene.camera
+        target_objects = [obj for obj in resolve_targets(context) if obj != camera]
+        if not target_objects:
+            target_objects = [obj for obj in scene.objects if obj.type in ClippingAssistant.ob_type]
+        if not target_objects or self.frame_end < self.frame_start:
+            self.report({'WARNING'}, "Nothing to bake")
+            return {'CANCELLED'}
+
+        frames, keys = bake.bake_camera(scene, camera, target_objects, self.frame_start, self.frame_end,
+                                        self.tolerance, prefs().depth_margin)
+        self.report({'INFO'}, f"Baked {frames} frames into {keys} keys on {camera.data.name}")
+        return {'FINISHED'}
+
+
+class ClippingAssistant_RecordTrace(Operator, ExportHelper):
+    bl_idname = "scene.clipping_assistant_record_trace"
+    bl_label = "Record Navigation Trace"
+    bl_description = "Write every trigger event with view and target state to a trace file until recording is stopped"
+
+    filename_ext = ".catrace"
+    filter_glob: StringProperty(default="*.catrace", options={'HIDDEN'})
+
+    def execute(self, context):
+        from . import current_settings, load_engine
+        load_engine()
+        from . import trace
+        trace.recorder.start(self.filepath, current_settings())
+        self.report({'INFO'}, f"Recording navigation to {self.filepath}")
+        return {'FINISHED'}
+
+
+class ClippingAssistant_StopTrace(Operator):
+    bl_idname = "scene.clipping_assistant_stop_trace"
+    bl_label = "Stop Trace Recording"
+    bl_description = "Close the navigation trace being recorded"
+
+    def execute(self, context):
+        from . import trace
+        filepath = trace.recorder.filepath
+        events = trace.recorder.stop()
+        self.report({'INFO'}, f"{events} events written to {filepath}")
+        return {'FINISHED'}
+
+
+class ClippingAssistant_ReplayTrace(Operator, ImportHelper):
+    bl_idname = "scene.clipping_assistant_replay_trace"
+    bl_label = "Replay Navigation Trace"
+    bl_description = "Run a recorded trace through the clipping pipeline and print latency and clip values per event"
+
+    filename_ext = ".catrace"
+    filter_glob: StringProperty(default="*.catrace", options={'HIDDEN'})
+
+    def execute(self, context):
+        from . import load_engine
+        load_engine()
+        from . import trace
+        try:
+            rows = trace.main(['', '--', self.filepath])
+        except ValueError as error:
+            self.report({'ERROR'}, f"Cannot replay {self.filepath}: {error}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Replayed {len(rows)} events, report printed to the console")
+        return {'FINISHED'}
@@ -0,0 +1,91 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+'''
+Settings snapshot and composed clipping pipeline.
+
+Every preference read is an RNA lookup. The hot path reads a slotted,
+read-only copy of the preferences instead, rebuilt by the update callback
+of every preference. The stages of apply_clipping are composed once from
+the same snapshot, so disabled features are simply not in the list and
+the per-call code does not test them.
+'''
+
+from . import preferences
+from . import profiling
+
+
+# Every property declared on the preferences class
+FIELDS = tuple(preferences.ClippingAssistant_Preferences.__annotations__)
+
+
+class Settings:
+    ''' Read-only copy of the add-on preferences. '''
+    __slots__ = FIELDS
+
+    def __init__(self, source):
+        for name in FIELDS:
+            object.__setattr__(self, name, getattr(source, name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Settings are read-only, change the '{name}' preference instead")
+
+
+class ClippingPass:
+    ''' State handed from stage to stage during one apply_clipping call. '''
+    __slots__ = ('context', 'target_objects', 'spaces', 'key', 'measurement', 'aggregate', 'view_clipping')
+
+    def __init__(self, context, target_objects):
+        self.context = context
+        self.target_objects = target_objects
+        self.spaces = None
+        self.key = None
+        self.measurement = None
+        self.aggregate = None
+        self.view_clipping = None
+
+
+class Pipeline:
+    '''
+    Stages composed for one settings snapshot. A stage is called as
+    stage(settings, clipping_pass) and returns False to end the pass early.
+    '''
+    __slots__ = ('settings', 'stages')
+
+    def __init__(self, settings, stages):
+        self.settings = settings
+        self.stages = tuple(stages)
+
+    def run(self, context, target_objects=None):
+        clipping_pass = ClippingPass(context, target_objects)
+        settings = self.settings
+        for stage in self.stages:
+            if not stage(settings, clipping_pass):
+                break
+        return clipping_pass
+
+
+def timed(name, stage, enabled):
+    ''' Wrap stage in a profiling span, or return it untouched when profiling is off. '''
+    if not enabled:
+        return stage
+
+    def run(settings, clipping_pass):
+        with profiling.span(name):
+            return stage(settings, clipping_pass)
+    return run
@@ -17,7 +17,13 @@
 # ##### END GPL LICENSE BLOCK #####
 
 from bpy.types import AddonPreferences
-from bpy.props import BoolProperty, FloatProperty
+from bpy.props import BoolProperty, FloatProperty, EnumProperty
+
+
+def update_settings(self, context):
+    ''' Rebuild the settings snapshot and the clipping pipeline from the changed preferences. '''
+    from . import rebuild_pipeline
+    rebuild_pipeline(self)
 
 
 class ClippingAssistant_Preferences(AddonPreferences):
@@ -26,7 +32,8 @@ class ClippingAssistant_Preferences(AddonPreferences):
     auto_clipping: BoolProperty(
         name="Auto Clipping",
         description="Adjust clipping distance automaticly on selected context",
-        default=True) #dfault: True
+        default=True, #dfault: True
+        update=update_settings)
     
 
     clip_start_distance: FloatProperty(
@@ -37,7 +44,8 @@ class ClippingAssistant_Preferences(AddonPreferences):
         soft_min = 0.0001,
         soft_max=0.01,
         step=1,
-        subtype='DISTANCE') 
+        subtype='DISTANCE',
+        update=update_settings)
 
     clip_end_distance: FloatProperty(
         name="Clip End Distance",
@@ -47,32 +55,196 @@ class ClippingAssistant_Preferences(AddonPreferences):
         soft_min = 0.01,
         soft_max=200,
         step=1,
-        subtype='DISTANCE') 
+        subtype='DISTANCE',
+        update=update_settings)
+
+    clipping_mode: EnumProperty(
+        name="Clipping",
+        description="How clip start and end are derived from the targets",
+        items=[
+            ('DISTANCE', "View Distance", "Scale target size by the view distance"),
+            ('DEPTH_FIT', "Depth Fit", "Fit clip start and end tightly around the targets along the view axis, best depth precision"),
+            ],
+        default='DISTANCE',
+        update=update_settings)
+
+    depth_margin: FloatProperty(
+        name="Depth Margin",
+        description="Relative margin added in front of and behind the targets when fitting the depth range",
+        default=0.1,
+        min=0.0,
+        soft_max=1.0,
+        subtype='FACTOR',
+        update=update_settings)
+
+    near_clip: EnumProperty(
+        name="Near Clip",
+        description="What the clip start is derived from",
+        items=[
+            ('TARGET_SIZE', "Target Size", "Scale the smallest target dimension by the view distance"),
+            ('SURFACE', "Nearest Surface", "Distance from the viewpoint to the nearest target surface, for close-up work on large meshes"),
+            ],
+        default='TARGET_SIZE',
+        update=update_settings)
+
+    surface_cache_size: FloatProperty(
+        name="Surface Cache Size",
+        description="Memory in MB the nearest surface search may keep for built trees, least recently used trees are dropped first",
+        default=512.0,
+        min=16.0,
+        soft_max=4096.0,
+        precision=0,
+        update=update_settings)
+
+    instance_bounds: BoolProperty(
+        name="Include Instances",
+        description="Include collection and geometry nodes instances spawned by the targets in their world bounds",
+        default=True,
+        update=update_settings)
+
+    include_children: BoolProperty(
+        name="Include Children",
+        description="Fit clipping to the selected objects together with all their descendants, for rigs and assemblies selected by their root",
+        default=False,
+        update=update_settings)
+
+    visible_scene_clipping: BoolProperty(
+        name="Fit Visible Scene",
+        description="When nothing is selected, fit clipping to the scene objects inside the view frustum instead of guessing from the view distance",
+        default=False,
+        update=update_settings)
+
+    bounds_mode: EnumProperty(
+        name="Bounds",
+        description="How the extent of the target objects is measured",
+        items=[
+            ('AABB', "World Bounds", "Transform every bounding box into world space and use the box enclosing all targets"),
+            ('ORIGIN', "Origins", "Use object origins and dimensions, ignores rotation and scale"),
+            ],
+        default='AABB',
+        update=update_settings)
+
+    component_clipping: BoolProperty(
+        name="Edit Mode Selection",
+        description="In mesh edit mode, fit clipping to the selected vertices of all meshes being edited instead of the whole objects",
+        default=True,
+        update=update_settings)
 
     camera_clipping: BoolProperty(
         name="Apply Clipping To Active Camera",
         description="When enabled the clipping Distance of the Active Camera is adjusted as well as the Viewport Clip Distance",
-        default=False)
+        default=False,
+        update=update_settings)
+
+    camera_scope: EnumProperty(
+        name="Cameras",
+        description="Which cameras get their clipping adjusted",
+        items=[
+            ('VIEW', "View Camera", "Only the camera of the primary 3D view"),
+            ('SCENE', "All Cameras", "Every camera object in the scene, each fitted to the targets from its own point of view"),
+            ('MARKERS', "Marker Cameras", "Every camera bound to a timeline marker, each fitted to the targets from its own point of view"),
+            ],
+        default='VIEW',
+        update=update_settings)
 
     volume_clipping: BoolProperty(
         name="Apply Clipping To Volumetrics",
         description="Adapt Clipping distances of volumetric effects",
-        default=False)
+        default=False,
+        update=update_settings)
     
+    render_clipping: BoolProperty(
+        name="Clip Camera On Frame Change",
+        description="Fit the scene camera clipping to the targets on every frame change, also in background renders (blender -b) where no viewport exists",
+        default=False,
+        update=update_settings)
+
+    update_interval: FloatProperty(
+        name="Update Interval",
+        description="Quiet time in milliseconds after the last navigation event before clipping is applied, 0 applies on every event",
+        default=16.0,
+        min=0.0,
+        soft_max=100.0,
+        precision=1,
+        subtype='NONE',
+        update=update_settings)
+
+    max_update_latency: FloatProperty(
+        name="Max Update Latency",
+        description="Longest time in milliseconds a continuous navigation may delay the clipping update",
+        default=100.0,
+        min=0.0,
+        soft_max=500.0,
+        precision=1,
+        subtype='NONE',
+        update=update_settings)
+
+    warmup: BoolProperty(
+        name="Warm Up On Enable",
+        description="Build the bounds and indexes of the current targets right after the assistant is enabled instead of on the first navigation event",
+        default=False,
+        update=update_settings)
+
+    write_threshold: FloatProperty(
+        name="Write Threshold",
+        description="Only write new clip distances when they differ by more than this factor from the last applied ones",
+        default=0.02,
+        min=0.0,
+        soft_max=0.25,
+        subtype='FACTOR',
+        update=update_settings)
+
     debug_output: BoolProperty(
         name="Debug: Output",
         description="Enable some debug output",
-        default=False) #default=False
+        default=False, #default=False
+        update=update_settings)
         
     debug_profiling: BoolProperty(
         name="Debug: Profiling",
-        description="Enable some performance output",
-        default=False) #default=False
+        description="Record timings of the clipping stages and show their percentiles",
+        default=False, #default=False
+        update=update_settings)
     
+    vectorized_bounds: BoolProperty(
+        name="Vectorized Bounds",
+        description="Read target dimensions and locations in one bulk pass and reduce them with NumPy, disable to use the scalar reference path",
+        default=True, #default=True
+        update=update_settings)
+
+    incremental_bounds: BoolProperty(
+        name="Incremental Bounds",
+        description="Keep per-object world bounds between events and only re-read objects the depsgraph reports as changed",
+        default=True, #default=True
+        update=update_settings)
+
+    persistent_bounds: BoolProperty(
+        name="Save Bounds With File",
+        description="Keep the local bounds of mesh datablocks in the .blend file, so the first update after opening a large set does not read every bounding box",
+        default=False,
+        update=update_settings)
+
+    threaded_bounds: BoolProperty(
+        name="Threaded Bounds",
+        description="Reduce the world bounds of large selections on a worker thread, clipping follows one timer tick later",
+        default=False,
+        update=update_settings)
+
+    redraw_method: EnumProperty(
+        name="Header Refresh",
+        description="How the clipping readout in the Top Bar is refreshed after an update",
+        items=[
+            ('TAG', "Tag Redraw", "Tag only the Top Bar header regions for redraw on the next timer tick"),
+            ('FRAME_SET', "Frame Set", "Legacy refresh, re-sets the current frame and re-evaluates the whole scene"),
+            ],
+        default='TAG',
+        update=update_settings)
+
     show_clipping_distance: BoolProperty(
         name="Show Clipping Distance",
         description="Show the current clipping distance in the header",
-        default=False) #default=False
+        default=False, #default=False
+        update=update_settings)
     
 
     def draw(self, context):
@@ -81,19 +253,78 @@ class ClippingAssistant_Preferences(AddonPreferences):
 
         # General settings
         layout.prop(self, 'camera_clipping')
+        if self.camera_clipping:
+            layout.prop(self, 'camera_scope')
         layout.prop(self, 'volume_clipping')
         layout.prop(self, 'auto_clipping')
 
         # Clipping settings
-        if not self.auto_clipping:  
+        if self.auto_clipping:
+            layout.prop(self, 'clipping_mode')
+            if self.clipping_mode == 'DEPTH_FIT':
+                layout.prop(self, 'depth_margin', slider=True)
+            layout.prop(self, 'near_clip')
+            if self.near_clip == 'SURFACE':
+                layout.prop(self, 'surface_cache_size')
+            layout.prop(self, 'bounds_mode')
+            if self.bounds_mode == 'AABB' or self.clipping_mode == 'DEPTH_FIT':
+                layout.prop(self, 'instance_bounds')
+            layout.prop(self, 'include_children')
+            layout.prop(self, 'visible_scene_clipping')
+            layout.prop(self, 'component_clipping')
+        else:  
             column = layout.box()      
             column.prop(self, 'clip_start_distance', slider=True)
             column.prop(self, 'clip_end_distance', slider=True)
 
+        # Animated cameras
+        layout.prop(self, 'render_clipping')
+        layout.operator("scene.clipping_assistant_bake_camera", icon='KEYINGSET')
+
+        # Update scheduling
+        schedule_box = layout.box()
+        schedule_box.label(text="Update Scheduling")
+        schedule_box.prop(self, 'update_interval')
+        row = schedule_box.row()
+        row.active = self.update_interval > 0.0
+        row.prop(self, 'max_update_latency')
+        schedule_box.prop(self, 'write_threshold', slider=True)
+        schedule_box.prop(self, 'warmup')
+
         # Debug settings
         debug_box = layout.box()
         debug_box.label(text="Debug Settings")
         debug_box.prop(self, 'show_clipping_distance')
         debug_box.prop(self, 'debug_output')
         debug_box.prop(self, 'debug_profiling')
+        debug_box.prop(self, 'vectorized_bounds')
+        debug_box.prop(self, 'incremental_bounds')
+        debug_box.prop(self, 'threaded_bounds')
+        debug_box.prop(self, 'persistent_bounds')
+        debug_box.prop(self, 'redraw_method')
+        if self.debug_profiling:
+            from . import cache, engine_loaded, profiling
+            profile_box = debug_box.box()
+            profiling.draw_stats(profile_box)
+            profile_box.label(text=cache.clipping_cache.stats_text())
+            profile_box.label(text=cache.view_states.stats_text())
+            profile_box.label(text=cache.write_elision.stats_text())
+            recording = False
+            if engine_loaded:
+                # Drawing the panel must not load NumPy, the engine caches only exist once clipping ran
+                from . import blend_cache, hierarchy, surface, trace, workers
+                recording = trace.recorder.active
+                profile_box.label(text=surface.surface_trees.stats_text())
+                profile_box.label(text=workers.bounds_worker.stats_text())
+                profile_box.label(text=blend_cache.datablock_bounds.stats_text())
+                profile_box.label(text=hierarchy.hierarchy.stats_text())
+            row = profile_box.row(align=True)
+            row.operator("scene.clipping_assistant_export_profile", icon='EXPORT')
+            row.operator("scene.clipping_assistant_reset_profile", icon='TRASH')
+            row = profile_box.row(align=True)
+            if recording:
+                row.operator("scene.clipping_assistant_stop_trace", icon='PAUSE')
+            else:
+                row.operator("scene.clipping_assistant_record_trace", icon='REC')
+            row.operator("scene.clipping_assistant_replay_trace", icon='PLAY')
 
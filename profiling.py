@@ -0,0 +1,206 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+'''
+Named timing spans with percentile statistics.
+
+Wrap a stage with `with profiling.span("bounds"):`. While profiling is
+disabled span() hands out a shared no-op object, so the hot path only pays
+for one global lookup. Recent samples of every span are kept in a ring
+buffer and summarized as p50/p95/p99, exportable to JSON or CSV.
+'''
+
+import csv
+import json
+import math
+import time
+from collections import deque
+from bpy.types import Operator
+from bpy.props import StringProperty, EnumProperty
+from bpy_extras.io_utils import ExportHelper
+
+
+# Synced from the debug_profiling preference
+enabled = False
+
+# Samples kept per span
+RING_SIZE = 512
+
+# Stage names in pipeline order, used to sort the summary
+STAGES = ('targets', 'bounds', 'policy', 'surface', 'apply', 'volume', 'camera', 'redraw')
+
+samples = {}
+counters = {}
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class _Span:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name):
+    ''' Context manager timing one execution of the named stage. '''
+    if not enabled:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def record(name, seconds):
+    ''' Add one sample in seconds to the ring buffer of name. '''
+    ring = samples.get(name)
+    if ring is None:
+        ring = samples[name] = deque(maxlen=RING_SIZE)
+    ring.append(seconds * 1000.0)
+
+
+def count(name, value):
+    ''' Record a counter value alongside the timings, e.g. object counts. '''
+    if enabled:
+        counters[name] = value
+
+
+def reset():
+    samples.clear()
+    counters.clear()
+
+
+def percentile(sorted_values, fraction):
+    ''' Nearest-rank percentile of an already sorted list. '''
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _order(name):
+    return (STAGES.index(name) if name in STAGES else len(STAGES), name)
+
+
+def summary():
+    ''' One dict per span with sample count, mean, p50, p95, p99 and max in milliseconds. '''
+    rows = []
+    for name in sorted(samples, key=_order):
+        values = sorted(samples[name])
+        if not values:
+            continue
+        rows.append({
+            'span': name,
+            'count': len(values),
+            'mean_ms': sum(values) / len(values),
+            'p50_ms': percentile(values, 0.50),
+            'p95_ms': percentile(values, 0.95),
+            'p99_ms': percentile(values, 0.99),
+            'max_ms': values[-1],
+            })
+    return rows
+
+
+def export_json(filepath):
+    with open(filepath, 'w') as file:
+        json.dump({'spans': summary(), 'counters': counters}, file, indent=2)
+
+
+def export_csv(filepath):
+    rows = summary()
+    with open(filepath, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=['span', 'count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def draw_stats(layout):
+    ''' Percentile table for the preferences panel. '''
+    rows = summary()
+    if not rows:
+        layout.label(text="No samples recorded yet")
+        return
+
+    column = layout.column(align=True)
+    header = column.row()
+    for title in ("Span", "Count", "p50 ms", "p95 ms", "p99 ms"):
+        header.label(text=title)
+    for row in rows:
+        line = column.row()
+        line.label(text=row['span'])
+        line.label(text=str(row['count']))
+        line.label(text=f"{row['p50_ms']:.3f}")
+        line.label(text=f"{row['p95_ms']:.3f}")
+        line.label(text=f"{row['p99_ms']:.3f}")
+
+    for name, value in sorted(counters.items()):
+        layout.label(text=f"{name}: {value}")
+
+
+class ClippingAssistant_ExportProfile(Operator, ExportHelper):
+    bl_idname = "scene.clipping_assistant_export_profile"
+    bl_label = "Export Profiling Stats"
+    bl_description = "Write the recorded span statistics to a JSON or CSV file"
+
+    filename_ext = ".json"
+    filter_glob: StringProperty(default="*.json;*.csv", options={'HIDDEN'})
+
+    file_format: EnumProperty(
+        name="Format",
+        items=[
+            ('JSON', "JSON", "Spans and counters as JSON"),
+            ('CSV', "CSV", "One row per span"),
+            ],
+        default='JSON')
+
+    def check(self, context):
+        self.filename_ext = ".csv" if self.file_format == 'CSV' else ".json"
+        return super().check(context)
+
+    def execute(self, context):
+        if self.file_format == 'CSV':
+            export_csv(self.filepath)
+        else:
+            export_json(self.filepath)
+        self.report({'INFO'}, f"Profiling stats written to {self.filepath}")
+        return {'FINISHED'}
+
+
+class ClippingAssistant_ResetProfile(Operator):
+    bl_idname = "scene.clipping_assistant_reset_profile"
+    bl_label = "Reset Profiling Stats"
+    bl_description = "Clear all recorded span samples"
+
+    def execute(self, context):
+        reset()
+        return {'FINISHED'}
@@ -0,0 +1,145 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+'''
+Frame change clipping for background renders.
+
+The modal operator never runs in `blender -b`, this handler sets the
+scene camera clipping on every frame instead. It only needs the scene,
+no screen or 3D view: the targets are the selected objects saved with
+the file, or every supported object if none, seen from the camera.
+Results are cached per frame so re-renders and view layers reuse them.
+'''
+
+import time
+import numpy
+from . import bounds
+from . import bake
+from . import cache
+
+
+# (frame, camera) -> (clip_start, clip_end), valid for frame_state
+frame_cache = {}
+frame_state = None
+
+# Camera list per scene, rebuilt when objects are added or removed
+_cameras = {}
+
+
+def scene_targets(scene, object_types):
+    '''
+    Selected supported objects of the scene, or all supported objects if none
+    are selected. Read on every frame, selection changes tag no depsgraph
+    update and the list is cheap next to the bounds pass.
+    '''
+    supported = [obj for obj in scene.objects if obj.type in object_types and obj.type != 'CAMERA']
+    selected = [obj for obj in supported if obj.select_get()]
+    return selected or supported
+
+
+def camera_depth_interval(camera, target_objects):
+    '''
+    (near_depth, far_depth, view_distance, aggregate) of the enclosing target
+    box seen from camera, None without targets. view_distance is the distance
+    from the camera to the box center and stands in for the viewport one.
+    '''
+    aggregate = bounds.aggregate_aabbs(*bounds.world_aabbs(target_objects))
+    if aggregate is None:
+        return None
+
+    camera_matrix = bounds.gather_matrices([camera], 1)[0]
+    near_depth, far_depth = bounds.depth_interval(bounds.camera_view_matrices(camera_matrix), aggregate[0], aggregate[1])
+    offset = (aggregate[0] + aggregate[1]) * 0.5 - camera_matrix[:3, 3]
+    return near_depth, far_depth, float(numpy.sqrt(offset.dot(offset))), aggregate
+
+
+def scene_cameras(scene, scope):
+    '''
+    Camera objects to clip for scope 'SCENE' (every camera in the scene)
+    or 'MARKERS' (cameras bound to timeline markers).
+    '''
+    if scope == 'MARKERS':
+        # Markers are few and can be rebound to another camera at any time, read them on every call
+        found = {marker.camera.as_pointer(): marker.camera for marker in scene.timeline_markers
+                 if marker.camera is not None and marker.camera.type == 'CAMERA'}
+        return list(found.values())
+
+    key = cache.scene_key(scene)
+    cameras = _cameras.get(scene.as_pointer())
+    if cameras is None or cameras[0] != key:
+        cameras = _cameras[scene.as_pointer()] = (key, [obj for obj in scene.objects if obj.type == 'CAMERA'])
+    return cameras[1]
+
+
+def cameras_clipping(cameras, aggregate, margin):
+    '''
+    (clip_starts, clip_ends) of all cameras fitted to one shared target
+    aggregate, the depth intervals of all camera matrices in a single pass.
+    '''
+    count = len(cameras)
+    lo, hi, min_extent = aggregate
+    return bake.clip_ranges(bounds.gather_matrices(cameras, count),
+                            numpy.broadcast_to(lo, (count, 3)), numpy.broadcast_to(hi, (count, 3)),
+                            numpy.full(count, min_extent), margin)
+
+
+def frame_change_clipping(scene, state, object_types, calculate, log=False):
+    '''
+    Apply clipping to the scene camera for the current frame.
+    calculate(camera, target_objects) returns (clip_start, clip_end) or None,
+    state holds everything besides frame, camera and targets the result depends on.
+    '''
+    global frame_state
+    camera = scene.camera
+    if camera is None or camera.type != 'CAMERA':
+        return
+
+    start_time = time.perf_counter()
+    target_objects = scene_targets(scene, object_types)
+    state = (state, cache.selection_key(target_objects))
+    if state != frame_state:
+        frame_cache.clear()
+        frame_state = state
+
+    frame = scene.frame_current
+    key = (frame, camera.as_pointer())
+    clipping = frame_cache.get(key)
+    cached = clipping is not None
+    if not cached:
+        clipping = calculate(camera, target_objects)
+        if clipping is None:
+            return
+        frame_cache[key] = clipping
+
+    data = camera.data
+    if (data.clip_start, data.clip_end) != clipping:
+        data.clip_start, data.clip_end = clipping
+        # Per frame values are exact, the next viewport write must not be elided against an older one
+        cache.write_elision.forget(data, 'clip_start')
+
+    if log:
+        elapsed = (time.perf_counter() - start_time) * 1000.0
+        print(f"Clipping Assistant: frame {frame} {clipping[0]:.4f} <-> {clipping[1]:.4f} "
+              f"in {elapsed:.3f} ms{' (cached)' if cached else ''}")
+
+
+def clear():
+    global frame_state
+    frame_cache.clear()
+    frame_state = None
+    _cameras.clear()
@@ -0,0 +1,96 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+'''
+Event coalescing for the modal handler.
+
+Trackpad pans and fast scrolling send many trigger events per frame.
+Instead of applying clipping for each of them, the modal handler only
+requests an update here. The timer runs once the events have been quiet
+for the minimum interval, but never later than the maximum latency after
+the first request of a burst, so the final view is always applied.
+'''
+
+import bpy
+import time
+
+
+class ClippingScheduler:
+    ''' Collapses bursts of requests into one trailing-edge call on a bpy.app.timers tick. '''
+
+    def __init__(self):
+        self.callback = None
+        self.window = None
+        self.area = None
+        self.min_interval = 0.0
+        self.max_latency = 0.0
+        self.first_request = None
+        self.last_request = None
+        self.requested = 0
+        self.executed = 0
+        # Timers are matched by identity, keep one bound method around
+        self._timer = self._tick
+
+    @property
+    def pending(self):
+        return self.first_request is not None
+
+    def request(self, callback, window, area, min_interval, max_latency):
+        '''
+        Ask for callback(window, area) to run after the current burst of events.
+        Intervals are in seconds.
+        '''
+        now = time.perf_counter()
+        self.callback = callback
+        self.window = window
+        self.area = area
+        self.min_interval = min_interval
+        self.max_latency = max(max_latency, min_interval)
+        self.last_request = now
+        self.requested += 1
+
+        if not self.pending:
+            self.first_request = now
+            bpy.app.timers.register(self._timer, first_interval=min_interval)
+
+    def _tick(self):
+        now = time.perf_counter()
+        due = min(self.last_request + self.min_interval, self.first_request + self.max_latency)
+        if now < due:
+            return due - now # Still inside the burst, check again when it is due
+
+        callback, window, area = self.callback, self.window, self.area
+        self.first_request = None
+        self.executed += 1
+        try:
+            callback(window, area)
+        except ReferenceError:
+            pass # Window or area was closed in the meantime
+        return None
+
+    def cancel(self):
+        ''' Drop a pending update, e.g. when the assistant is switched off. '''
+        if bpy.app.timers.is_registered(self._timer):
+            bpy.app.timers.unregister(self._timer)
+        self.first_request = None
+        self.callback = None
+        self.window = None
+        self.area = None
+
+
+scheduler = ClippingScheduler()
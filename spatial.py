@@ -0,0 +1,233 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+'''
+Spatial index of the world AABBs of all scene objects.
+
+A linear BVH: objects are sorted along a Morton curve of their box centers,
+grouped into fixed size leaves and reduced into an implicit binary tree,
+so building, refitting and querying are all level-by-level array steps.
+Moved objects are refit in place, the tree is rebuilt when objects are
+added or removed or once too many have moved since the last build.
+'''
+
+import numpy
+from . import bounds
+from . import blend_cache
+
+
+LEAF_SIZE = 16
+
+# Rebuild instead of refit once this share of objects moved since the last build
+REBUILD_RATIO = 0.25
+
+
+def _spread_bits(values):
+    ''' Interleave the lower 10 bits of values with two zero bits each. '''
+    values = values.astype(numpy.uint32) & 0x3FF
+    values = (values | (values << 16)) & 0x030000FF
+    values = (values | (values << 8)) & 0x0300F00F
+    values = (values | (values << 4)) & 0x030C30C3
+    values = (values | (values << 2)) & 0x09249249
+    return values
+
+
+def morton_codes(points):
+    ''' 30 bit Morton codes of (N, 3) points normalized to their bounding box. '''
+    lo = points.min(axis=0)
+    span = points.max(axis=0) - lo
+    span[span <= 0.0] = 1.0
+    grid = numpy.clip((points - lo) / span * 1023.0, 0, 1023)
+    return (_spread_bits(grid[:, 0]) << 2) | (_spread_bits(grid[:, 1]) << 1) | _spread_bits(grid[:, 2])
+
+
+def frustum_planes(perspective_matrix, view_matrix):
+    '''
+    Planes (5, 4) as (a, b, c, d) with normals pointing inside: the four side
+    planes from the rows of a projection * view matrix and a plane through the
+    eye facing along the view. The near and far planes come from the current
+    clip_start and clip_end, which is what we are about to set, an object the
+    last near plane cut away would otherwise never be fitted again.
+    '''
+    matrix = numpy.asarray(perspective_matrix, dtype=numpy.float64)
+    view = numpy.asarray(view_matrix, dtype=numpy.float64)
+    planes = numpy.array([
+        matrix[3] + matrix[0], matrix[3] - matrix[0], # left, right
+        matrix[3] + matrix[1], matrix[3] - matrix[1], # bottom, top
+        -view[2], # eye, the view looks along -Z
+        ])
+    lengths = numpy.linalg.norm(planes[:, :3], axis=1)
+    lengths[lengths == 0.0] = 1.0
+    return planes / lengths[:, None]
+
+
+def classify_boxes(lo, hi, planes):
+    '''
+    Classify (N, 3) boxes against the planes.
+    Returns (outside, inside) masks, boxes in neither straddle a plane.
+    '''
+    normals = planes[:, :3]
+    positive = normals >= 0.0
+    # Farthest and nearest corner along each plane normal, shape (N, P, 3)
+    far_corner = numpy.where(positive, hi[:, None, :], lo[:, None, :])
+    near_corner = numpy.where(positive, lo[:, None, :], hi[:, None, :])
+    far_distance = numpy.einsum('npk,pk->np', far_corner, normals) + planes[:, 3]
+    near_distance = numpy.einsum('npk,pk->np', near_corner, normals) + planes[:, 3]
+    outside = (far_distance < 0.0).any(axis=1)
+    inside = (near_distance >= 0.0).all(axis=1)
+    return outside, inside
+
+
+class SceneIndex:
+    ''' Linear BVH over the world AABBs of a set of objects. '''
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.key = None
+        self.objects = []
+        self.slots = {}
+        self.count = 0
+        self.lo = self.hi = None
+        self.node_lo = self.node_hi = None
+        self.leaves = 0
+        self.size = 1
+        self.dirty = set()
+        self.moved = 0
+        self.builds = 0
+
+    def ensure(self, key, objects_callback):
+        '''
+        Build the index if key changed, otherwise refit dirty objects.
+        objects_callback is only called when a rebuild is needed.
+        '''
+        if key != self.key or self.moved > self.count * REBUILD_RATIO:
+            self.build(objects_callback())
+            self.key = key
+        elif self.dirty:
+            self.refit()
+
+    def build(self, objects):
+        self.clear()
+        count = len(objects)
+        self.count = count
+        self.builds = 1
+        if not count:
+            return
+
+        lo, hi = blend_cache.world_aabbs(objects)
+        order = numpy.argsort(morton_codes((lo + hi) * 0.5), kind='stable')
+        self.objects = [objects[i] for i in order]
+        self.slots = {obj.as_pointer(): slot for slot, obj in enumerate(self.objects)}
+
+        self.leaves = -(-count // LEAF_SIZE)
+        self.size = 1 << max(0, (self.leaves - 1).bit_length())
+        padded = self.leaves * LEAF_SIZE
+        self.lo = numpy.full((padded, 3), numpy.inf)
+        self.hi = numpy.full((padded, 3), -numpy.inf)
+        self.lo[:count] = lo[order]
+        self.hi[:count] = hi[order]
+
+        self.node_lo = numpy.full((2 * self.size, 3), numpy.inf)
+        self.node_hi = numpy.full((2 * self.size, 3), -numpy.inf)
+        self._fit_leaves(numpy.arange(self.leaves))
+
+        start = self.size
+        while start > 1:
+            self._pull(numpy.arange(start // 2, start))
+            start //= 2
+
+    def _fit_leaves(self, leaves):
+        members = leaves[:, None] * LEAF_SIZE + numpy.arange(LEAF_SIZE)
+        self.node_lo[self.size + leaves] = self.lo[members].min(axis=1)
+        self.node_hi[self.size + leaves] = self.hi[members].max(axis=1)
+
+    def _pull(self, nodes):
+        left = nodes * 2
+        self.node_lo[nodes] = numpy.minimum(self.node_lo[left], self.node_lo[left + 1])
+        self.node_hi[nodes] = numpy.maximum(self.node_hi[left], self.node_hi[left + 1])
+
+    def note_depsgraph_update(self, depsgraph):
+        ''' Mark indexed objects that moved or changed geometry as dirty. '''
+        if not self.count:
+            return
+        for update in depsgraph.updates:
+            if update.id.id_type != 'OBJECT':
+                continue
+            if update.is_updated_transform or update.is_updated_geometry:
+                pointer = update.id.original.as_pointer()
+                if pointer in self.slots:
+                    self.dirty.add(pointer)
+
+    def refit(self):
+        ''' Re-read dirty objects and refit their leaves and ancestors. '''
+        slots = numpy.fromiter((self.slots[pointer] for pointer in self.dirty), dtype=numpy.intp, count=len(self.dirty))
+        self.dirty.clear()
+        lo, hi = bounds.world_aabbs([self.objects[slot] for slot in slots])
+        self.lo[slots] = lo
+        self.hi[slots] = hi
+        self.moved += len(slots)
+
+        leaves = numpy.unique(slots // LEAF_SIZE)
+        self._fit_leaves(leaves)
+        nodes = numpy.unique((leaves + self.size) // 2)
+        while nodes.size and nodes[0] >= 1:
+            self._pull(nodes)
+            nodes = numpy.unique(nodes // 2)
+
+    def query(self, planes):
+        ''' Slots of all objects whose boxes intersect the planes, as an int array. '''
+        if not self.count:
+            return numpy.empty(0, dtype=numpy.intp)
+
+        inside_ranges = []
+        frontier = numpy.array([1])
+        levels_below = self.size.bit_length() - 1
+        while frontier.size:
+            outside, inside = classify_boxes(self.node_lo[frontier], self.node_hi[frontier], planes)
+            # Nodes completely inside contribute all their objects without further tests
+            for node in frontier[inside & ~outside]:
+                first = (node << levels_below) - self.size
+                inside_ranges.append((first * LEAF_SIZE, (first + (1 << levels_below)) * LEAF_SIZE))
+            straddling = frontier[~outside & ~inside]
+            if levels_below == 0:
+                break
+            frontier = numpy.concatenate((straddling * 2, straddling * 2 + 1))
+            levels_below -= 1
+        else:
+            straddling = frontier
+
+        found = [numpy.arange(start, min(stop, self.count)) for start, stop in inside_ranges if start < self.count]
+        if straddling.size:
+            leaves = straddling - self.size
+            leaves = leaves[leaves < self.leaves]
+            candidates = (leaves[:, None] * LEAF_SIZE + numpy.arange(LEAF_SIZE)).ravel()
+            candidates = candidates[candidates < self.count]
+            outside, _ = classify_boxes(self.lo[candidates], self.hi[candidates], planes)
+            found.append(candidates[~outside])
+        if not found:
+            return numpy.empty(0, dtype=numpy.intp)
+        return numpy.concatenate(found)
+
+    def boxes(self, slots):
+        ''' (lo, hi) arrays of the objects at slots. '''
+        return self.lo[slots], self.hi[slots]
+
+
+scene_index = SceneIndex()
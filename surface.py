@@ -0,0 +1,140 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+'''
+Distance from the viewpoint to the nearest target surface.
+
+Zoomed into a detail of a large mesh the target size says little about
+how close the geometry actually is. A BVH tree of the evaluated geometry
+answers the nearest surface point in O(log n). Trees are built in object
+space, so moving an object keeps its tree valid and only geometry updates
+drop it. Built trees are kept in an LRU capped by an estimate of their memory.
+'''
+
+import numpy
+from collections import OrderedDict
+from mathutils import Vector
+from mathutils.bvhtree import BVHTree
+
+
+# Object types that evaluate to a surface a tree can be built from
+SURFACE_TYPES = {'MESH', 'CURVE', 'SURFACE', 'FONT', 'META'}
+
+# Rough tree memory per triangle: coordinates, indices and nodes
+BYTES_PER_TRIANGLE = 96
+
+
+def box_distances(point, lo, hi):
+    ''' Distance from point to each of the (N, 3) boxes, 0 for boxes containing it. '''
+    delta = numpy.maximum(numpy.maximum(lo - point, point - hi), 0.0)
+    return numpy.sqrt(numpy.einsum('ij,ij->i', delta, delta))
+
+
+def estimate_size(evaluated):
+    ''' Approximate tree memory in bytes from the polygon count of the evaluated data. '''
+    polygons = getattr(evaluated.data, 'polygons', None)
+    triangles = 2 * len(polygons) if polygons is not None else 1024
+    return max(triangles, 1) * BYTES_PER_TRIANGLE
+
+
+class SurfaceTrees:
+    ''' LRU of object space BVH trees keyed by the original object. '''
+
+    def __init__(self):
+        self.trees = OrderedDict()
+        self.clear()
+
+    def clear(self):
+        self.trees.clear()
+        self.memory = 0
+        self.builds = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def note_depsgraph_update(self, depsgraph):
+        ''' Drop the trees of objects whose geometry changed, transforms do not matter. '''
+        if not self.trees:
+            return
+        for update in depsgraph.updates:
+            if update.is_updated_geometry and update.id.id_type == 'OBJECT':
+                self._drop(update.id.original.as_pointer())
+
+    def _drop(self, key):
+        entry = self.trees.pop(key, None)
+        if entry is not None:
+            self.memory -= entry[1]
+
+    def tree(self, obj, depsgraph, memory_limit):
+        ''' Cached tree of obj, built from its evaluated geometry on a miss. '''
+        key = obj.as_pointer()
+        entry = self.trees.get(key)
+        if entry is not None:
+            self.trees.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        evaluated = obj.evaluated_get(depsgraph)
+        tree = BVHTree.FromObject(evaluated, depsgraph)
+        size = estimate_size(evaluated)
+        while self.trees and self.memory + size > memory_limit:
+            _, (_, evicted) = self.trees.popitem(last=False)
+            self.memory -= evicted
+            self.evictions += 1
+        self.trees[key] = (tree, size)
+        self.memory += size
+        self.builds += 1
+        return tree
+
+    def nearest(self, point, target_objects, lo, hi, depsgraph, memory_limit):
+        '''
+        World distance from point to the nearest surface of the targets, None
+        if none has a surface. Targets are visited by the distance to their
+        world box and the search stops at the first box farther than the best
+        hit, so only trees near the viewpoint are built or queried.
+        Non-uniformly scaled objects are searched in object space, the result
+        is then exact for the surface point found but may miss a nearer one.
+        '''
+        distances = box_distances(point, lo, hi)
+        # The nearest box usually holds the answer, it bounds which other boxes still need a look
+        first = int(distances.argmin())
+        best = self._surface_distance(target_objects[first], point, depsgraph, memory_limit)
+        candidates = numpy.flatnonzero(distances < best)
+        for index in candidates[numpy.argsort(distances[candidates])]:
+            if distances[index] >= best:
+                break
+            if index != first:
+                best = min(best, self._surface_distance(target_objects[index], point, depsgraph, memory_limit))
+        return best if numpy.isfinite(best) else None
+
+    def _surface_distance(self, obj, point, depsgraph, memory_limit):
+        ''' World distance from point to the surface of obj, inf if it has none. '''
+        if obj.type not in SURFACE_TYPES:
+            return numpy.inf
+        matrix = numpy.asarray(obj.matrix_world, dtype=numpy.float64)
+        local = numpy.linalg.solve(matrix, numpy.append(point, 1.0))[:3]
+        location = self.tree(obj, depsgraph, memory_limit).find_nearest(Vector(local))[0]
+        if location is None:
+            return numpy.inf
+        world = matrix[:3, :3] @ numpy.asarray(location) + matrix[:3, 3]
+        return float(numpy.linalg.norm(world - point))
+
+    def stats_text(self):
+        return f"Surface trees: {len(self.trees)} ({self.memory / 1048576.0:.1f} MB), {self.builds} built / {self.hits} reused"
+
+
+surface_trees = SurfaceTrees()
@@ -0,0 +1,382 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+'''
+Record and replay of navigation sessions.
+
+While recording, every trigger event of the modal operator is written to a
+binary trace: event type, value, modifiers and time, the view matrices and
+view distance of every 3D view, and the target transforms. Local boxes and
+names are written once per target set, matrices only when they changed.
+The replayer rebuilds plain stand-in objects and views from the trace and
+runs each event through a pipeline composed from the recorded settings
+without any UI, reporting the latency and the resulting clip range of the
+primary view per event.
+
+Instances and surface geometry are not part of the trace, replays measure
+the targets only and refuse traces recorded with the nearest surface near clip.
+
+Headless, with the add-on installed as an extension:
+blender -b --python-expr "from bl_ext.user_default.blender_clipping_assistant import trace; trace.main()" -- session.catrace
+Replace user_default with the repository the extension was installed from.
+'''
+
+import json
+import math
+import struct
+import sys
+import time
+import types
+import numpy
+from . import bounds
+from . import pipeline
+from . import profiling
+
+
+MAGIC = b'CATR'
+VERSION = 1
+HEADER = struct.Struct('<4sII') # magic, version, settings bytes
+TARGETS = struct.Struct('<iIII') # active index, count, name bytes, type bytes
+EVENT = struct.Struct('<d24s12sBH') # seconds, type, value, modifiers, views
+VIEW = struct.Struct('<33d?') # view matrix, perspective matrix, view distance, is_perspective
+FLAG = struct.Struct('<?')
+
+TAG_TARGETS = b'T'
+TAG_EVENT = b'E'
+
+# Modifier bits of an event record
+CTRL = 1
+SHIFT = 2
+ALT = 4
+
+
+class TraceRecorder:
+    ''' Appends trigger events to an open trace file. '''
+
+    def __init__(self):
+        self.file = None
+        self.filepath = None
+        self.events = 0
+
+    @property
+    def active(self):
+        return self.file is not None
+
+    def start(self, filepath, settings):
+        ''' Open filepath and write the header with the settings the session runs with. '''
+        self.stop()
+        self.file = open(filepath, 'wb')
+        self.filepath = filepath
+        self.events = 0
+        self.start_time = time.perf_counter()
+        self.selection = None
+        self.matrices = None
+        blob = json.dumps({name: getattr(settings, name) for name in settings.__slots__}).encode('utf-8')
+        self.file.write(HEADER.pack(MAGIC, VERSION, len(blob)))
+        self.file.write(blob)
+
+    def stop(self):
+        ''' Close the trace, returns the number of events written. '''
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        return self.events
+
+    def record(self, event, target_objects, active_object, spaces):
+        ''' Write one trigger event with the state of the views and targets at that moment. '''
+        write = self.file.write
+        count = len(target_objects)
+        selection = tuple(obj.as_pointer() for obj in target_objects)
+        if selection != self.selection:
+            self._write_targets(target_objects, active_object)
+            self.selection = selection
+            self.matrices = None
+
+        modifiers = (CTRL if event.ctrl else 0) | (SHIFT if event.shift else 0) | (ALT if event.alt else 0)
+        write(TAG_EVENT)
+        write(EVENT.pack(time.perf_counter() - self.start_time, event.type.encode('ascii')[:24],
+                         event.value.encode('ascii')[:12], modifiers, len(spaces)))
+        for space in spaces:
+            region_3d = space.region_3d
+            write(VIEW.pack(*(value for row in region_3d.view_matrix for value in row),
+                            *(value for row in region_3d.perspective_matrix for value in row),
+                            region_3d.view_distance, region_3d.is_perspective))
+
+        matrices = bounds.gather_matrices(target_objects, count, numpy.float32).tobytes() if count else b''
+        changed = matrices != self.matrices
+        write(FLAG.pack(changed))
+        if changed:
+            write(matrices)
+            self.matrices = matrices
+        self.events += 1
+
+    def _write_targets(self, target_objects, active_object):
+        names = '\0'.join(obj.name for obj in target_objects).encode('utf-8')
+        object_types = '\0'.join(obj.type for obj in target_objects).encode('ascii')
+        active = next((index for index, obj in enumerate(target_objects) if obj == active_object), -1)
+        write = self.file.write
+        write(TAG_TARGETS)
+        write(TARGETS.pack(active, len(target_objects), len(names), len(object_types)))
+        write(names)
+        write(object_types)
+        if target_objects:
+            lo, hi, _ = bounds.local_boxes(target_objects)
+            write(numpy.concatenate((lo, hi), axis=1).astype('<f4').tobytes())
+
+
+recorder = TraceRecorder()
+
+
+class TraceTargets:
+    ''' One target set of a trace: names, types, local boxes and the active index. '''
+    __slots__ = ('names', 'types', 'boxes', 'active')
+
+    def __init__(self, names, object_types, boxes, active):
+        self.names = names
+        self.types = object_types
+        self.boxes = boxes
+        self.active = active
+
+
+class TraceEvent:
+    ''' One recorded trigger event. matrices is None while the targets did not move. '''
+    __slots__ = ('time', 'type', 'value', 'modifiers', 'views', 'targets', 'matrices')
+
+    def __init__(self, time, type, value, modifiers, views, targets, matrices):
+        self.time = time
+        self.type = type
+        self.value = value
+        self.modifiers = modifiers
+        self.views = views
+        self.targets = targets
+        self.matrices = matrices
+
+
+def read_trace(filepath):
+    ''' (settings, events) of a trace file, ValueError for other versions or damaged files. '''
+    with open(filepath, 'rb') as file:
+        data = file.read()
+    try:
+        magic, version, settings_size = HEADER.unpack_from(data)
+    except struct.error as error:
+        raise ValueError(f"unreadable trace: {error}")
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"unsupported trace version {version}")
+    offset = HEADER.size
+    settings = json.loads(data[offset:offset + settings_size].decode('utf-8'))
+    offset += settings_size
+
+    events = []
+    targets = None
+    try:
+        while offset < len(data):
+            tag = data[offset:offset + 1]
+            offset += 1
+            if tag == TAG_TARGETS:
+                active, count, name_size, type_size = TARGETS.unpack_from(data, offset)
+                offset += TARGETS.size
+                names = data[offset:offset + name_size].decode('utf-8').split('\0') if count else []
+                offset += name_size
+                object_types = data[offset:offset + type_size].decode('ascii').split('\0') if count else []
+                offset += type_size
+                boxes = numpy.frombuffer(data, dtype='<f4', count=count * 6, offset=offset).reshape(count, 6)
+                offset += boxes.nbytes
+                targets = TraceTargets(names, object_types, boxes.astype(numpy.float64), active)
+            elif tag == TAG_EVENT:
+                seconds, event_type, value, modifiers, view_count = EVENT.unpack_from(data, offset)
+                offset += EVENT.size
+                views = []
+                for _ in range(view_count):
+                    values = VIEW.unpack_from(data, offset)
+                    offset += VIEW.size
+                    views.append((values[:16], values[16:32], values[32], values[33]))
+                changed, = FLAG.unpack_from(data, offset)
+                offset += FLAG.size
+                matrices = None
+                if changed:
+                    count = len(targets.names)
+                    matrices = numpy.frombuffer(data, dtype='<f4', count=count * 16, offset=offset)
+                    matrices = matrices.reshape(count, 4, 4).astype(numpy.float64)
+                    offset += matrices.size * 4
+                events.append(TraceEvent(seconds, event_type.rstrip(b'\0').decode('ascii'),
+                                         value.rstrip(b'\0').decode('ascii'), modifiers, views, targets, matrices))
+            else:
+                raise ValueError(f"unknown record at byte {offset - 1}")
+    except (struct.error, AttributeError) as error:
+        raise ValueError(f"damaged trace: {error}")
+    return settings, events
+
+
+class _Struct:
+    ''' RNA struct stand-in for the replay, compared by identity like RNA structs. '''
+
+    def __init__(self, **properties):
+        self.__dict__.update(properties)
+
+    def as_pointer(self):
+        return id(self)
+
+
+class ReplayObject:
+    ''' Target rebuilt from a trace, enough of bpy.types.Object for the bounds stages. '''
+
+    def __init__(self, name, type, box):
+        self.name = name
+        self.type = type
+        self.data = None
+        self.parent = None
+        self.modifiers = ()
+        self.is_instancer = False
+        self.instance_type = 'NONE'
+        self.bound_box = tuple((x, y, z) for x in (box[0], box[3]) for y in (box[1], box[4]) for z in (box[2], box[5]))
+        self.size = box[3:] - box[:3]
+        self.set_matrix(numpy.identity(4))
+
+    def set_matrix(self, matrix):
+        self.matrix_world = tuple(tuple(row) for row in matrix)
+        self.location = tuple(matrix[:3, 3])
+        self.dimensions = tuple(self.size * numpy.linalg.norm(matrix[:3, :3], axis=0))
+
+    @property
+    def original(self):
+        return self
+
+    def as_pointer(self):
+        return id(self)
+
+
+def replay_context(targets, view_count):
+    ''' Context stand-in with the traced targets selected and one VIEW_3D area per traced view. '''
+    objects = [ReplayObject(name, object_type, box)
+               for name, object_type, box in zip(targets.names, targets.types, targets.boxes)]
+    areas = []
+    for _ in range(view_count):
+        space = _Struct(region_3d=_Struct(), clip_start=0.01, clip_end=1000.0, camera=None, lens=50.0)
+        areas.append(_Struct(type='VIEW_3D', spaces=_Struct(active=space), regions=[], width=1920, height=1080))
+    scene = _Struct(objects=objects, camera=None, timeline_markers=[], frame_current=1,
+                    eevee=_Struct(volumetric_start=0.1, volumetric_end=100.0),
+                    unit_settings=_Struct(system='METRIC', scale_length=1.0))
+    screen = _Struct(areas=areas)
+    window = _Struct(screen=screen)
+    depsgraph = _Struct(object_instances=(), updates=())
+    return _Struct(scene=scene, selected_objects=list(objects),
+                   active_object=objects[targets.active] if targets.active >= 0 else None,
+                   mode='OBJECT', objects_in_mode=[], area=areas[0] if areas else None, screen=screen,
+                   window=window, window_manager=_Struct(windows=[window]),
+                   view_layer=_Struct(objects=objects), evaluated_depsgraph_get=lambda: depsgraph)
+
+
+def replay_settings(recorded, current):
+    '''
+    Settings snapshot of a recorded session. Preferences added since the
+    trace was written keep their current value and are reported. Bounds are
+    always reduced inline, so every event is measured to its clip values.
+    '''
+    missing = [name for name in pipeline.FIELDS if name not in recorded]
+    if missing:
+        print(f"Clipping Assistant: trace predates {', '.join(missing)}, replaying with the current values")
+    values = {name: recorded[name] if name in recorded else getattr(current, name) for name in pipeline.FIELDS}
+    if values['near_clip'] == 'SURFACE':
+        raise ValueError("recorded with the nearest surface near clip, traces hold no surface geometry")
+    # Worker results are applied by a timer tick, which never comes during a replay
+    values['threaded_bounds'] = False
+    return pipeline.Settings(types.SimpleNamespace(**values))
+
+
+def replay(filepath):
+    '''
+    Run every event of a trace through a pipeline composed from the recorded
+    settings. Returns (recorded settings, one dict per event with time,
+    type, value, latency_ms, clip_start and clip_end of the primary view).
+    '''
+    from . import clear_caches, compose_pipeline, current_settings, depsgraph_update_handler, load_engine
+    load_engine()
+    settings, events = read_trace(filepath)
+    replay_pipeline = compose_pipeline(replay_settings(settings, current_settings()))
+    clear_caches()
+
+    context = None
+    targets = None
+    rows = []
+    for event in events:
+        if event.targets is not targets or len(context.screen.areas) != len(event.views):
+            targets = event.targets
+            context = replay_context(targets, len(event.views))
+        for area, (view_matrix, perspective_matrix, view_distance, is_perspective) in zip(context.screen.areas, event.views):
+            region_3d = area.spaces.active.region_3d
+            region_3d.view_matrix = numpy.array(view_matrix).reshape(4, 4)
+            region_3d.perspective_matrix = numpy.array(perspective_matrix).reshape(4, 4)
+            region_3d.window_matrix = region_3d.perspective_matrix @ numpy.linalg.inv(region_3d.view_matrix)
+            region_3d.view_distance = view_distance
+            region_3d.is_perspective = is_perspective
+        if event.matrices is not None:
+            updates = []
+            for obj, matrix in zip(context.selected_objects, event.matrices):
+                if obj.matrix_world != tuple(map(tuple, matrix)):
+                    obj.set_matrix(matrix)
+                    updates.append(_Struct(id=_Struct(id_type='OBJECT', original=obj),
+                                           is_updated_transform=True, is_updated_geometry=False))
+            if updates:
+                depsgraph_update_handler(context.scene, _Struct(updates=updates))
+
+        start = time.perf_counter()
+        replay_pipeline.run(context, context.selected_objects)
+        latency = time.perf_counter() - start
+        space = context.screen.areas[0].spaces.active if context.screen.areas else None
+        rows.append({
+            'time': event.time,
+            'type': event.type,
+            'value': event.value,
+            'latency_ms': latency * 1000.0,
+            'clip_start': space.clip_start if space else math.nan,
+            'clip_end': space.clip_end if space else math.nan,
+            })
+    # The live session must not keep measuring against the replay objects
+    clear_caches()
+    return settings, rows
+
+
+def replay_summary(rows):
+    ''' Event count and latency percentiles in milliseconds of a replay. '''
+    latencies = sorted(row['latency_ms'] for row in rows)
+    if not latencies:
+        return {'events': 0}
+    return {
+        'events': len(latencies),
+        'mean_ms': sum(latencies) / len(latencies),
+        'p50_ms': profiling.percentile(latencies, 0.50),
+        'p95_ms': profiling.percentile(latencies, 0.95),
+        'max_ms': latencies[-1],
+        }
+
+
+def main(argv=None):
+    '''
+    Headless entry point, replays the trace given after "--" and prints the
+    report. The module is imported from the installed extension, see the
+    command in the module docstring.
+    '''
+    argv = sys.argv if argv is None else argv
+    arguments = argv[argv.index('--') + 1:] if '--' in argv else argv[1:]
+    settings, rows = replay(arguments[0])
+    print(f"{'time s':>10} {'event':<16} {'value':<8} {'latency ms':>12} {'clip start':>12} {'clip end':>12}")
+    for row in rows:
+        print(f"{row['time']:>10.3f} {row['type']:<16} {row['value']:<8} {row['latency_ms']:>12.4f} "
+              f"{row['clip_start']:>12.5g} {row['clip_end']:>12.5g}")
+    print(json.dumps(replay_summary(rows), indent=2))
+    return rows
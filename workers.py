@@ -0,0 +1,142 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+'''
+Bounds reduction on a worker thread.
+
+bpy data may only be read on the main thread, so the handler only reads
+the matrices and local boxes of the targets and of their instances there.
+Transforming and reducing them runs on a worker thread, NumPy releases the
+GIL for the heavy loops. The result is picked up by a bpy.app.timers tick,
+every submit bumps a generation counter and results of older generations
+are dropped.
+'''
+
+import bpy
+import time
+from concurrent.futures import ThreadPoolExecutor
+from . import bounds
+from . import blend_cache
+
+
+# Seconds between checks for a finished reduction
+POLL_INTERVAL = 0.005
+
+# Smaller selections are reduced inline, the handoff would cost more than it saves
+MIN_OBJECTS = 5000
+
+
+def snapshot(target_objects, instance_boxes=None):
+    ''' Read the matrices and local boxes of the targets out of bpy, main thread only. '''
+    local_lo, local_hi = blend_cache.local_boxes(target_objects)
+    return bounds.gather_matrices(target_objects, len(target_objects)), local_lo, local_hi, instance_boxes
+
+
+def reduce_snapshot(matrices, local_lo, local_hi, instance_boxes):
+    '''
+    (aggregate, seconds) of a snapshot, aggregate as built by
+    bounds.aggregate_aabbs. Runs on the worker, touches no bpy data.
+    '''
+    start = time.perf_counter()
+    aggregate = bounds.aggregate_aabbs(*bounds.transform_boxes(matrices, local_lo, local_hi))
+    if instance_boxes is not None:
+        aggregate = bounds.merge_aggregates(
+            aggregate, bounds.aggregate_aabbs(*bounds.transform_boxes(*instance_boxes)))
+    return aggregate, time.perf_counter() - start
+
+
+class BoundsWorker:
+    ''' One background reduction at a time, newer submits supersede older ones. '''
+
+    def __init__(self):
+        self.executor = None
+        self.generation = 0
+        self.pending = None
+        self.submitted = 0
+        self.applied = 0
+        self.discarded = 0
+        self.last_worker_time = 0.0
+        # Timers are matched by identity, keep one bound method around
+        self._timer = self._tick
+
+    def pending_key(self):
+        ''' Key of the reduction in flight, None when idle. '''
+        return self.pending[1] if self.pending is not None else None
+
+    def submit(self, key, data, callback, window, area):
+        '''
+        Reduce the snapshot data in the background, then call
+        callback(key, aggregate, window, area) on the main thread.
+        '''
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ClippingAssistant")
+        if self.pending is not None:
+            self.discarded += 1
+        self.generation += 1
+        future = self.executor.submit(reduce_snapshot, *data)
+        self.pending = (self.generation, key, future, callback, window, area)
+        self.submitted += 1
+        if not bpy.app.timers.is_registered(self._timer):
+            bpy.app.timers.register(self._timer, first_interval=POLL_INTERVAL)
+
+    def _tick(self):
+        if self.pending is None:
+            return None
+        generation, key, future, callback, window, area = self.pending
+        if not future.done():
+            return POLL_INTERVAL
+        self.pending = None
+        if generation != self.generation:
+            self.discarded += 1
+            return None
+
+        aggregate, self.last_worker_time = future.result()
+        self.applied += 1
+        try:
+            callback(key, aggregate, window, area)
+        except ReferenceError:
+            pass # Window or area was closed in the meantime
+        return None
+
+    def wait(self):
+        ''' Block until the reduction in flight is done and apply it, for scripts and tests. '''
+        if self.pending is not None:
+            self.pending[2].result()
+            self._tick()
+
+    def cancel(self):
+        ''' Forget the reduction in flight, its result is dropped when it arrives. '''
+        if bpy.app.timers.is_registered(self._timer):
+            bpy.app.timers.unregister(self._timer)
+        if self.pending is not None:
+            self.discarded += 1
+        self.generation += 1
+        self.pending = None
+
+    def shutdown(self):
+        self.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+    def stats_text(self):
+        return (f"Worker: {self.applied} applied / {self.discarded} discarded, "
+                f"last reduction {self.last_worker_time * 1000.0:.2f} ms off the UI thread")
+
+
+bounds_worker = BoundsWorker()